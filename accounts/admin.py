@@ -2,8 +2,9 @@ from django.contrib import admin
 from .models import (
     Admin, Principal, Bursar, Teacher, Student, Alumni, Exam, Question, 
     ExamSubmission, StudentAnswer, Attendance, Book, BorrowRecord, 
-    FeeRecord, ActivityLog, AcademicSession, Term, SubjectGrade, ResultSummary,
-    SchoolSettings
+    FeeAccount, FeeRecord, ActivityLog, AcademicSession, Term, SubjectGrade, ResultSummary,
+    SchoolSettings, GradeBoundary, SchoolClass, ExamAttempt, GradingTask, BankQuestion, AttendanceBitmap,
+    AttendanceDailyRollup, AttendanceTermRollup
 )
 
 @admin.register(Admin)
@@ -31,12 +32,18 @@ class TeacherAdmin(admin.ModelAdmin):
     list_filter = ['subject', 'created_at']
     readonly_fields = ['teacher_id', 'created_at']
 
+@admin.register(SchoolClass)
+class SchoolClassAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['created_at']
+
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['student_id', 'full_name', 'class_name', 'email', 'phone', 'created_at']
     search_fields = ['student_id', 'full_name', 'email', 'class_name']
-    list_filter = ['class_name', 'created_at']
-    readonly_fields = ['student_id', 'created_at']
+    list_filter = ['school_class', 'created_at']
+    readonly_fields = ['student_id', 'school_class', 'created_at']
 
 @admin.register(Alumni)
 class AlumniAdmin(admin.ModelAdmin):
@@ -47,14 +54,21 @@ class AlumniAdmin(admin.ModelAdmin):
 
 @admin.register(Exam)
 class ExamAdmin(admin.ModelAdmin):
-    list_display = ['exam_id', 'title', 'subject', 'class_name', 'created_by', 'is_active', 'shuffle_questions', 'created_at']
+    list_display = ['exam_id', 'title', 'subject', 'class_name', 'created_by', 'is_active', 'shuffle_questions', 'shuffle_options', 'created_at']
     search_fields = ['exam_id', 'title', 'subject']
     list_filter = ['class_name', 'subject', 'is_active', 'created_at']
     readonly_fields = ['exam_id', 'created_at']
 
+@admin.register(BankQuestion)
+class BankQuestionAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'class_name', 'topic', 'question_text', 'correct_answer', 'created_by', 'created_at']
+    list_filter = ['subject', 'class_name', 'topic']
+    search_fields = ['question_text', 'topic']
+    readonly_fields = ['content_hash', 'created_at']
+
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['exam', 'question_number', 'correct_answer']
+    list_display = ['exam', 'question_number', 'correct_answer', 'bank_question']
     list_filter = ['exam']
     search_fields = ['question_text']
 
@@ -65,6 +79,19 @@ class ExamSubmissionAdmin(admin.ModelAdmin):
     search_fields = ['student__full_name', 'exam__title']
     readonly_fields = ['submitted_at']
 
+@admin.register(ExamAttempt)
+class ExamAttemptAdmin(admin.ModelAdmin):
+    list_display = ['student', 'exam', 'started_at', 'updated_at', 'submitted_at']
+    list_filter = ['exam']
+    search_fields = ['student__full_name', 'exam__title']
+    readonly_fields = ['started_at', 'updated_at']
+
+@admin.register(GradingTask)
+class GradingTaskAdmin(admin.ModelAdmin):
+    list_display = ['attempt', 'status', 'tries', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'claimed_at', 'finished_at']
+
 @admin.register(StudentAnswer)
 class StudentAnswerAdmin(admin.ModelAdmin):
     list_display = ['submission', 'question', 'selected_answer', 'is_correct']
@@ -77,6 +104,23 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ['student__full_name']
     readonly_fields = ['created_at']
 
+@admin.register(AttendanceBitmap)
+class AttendanceBitmapAdmin(admin.ModelAdmin):
+    list_display = ['student', 'term', 'updated_at']
+    list_filter = ['term']
+    search_fields = ['student__full_name']
+    readonly_fields = ['days', 'updated_at']
+
+@admin.register(AttendanceDailyRollup)
+class AttendanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['school_class', 'date', 'present', 'late', 'absent']
+    list_filter = ['school_class', 'date']
+
+@admin.register(AttendanceTermRollup)
+class AttendanceTermRollupAdmin(admin.ModelAdmin):
+    list_display = ['school_class', 'term', 'days_open', 'present', 'late', 'absent']
+    list_filter = ['term', 'school_class']
+
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'isbn', 'quantity', 'available', 'added_by', 'created_at']
@@ -90,12 +134,25 @@ class BorrowRecordAdmin(admin.ModelAdmin):
     list_filter = ['is_returned', 'borrowed_date']
     search_fields = ['student__full_name', 'book__title']
 
+@admin.register(FeeAccount)
+class FeeAccountAdmin(admin.ModelAdmin):
+    list_display = ['student', 'term', 'fee_type', 'total_fee', 'amount_paid', 'balance', 'is_balanced']
+    list_filter = ['fee_type', 'is_balanced', 'term']
+    search_fields = ['student__full_name']
+    readonly_fields = ['total_fee', 'amount_paid', 'balance', 'is_balanced', 'updated_at']
+
 @admin.register(FeeRecord)
 class FeeRecordAdmin(admin.ModelAdmin):
     list_display = ['student', 'total_fee', 'amount_paid', 'balance', 'is_balanced', 'fee_type', 'payment_date', 'payment_method']
     list_filter = ['fee_type', 'payment_method', 'is_balanced', 'payment_date']
     search_fields = ['student__full_name']
-    readonly_fields = ['created_at', 'balance', 'is_balanced']
+    readonly_fields = ['created_at', 'account', 'balance', 'is_balanced']
+
+    def get_readonly_fields(self, request, obj=None):
+        # A posted payment stays on its account; correct the amounts instead
+        if obj is not None:
+            return self.readonly_fields + ['student', 'term', 'fee_type']
+        return self.readonly_fields
 
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
@@ -112,10 +169,15 @@ class AcademicSessionAdmin(admin.ModelAdmin):
 
 @admin.register(Term)
 class TermAdmin(admin.ModelAdmin):
-    list_display = ['session', 'term', 'is_current', 'created_at']
+    list_display = ['session', 'term', 'is_current', 'start_date', 'end_date', 'created_at']
     list_filter = ['term', 'is_current', 'created_at']
     search_fields = ['session__session_name']
 
+@admin.register(GradeBoundary)
+class GradeBoundaryAdmin(admin.ModelAdmin):
+    list_display = ['grade', 'remark', 'min_score']
+    ordering = ['-min_score']
+
 @admin.register(SubjectGrade)
 class SubjectGradeAdmin(admin.ModelAdmin):
     list_display = ['student', 'term', 'subject', 'test_1', 'test_2', 'test_3', 'total_ca', 'exam', 'total_score', 'grade', 'remark']
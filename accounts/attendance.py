@@ -0,0 +1,355 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.dateparse import parse_date
+
+from .models import (
+    Attendance, AttendanceBitmap, AttendanceDailyRollup, AttendanceTermRollup, SchoolClass, Student, Term,
+)
+from .ranking import ATTENDANCE_PARTITION, mark_results_stale
+
+
+ATTENDANCE_STATUSES = ['Present', 'Absent', 'Late']
+
+# Two bits per day in AttendanceBitmap.days: 00 not marked, 01 present,
+# 10 absent, 11 late. The low bit alone means "was in school".
+STATUS_BITS = {'Present': 0b01, 'Absent': 0b10, 'Late': 0b11}
+
+# Default for the ``term`` arguments below: look the term up from the date
+FIND_TERM = object()
+
+AttendanceStats = namedtuple('AttendanceStats', [
+    'days_marked', 'present', 'absent', 'late', 'longest_attendance_streak', 'longest_absence_streak',
+])
+
+
+class AttendanceError(ValueError):
+    pass
+
+
+def statuses_from_form(data):
+    """{student_id: status} from ``status_<student_id>`` inputs; unmarked students are left out"""
+    statuses = {}
+    for key, value in data.items():
+        prefix, _, student_id = key.partition('_')
+        if prefix == 'status' and student_id.isdigit() and value:
+            statuses[int(student_id)] = value
+    return statuses
+
+
+def _parse_date(value):
+    try:
+        date = parse_date(str(value)) if value else None
+    except ValueError:
+        date = None
+    if date is None:
+        raise AttendanceError(f'Invalid attendance date: {value!r}')
+    return date
+
+
+def term_for_date(date):
+    """The term whose start_date..end_date covers ``date``, if any"""
+    return Term.objects.filter(start_date__lte=date, end_date__gte=date).order_by('-start_date').first()
+
+
+def set_day(days, index, status):
+    """Return ``days`` (bytes) with day ``index`` set to ``status`` (None clears it)"""
+    bits = int.from_bytes(days, 'little')
+    bits &= ~(0b11 << 2 * index)
+    if status:
+        bits |= STATUS_BITS[status] << 2 * index
+    return bits.to_bytes(max(len(days), index // 4 + 1), 'little')
+
+
+def _planes(days):
+    """Split the two-bit codes into (low, high) bit planes, one bit per day at even positions"""
+    bits = int.from_bytes(days, 'little')
+    mask = int.from_bytes(b'\x55' * len(days), 'little')
+    return bits & mask, (bits >> 1) & mask
+
+
+def _marked_days_only(flags, marked):
+    """Pack the flags of marked days next to each other, so weekends and holidays do not break runs"""
+    packed, position = 0, 0
+    while marked:
+        day = marked & -marked
+        if flags & day:
+            packed |= 1 << position
+        position += 1
+        marked ^= day
+    return packed
+
+
+def _longest_run(bits):
+    # Each shift-and-AND shortens every run of ones by one
+    run = 0
+    while bits:
+        bits &= bits >> 1
+        run += 1
+    return run
+
+
+def attendance_stats(days):
+    """AttendanceStats for one AttendanceBitmap.days value, by popcount over its bit planes"""
+    low, high = _planes(bytes(days))
+    marked = low | high
+    attended = _marked_days_only(low, marked)
+    absent = _marked_days_only(high & ~low, marked)
+    return AttendanceStats(
+        days_marked=marked.bit_count(),
+        present=(low & ~high).bit_count(),
+        absent=(high & ~low).bit_count(),
+        late=(low & high).bit_count(),
+        longest_attendance_streak=_longest_run(attended),
+        longest_absence_streak=_longest_run(absent),
+    )
+
+
+def student_term_attendance(student, term):
+    """AttendanceStats for a student's term, read from one AttendanceBitmap row"""
+    days = (
+        AttendanceBitmap.objects.filter(student=student, term=term).values_list('days', flat=True).first()
+    )
+    return attendance_stats(days or b'')
+
+
+def record_attendance_bits(date, statuses, term=FIND_TERM):
+    """
+    Fold one day's {student_id: status or None} into the students' term bitmaps.
+
+    Existing rows are locked and only the students whose bits change are
+    written back, in one upsert. Dates outside any dated term are ignored.
+    """
+    if not statuses:
+        return 0
+    date = _parse_date(date)
+    if term is FIND_TERM:
+        term = term_for_date(date)
+    if term is None:
+        return 0
+    index = (date - term.start_date).days
+    with transaction.atomic():
+        current = dict(
+            AttendanceBitmap.objects.select_for_update()
+            .filter(term=term, student_id__in=statuses).values_list('student_id', 'days')
+        )
+        changed = []
+        for student_id, status in statuses.items():
+            days = bytes(current.get(student_id, b''))
+            updated = set_day(days, index, status)
+            if updated != days or student_id not in current:
+                changed.append(AttendanceBitmap(student_id=student_id, term=term, days=updated))
+        AttendanceBitmap.objects.bulk_create(
+            changed, batch_size=500, update_conflicts=True, unique_fields=['student', 'term'],
+            update_fields=['days', 'updated_at'],
+        )
+    return len(changed)
+
+
+def rebuild_attendance_bitmaps(term):
+    """Recompute every bitmap for a dated term from its Attendance rows"""
+    bitmaps = {}
+    rows = Attendance.objects.filter(date__range=(term.start_date, term.end_date)).values_list(
+        'student_id', 'date', 'status'
+    )
+    for student_id, date, status in rows.iterator(chunk_size=2000):
+        if status in STATUS_BITS:
+            bitmaps[student_id] = set_day(bitmaps.get(student_id, b''), (date - term.start_date).days, status)
+    with transaction.atomic():
+        AttendanceBitmap.objects.filter(term=term).exclude(student_id__in=bitmaps).delete()
+        AttendanceBitmap.objects.bulk_create(
+            [AttendanceBitmap(student_id=student_id, term=term, days=days) for student_id, days in bitmaps.items()],
+            batch_size=500, update_conflicts=True, unique_fields=['student', 'term'],
+            update_fields=['days', 'updated_at'],
+        )
+    return len(bitmaps)
+
+
+def _status_counts(prefix=''):
+    return {
+        status.lower(): Count('id', filter=Q(**{f'{prefix}status': status})) for status in ATTENDANCE_STATUSES
+    }
+
+
+def _sum_counts():
+    return {status.lower(): Sum(status.lower()) for status in ATTENDANCE_STATUSES}
+
+
+def refresh_attendance_rollups(class_id, date, term=FIND_TERM):
+    """
+    Bring the class's rollups for one day, and for the term containing it,
+    up to date: the day is recounted from its Attendance rows (one class, one
+    day) and the term re-summed from its daily rollups (one row per school
+    day), so each refresh costs the same whatever the size of the school.
+    The class's term results are flagged stale for their attendance totals.
+    """
+    if class_id is None:
+        return
+    date = _parse_date(date)
+    if term is FIND_TERM:
+        term = term_for_date(date)
+    counts = Attendance.objects.filter(school_class_id=class_id, date=date).aggregate(**_status_counts())
+    with transaction.atomic():
+        if any(counts.values()):
+            AttendanceDailyRollup.objects.bulk_create(
+                [AttendanceDailyRollup(school_class_id=class_id, date=date, **counts)],
+                update_conflicts=True, unique_fields=['school_class', 'date'], update_fields=list(counts),
+            )
+        else:
+            AttendanceDailyRollup.objects.filter(school_class_id=class_id, date=date).delete()
+        if term is None:
+            return
+        totals = AttendanceDailyRollup.objects.filter(
+            school_class_id=class_id, date__range=(term.start_date, term.end_date)
+        ).aggregate(days_open=Count('id'), **_sum_counts())
+        if totals['days_open']:
+            AttendanceTermRollup.objects.bulk_create(
+                [AttendanceTermRollup(school_class_id=class_id, term=term, **totals)],
+                update_conflicts=True, unique_fields=['school_class', 'term'], update_fields=list(totals),
+            )
+        else:
+            AttendanceTermRollup.objects.filter(school_class_id=class_id, term=term).delete()
+        class_name = next((name for name, pk in SchoolClass.id_map().items() if pk == class_id), None)
+        if class_name:
+            mark_results_stale(class_name, term.id, [ATTENDANCE_PARTITION])
+
+
+def rebuild_attendance_rollups(terms=()):
+    """Recount every daily rollup from Attendance, then the given terms' rollups from those"""
+    days = (
+        Attendance.objects.filter(school_class__isnull=False).values('school_class_id', 'date')
+        .annotate(**_status_counts()).order_by()
+    )
+    with transaction.atomic():
+        AttendanceDailyRollup.objects.all().delete()
+        AttendanceDailyRollup.objects.bulk_create(
+            (AttendanceDailyRollup(**day) for day in days.iterator(chunk_size=2000)), batch_size=500,
+        )
+        for term in terms:
+            rebuild_term_rollups(term)
+
+
+def rebuild_term_rollups(term):
+    """
+    Re-sum a dated term's class rollups from the daily rollups in one grouped
+    query, and flag every class's term results stale for their attendance
+    """
+    totals = (
+        AttendanceDailyRollup.objects.filter(date__range=(term.start_date, term.end_date))
+        .values('school_class_id').annotate(days_open=Count('id'), **_sum_counts()).order_by()
+    )
+    with transaction.atomic():
+        AttendanceTermRollup.objects.filter(term=term).delete()
+        AttendanceTermRollup.objects.bulk_create([AttendanceTermRollup(term=term, **row) for row in totals])
+        for class_name in Student.objects.order_by('class_name').values_list('class_name', flat=True).distinct():
+            mark_results_stale(class_name, term.id, [ATTENDANCE_PARTITION])
+
+
+def class_attendance_summary(class_name, term):
+    """(term rollup, daily rollups, [(student, AttendanceStats)]) for one class, from three small queries"""
+    class_id = SchoolClass.resolve(class_name, create=False)
+    if class_id is None:
+        return None, [], []
+    term_rollup = AttendanceTermRollup.objects.filter(school_class_id=class_id, term=term).first()
+    days = list(
+        AttendanceDailyRollup.objects.filter(school_class_id=class_id, date__range=(term.start_date, term.end_date))
+        .order_by('-date')
+    )
+    bitmaps = dict(
+        AttendanceBitmap.objects.filter(term=term, student__school_class_id=class_id).values_list('student_id', 'days')
+    )
+    students = [
+        (student, attendance_stats(bitmaps.get(student.id, b'')))
+        for student in Student.objects.filter(school_class_id=class_id).order_by('full_name')
+    ]
+    return term_rollup, days, students
+
+
+def school_attendance_overview(term):
+    """Every class's rollup for a term, in one query"""
+    return list(AttendanceTermRollup.objects.filter(term=term).select_related('school_class')
+                .order_by('school_class__name'))
+
+
+def mark_class_attendance(class_name, date, statuses, teacher=None, default_status=None):
+    """
+    Record a class's attendance for one day in a single transaction.
+
+    ``statuses`` maps Student pk -> status. With ``default_status`` only the
+    exceptions need sending: every other student in the class gets the
+    default. New rows are inserted and changed rows updated in bulk, so a
+    re-submission writes only the students whose status actually changed.
+    Returns {status: number of students} for the class.
+    """
+    date = _parse_date(date)
+    try:
+        statuses = {int(student_id): status for student_id, status in statuses.items()}
+    except (TypeError, ValueError):
+        raise AttendanceError('Student ids must be numbers')
+    invalid = {str(status) for status in statuses.values() if status not in ATTENDANCE_STATUSES}
+    if default_status is not None and default_status not in ATTENDANCE_STATUSES:
+        invalid.add(str(default_status))
+    if invalid:
+        raise AttendanceError(f'Invalid attendance status: {", ".join(sorted(invalid))}')
+
+    with transaction.atomic():
+        # Checked against the database, not the cached roster: another process
+        # may have just registered or moved a student
+        members = dict(Student.objects.filter(school_class__name=class_name).values_list('id', 'school_class_id'))
+        if not members:
+            raise AttendanceError(f'No students in {class_name}')
+        roster = members.keys()
+        unknown = statuses.keys() - roster
+        if unknown:
+            raise AttendanceError(f'Unknown student(s) for this class: {sorted(unknown)}')
+        class_id = next(iter(members.values()))
+
+        def rows(student_ids, status_for):
+            # bulk_create skips Attendance.save(), so the class id is set here
+            return [
+                Attendance(student_id=student_id, date=date, status=status_for(student_id), class_name=class_name,
+                           school_class_id=class_id, marked_by=teacher)
+                for student_id in sorted(student_ids)
+            ]
+
+        if default_status is not None:
+            rest = roster - statuses.keys()
+            # Rows that already exist are left alone here...
+            Attendance.objects.bulk_create(rows(rest, lambda _: default_status), batch_size=500,
+                                           ignore_conflicts=True)
+            # ...and only the ones marked otherwise earlier are flipped back
+            Attendance.objects.filter(date=date, student_id__in=rest).exclude(status=default_status).update(
+                status=default_status, class_name=class_name, school_class_id=class_id, marked_by=teacher,
+            )
+        # Students already marked the same way are not rewritten
+        existing = {
+            student_id: (status, school_class_id)
+            for student_id, status, school_class_id in Attendance.objects.filter(
+                date=date, student_id__in=statuses,
+            ).values_list('student_id', 'status', 'school_class_id')
+        }
+        changed = [student_id for student_id, status in statuses.items()
+                   if existing.get(student_id) != (status, class_id)]
+        Attendance.objects.bulk_create(
+            rows(changed, statuses.get),
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['status', 'class_name', 'school_class', 'marked_by'],
+        )
+        if default_status is not None:
+            final = {student_id: statuses.get(student_id, default_status) for student_id in roster}
+        else:
+            final = statuses
+        # bulk_create skips the signals that keep the bitmaps and rollups in step
+        term = term_for_date(date)
+        record_attendance_bits(date, final, term)
+        refresh_attendance_rollups(class_id, date, term)
+
+    counts = {status: 0 for status in ATTENDANCE_STATUSES}
+    for student_id in roster:
+        status = statuses.get(student_id, default_status)
+        if status:
+            counts[status] += 1
+    return counts
@@ -0,0 +1,49 @@
+import time
+
+from django.core.cache import cache
+
+from .models import SchoolClass, Student
+from .stats import STATS_TIMEOUT
+
+
+ROSTER_VERSION_KEY = 'school_classes:roster_version'
+ROSTER_TIMEOUT = 60 * 60
+
+
+def _roster_version():
+    """
+    The version expires after STATS_TIMEOUT so processes that missed an
+    invalidation catch up; it restarts from the clock, never from a number an
+    older cached roster could still be filed under.
+    """
+    version = cache.get(ROSTER_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.set(ROSTER_VERSION_KEY, version, STATS_TIMEOUT)
+    return version
+
+
+def invalidate_rosters():
+    """Any change to a student bumps the version so every cached roster is dropped"""
+    try:
+        cache.incr(ROSTER_VERSION_KEY)
+    except ValueError:
+        cache.set(ROSTER_VERSION_KEY, time.time_ns(), STATS_TIMEOUT)
+
+
+def get_class_names():
+    """All class names for dropdowns, served from the cached id map"""
+    return sorted(SchoolClass.id_map())
+
+
+def get_class_roster(class_name):
+    """Students in a class ordered by name, cached until any student changes"""
+    class_id = SchoolClass.resolve(class_name, create=False)
+    if class_id is None:
+        return []
+    key = f'school_classes:roster:{class_id}:{_roster_version()}'
+    roster = cache.get(key)
+    if roster is None:
+        roster = list(Student.objects.filter(school_class_id=class_id).order_by('full_name'))
+        cache.set(key, roster, ROSTER_TIMEOUT)
+    return roster
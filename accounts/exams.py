@@ -0,0 +1,306 @@
+import hashlib
+import hmac
+import random
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import BankQuestion, Exam, ExamAttempt, ExamSubmission, Question, StudentAnswer
+from .student_feed import invalidate_exam_feeds, invalidate_student_feeds
+
+
+ANSWER_CHOICES = {'A', 'B', 'C', 'D'}
+
+QUESTION_CONTENT_FIELDS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+
+# Snapshots are keyed by version and never change once built, so a long
+# timeout is safe; an edit simply moves readers on to a new key
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+LOCAL_SNAPSHOT_LIMIT = 128
+
+# Field names match Question so templates render either one
+QuestionSnapshot = namedtuple(
+    'QuestionSnapshot',
+    ['id', 'question_number', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d'],
+)
+ExamSnapshot = namedtuple('ExamSnapshot', ['exam_id', 'version', 'questions', 'answer_key'])
+# One question as a student sees it; options are (display letter, submitted value, text)
+PaperQuestion = namedtuple('PaperQuestion', ['id', 'question_number', 'question_text', 'options'])
+
+_local_snapshots = {}
+
+
+class DuplicateSubmission(Exception):
+    pass
+
+
+class AttemptClosed(Exception):
+    pass
+
+
+class AnswerError(ValueError):
+    pass
+
+
+def _snapshot_key(exam_id, version):
+    return f'exams:snapshot:{exam_id}:{version}'
+
+
+def build_exam_snapshot(exam):
+    """Load an exam's questions once into an ExamSnapshot and cache it"""
+    # Bank-drawn questions keep their text on the bank row; fetch both in one join
+    rows = Question.objects.filter(exam_id=exam.pk).order_by('question_number').values_list(
+        'id', 'question_number', 'bank_question_id',
+        *QUESTION_CONTENT_FIELDS, *[f'bank_question__{field}' for field in QUESTION_CONTENT_FIELDS],
+    )
+    questions, answer_key = [], {}
+    for question_id, question_number, bank_question_id, *content in rows:
+        own, bank = content[:len(QUESTION_CONTENT_FIELDS)], content[len(QUESTION_CONTENT_FIELDS):]
+        *texts, correct_answer = bank if bank_question_id else own
+        questions.append(QuestionSnapshot(question_id, question_number, *texts))
+        answer_key[question_id] = correct_answer
+    snapshot = ExamSnapshot(exam.pk, exam.snapshot_version, tuple(questions), answer_key)
+    cache.set(_snapshot_key(exam.pk, exam.snapshot_version), snapshot, SNAPSHOT_TIMEOUT)
+    _remember(snapshot)
+    return snapshot
+
+
+def _remember(snapshot):
+    if len(_local_snapshots) >= LOCAL_SNAPSHOT_LIMIT:
+        _local_snapshots.pop(next(iter(_local_snapshots)), None)
+    _local_snapshots[(snapshot.exam_id, snapshot.version)] = snapshot
+
+
+def clear_local_snapshots():
+    _local_snapshots.clear()
+
+
+def get_exam_snapshot(exam):
+    """
+    The question paper and answer key for ``exam`` at its current version.
+
+    Looked up in process memory, then the shared cache, and only built from
+    the Question table on a miss. Treat the result as read-only: it is shared
+    between requests.
+    """
+    snapshot = _local_snapshots.get((exam.pk, exam.snapshot_version))
+    if snapshot is None:
+        snapshot = cache.get(_snapshot_key(exam.pk, exam.snapshot_version))
+        if snapshot is None:
+            return build_exam_snapshot(exam)
+        _remember(snapshot)
+    return snapshot
+
+
+def freeze_bank_question(bank_question_id):
+    """
+    Before a bank question is edited: exams students have already started or
+    sat keep the text and key they saw. Their copies take the current bank
+    content and stop pointing at the bank, so only unsat exams follow the edit.
+    """
+    content = BankQuestion.objects.filter(pk=bank_question_id).values(*QUESTION_CONTENT_FIELDS).first()
+    if content is None:
+        return
+    taken = Exam.objects.filter(Q(attempts__isnull=False) | Q(examsubmission__isnull=False)).values('pk')
+    Question.objects.filter(bank_question_id=bank_question_id, exam__in=taken).update(bank_question=None, **content)
+
+
+def bump_bank_question_exams(bank_question_id):
+    """Retire the snapshots of every exam that draws on a bank question"""
+    Exam.objects.filter(questions__bank_question_id=bank_question_id).update(
+        snapshot_version=F('snapshot_version') + 1
+    )
+
+
+def bump_snapshot_version(exam_id):
+    """
+    Retire the exam's current snapshot. Question saves and deletes do this via
+    signals; call it directly after bulk operations on an exam's questions.
+    """
+    Exam.objects.filter(pk=exam_id).update(snapshot_version=F('snapshot_version') + 1)
+    # Student dashboards show the question count
+    invalidate_exam_feeds(exam_id)
+
+
+def next_question_number(exam):
+    """
+    First free question_number for an exam. Call inside a transaction: the
+    exam row stays locked until it commits, so two tabs cannot take the same
+    number (counting rows would also reuse numbers after a delete).
+    """
+    Exam.objects.select_for_update().filter(pk=exam.pk).values_list('pk', flat=True).first()
+    highest = Question.objects.filter(exam_id=exam.pk).aggregate(highest=Max('question_number'))['highest']
+    return (highest or 0) + 1
+
+
+def publish_exam_snapshot(exam):
+    """Build the snapshot for the exam's latest version, e.g. once questions are finalized"""
+    exam.refresh_from_db(fields=['snapshot_version'])
+    return build_exam_snapshot(exam)
+
+
+def get_answer_key(exam):
+    """{question_id: correct_answer} for an exam, from its snapshot"""
+    return get_exam_snapshot(exam).answer_key
+
+
+def _paper_rng(exam, student_id):
+    """
+    A Random seeded from (exam, student). Keyed with SECRET_KEY so one student
+    cannot work out another's order.
+    """
+    message = f'exam-paper:{exam.pk}:{student_id}'.encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def student_paper(exam, student, snapshot=None):
+    """
+    The exam's questions in this student's order, with options in this
+    student's order when the exam shuffles options.
+
+    The order is derived from (exam, student) alone, so it is the same on every
+    refresh and nothing is stored for it. Each radio keeps its original letter
+    as the submitted value, so grading checks the snapshot's answer key
+    directly and never has to rebuild the permutation.
+    """
+    snapshot = snapshot or get_exam_snapshot(exam)
+    rng = _paper_rng(exam, student.pk)
+    questions = list(snapshot.questions)
+    if exam.shuffle_questions:
+        rng.shuffle(questions)
+
+    paper = []
+    for question in questions:
+        options = [('A', question.option_a), ('B', question.option_b),
+                   ('C', question.option_c), ('D', question.option_d)]
+        if exam.shuffle_options:
+            rng.shuffle(options)
+        paper.append(PaperQuestion(
+            question.id, question.question_number, question.question_text,
+            [(label, value, text) for label, (value, text) in zip('ABCD', options)],
+        ))
+    return paper
+
+
+def answers_from_post(data, answer_key):
+    """Pick the ``question_<id>`` choices that belong to this exam out of a POST"""
+    answers = {}
+    for question_id in answer_key:
+        selected = data.get(f'question_{question_id}')
+        if selected in ANSWER_CHOICES:
+            answers[question_id] = selected
+    return answers
+
+
+def mark_answers(answers, answer_key):
+    """
+    Check {question_id: letter} against an answer key in memory.
+
+    Returns (marked, correct_count, total_questions, score) where ``marked`` is
+    a list of (question_id, selected, is_correct).
+    """
+    marked = [
+        (question_id, selected, selected == answer_key[question_id])
+        for question_id, selected in answers.items()
+        if question_id in answer_key
+    ]
+    correct_count = sum(1 for _, _, is_correct in marked if is_correct)
+    total_questions = len(answer_key)
+    score = round(correct_count / total_questions * 100, 2) if total_questions else 0
+    return marked, correct_count, total_questions, score
+
+
+def mark_submission(student, exam, answers, answer_key=None):
+    """Mark {question_id: letter} in memory; returns (unsaved ExamSubmission, marked answers)"""
+    if answer_key is None:
+        answer_key = get_answer_key(exam)
+    marked, correct_count, total_questions, score = mark_answers(answers, answer_key)
+    submission = ExamSubmission(
+        student=student,
+        exam=exam,
+        total_questions=total_questions,
+        correct_answers=correct_count,
+        score=score,
+    )
+    return submission, marked
+
+
+def save_submissions(graded):
+    """
+    Insert [(submission, marked)] from mark_submission with one bulk INSERT per
+    table, so the write cost does not grow with the number of questions.
+
+    Call inside a transaction. bulk_create skips post_save, so the caller
+    refreshes the students' feeds once it has committed.
+    """
+    submissions = ExamSubmission.objects.bulk_create([submission for submission, _ in graded])
+    StudentAnswer.objects.bulk_create([
+        StudentAnswer(submission=submission, question_id=question_id,
+                      selected_answer=selected, is_correct=is_correct)
+        for submission, (_, marked) in zip(submissions, graded)
+        for question_id, selected, is_correct in marked
+    ], batch_size=1000)
+    return submissions
+
+
+def grade_submission(student, exam, answers, answer_key=None):
+    """
+    Mark and save a single submission in one transaction; the grading worker
+    saves a whole batch the same way. Raises DuplicateSubmission if the student
+    has already submitted this exam.
+    """
+    graded = mark_submission(student, exam, answers, answer_key)
+    try:
+        with transaction.atomic():
+            save_submissions([graded])
+    except IntegrityError:
+        raise DuplicateSubmission(f'{student} has already submitted {exam}')
+    invalidate_student_feeds([student.pk])
+    return graded[0]
+
+
+def clean_answers(delta, answer_key):
+    """Validate an autosave delta into {question_id: letter} for this exam"""
+    if not isinstance(delta, dict):
+        raise AnswerError('answers must be an object of {question_id: choice}')
+    cleaned = {}
+    for question_id, selected in delta.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            raise AnswerError(f'Invalid question id: {question_id!r}')
+        if question_id not in answer_key:
+            raise AnswerError(f'Question {question_id} is not part of this exam')
+        if selected not in ANSWER_CHOICES:
+            raise AnswerError(f'Invalid choice for question {question_id}: {selected!r}')
+        cleaned[question_id] = selected
+    return cleaned
+
+
+def start_attempt(student, exam):
+    """The student's attempt at an exam; the first call starts the clock"""
+    attempt, _ = ExamAttempt.objects.get_or_create(student=student, exam=exam)
+    attempt.exam = exam
+    return attempt
+
+
+def save_attempt_answers(attempt, delta):
+    """
+    Merge validated answers into the attempt's stored answer sheet.
+
+    The row is locked while merging so two tabs cannot overwrite each other's
+    answers, and the write is a single UPDATE of one row however many answers
+    the exam has. Raises AttemptClosed once submitted or out of time.
+    """
+    with transaction.atomic():
+        attempt = ExamAttempt.objects.select_for_update().select_related('exam', 'student').get(pk=attempt.pk)
+        if not attempt.is_open():
+            raise AttemptClosed('This exam attempt is closed')
+        attempt.answers.update({str(question_id): selected for question_id, selected in delta.items()})
+        attempt.save(update_fields=['answers', 'updated_at'])
+    return attempt
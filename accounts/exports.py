@@ -0,0 +1,171 @@
+import csv
+import re
+import tempfile
+import zipfile
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+from django.db.models import Count, Q
+from django.http import FileResponse, StreamingHttpResponse
+
+from .exams import get_exam_snapshot
+from .models import ExamSubmission, StudentAnswer
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+RESULT_COLUMNS = ['Student ID', 'Student Name', 'Score (%)', 'Correct Answers', 'Total Questions', 'Submission Date']
+ITEM_COLUMNS = ['Question', 'Question Text', 'Responses', 'Correct', 'Correct (%)', 'A', 'B', 'C', 'D']
+
+# Column names and NumPy dtypes for the columnar export
+COLUMNAR_RESULT_FIELDS = [
+    ('student_id', str), ('student_name', str), ('score', np.float64), ('correct_answers', np.int32),
+    ('total_questions', np.int32), ('submitted_at', 'datetime64[s]'),
+]
+COLUMNAR_ITEM_FIELDS = [
+    ('question_number', np.int32), ('question_text', str), ('responses', np.int32), ('correct', np.int32),
+    ('percent_correct', np.float64), ('chose_a', np.int32), ('chose_b', np.int32), ('chose_c', np.int32),
+    ('chose_d', np.int32),
+]
+
+EXPORT_FORMATS = {'csv', 'xlsx', 'columnar'}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def result_rows(exam, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream one tuple per submission (student joined in), chunk_size rows at a time"""
+    return (
+        ExamSubmission.objects.filter(exam=exam)
+        .order_by('id')
+        .values_list('student__student_id', 'student__full_name', 'score', 'correct_answers',
+                     'total_questions', 'submitted_at')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def item_rows(exam):
+    """
+    Per-question response statistics, one grouped query over StudentAnswer.
+
+    Rows follow ITEM_COLUMNS; question text comes from the exam snapshot.
+    """
+    counts = defaultdict(lambda: {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'correct': 0})
+    grouped = (
+        StudentAnswer.objects.filter(submission__exam=exam)
+        .values_list('question_id', 'selected_answer')
+        .annotate(total=Count('id'), correct=Count('id', filter=Q(is_correct=True)))
+        .order_by()
+    )
+    for question_id, selected, total, correct in grouped:
+        counts[question_id][selected] = total
+        counts[question_id]['correct'] += correct
+
+    rows = []
+    for question in get_exam_snapshot(exam).questions:
+        stats = counts[question.id]
+        responses = stats['A'] + stats['B'] + stats['C'] + stats['D']
+        percent = round(stats['correct'] / responses * 100, 2) if responses else 0.0
+        rows.append((question.question_number, question.question_text, responses, stats['correct'], percent,
+                     stats['A'], stats['B'], stats['C'], stats['D']))
+    return rows
+
+
+def _csv_lines(exam, include_items):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(RESULT_COLUMNS)
+    for student_id, name, score, correct, total, submitted_at in result_rows(exam):
+        yield writer.writerow([student_id, name, score, correct, total, submitted_at.strftime('%Y-%m-%d %H:%M')])
+    if include_items:
+        yield writer.writerow([])
+        yield writer.writerow(ITEM_COLUMNS)
+        for row in item_rows(exam):
+            yield writer.writerow(row)
+
+
+def _xlsx_file(exam, include_items):
+    # Imported here so the rest of the app does not pay for openpyxl at startup
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to temporary XML parts instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Results')
+    sheet.append(RESULT_COLUMNS)
+    for student_id, name, score, correct, total, submitted_at in result_rows(exam):
+        sheet.append([student_id, name, float(score), correct, total, submitted_at.replace(tzinfo=None)])
+    if include_items:
+        items = workbook.create_sheet('Item Statistics')
+        items.append(ITEM_COLUMNS)
+        for row in item_rows(exam):
+            items.append(list(row))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def _write_columns(archive, prefix, fields, rows, group):
+    for index, (name, dtype) in enumerate(fields):
+        values = [row[index] for row in rows]
+        if dtype == 'datetime64[s]':
+            values = [value.replace(tzinfo=None) for value in values]
+        with archive.open(f'{prefix}{name}.{group:05d}.npy', 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, np.asarray(values, dtype=dtype), allow_pickle=False)
+
+
+def _columnar_file(exam, include_items, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Columnar export: a compressed .npz archive holding one typed NumPy array
+    per column per row group of ``chunk_size`` rows (``score.00000``,
+    ``score.00001``, ...), so only one row group is ever in memory.
+    ``read_columnar_export`` joins the groups back into whole columns.
+    """
+    output = tempfile.TemporaryFile()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        rows = result_rows(exam, chunk_size)
+        group = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk and group:
+                break
+            _write_columns(archive, '', COLUMNAR_RESULT_FIELDS, chunk, group)
+            group += 1
+        if include_items:
+            _write_columns(archive, 'items.', COLUMNAR_ITEM_FIELDS, item_rows(exam), 0)
+    output.seek(0)
+    return output
+
+
+def read_columnar_export(path_or_file):
+    """Load a columnar export into {column name: array}, e.g. for pandas.DataFrame(...)"""
+    groups = defaultdict(list)
+    with np.load(path_or_file, allow_pickle=False) as archive:
+        for key in sorted(archive.files):
+            name, _ = key.rsplit('.', 1)
+            groups[name].append(archive[key])
+    return {name: np.concatenate(parts) for name, parts in groups.items()}
+
+
+def export_filename(exam, extension):
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', exam.title).strip('_') or exam.exam_id
+    return f'{slug}_results.{extension}'
+
+
+def export_response(exam, export_format='csv', include_items=False):
+    """Streaming download of an exam's results in CSV, XLSX or columnar (.npz) form"""
+    if export_format == 'xlsx':
+        return FileResponse(_xlsx_file(exam, include_items), as_attachment=True,
+                            filename=export_filename(exam, 'xlsx'))
+    if export_format == 'columnar':
+        return FileResponse(_columnar_file(exam, include_items), as_attachment=True,
+                            filename=export_filename(exam, 'npz'))
+    response = StreamingHttpResponse(_csv_lines(exam, include_items), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(exam, "csv")}"'
+    return response
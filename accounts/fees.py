@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import FeeAccount, FeeRecord
+
+
+DEBTOR_LIMIT = 50
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _account_for(record):
+    """The locked account for the record's student, term and fee type, created if new"""
+    account, _ = FeeAccount.objects.select_for_update().get_or_create(
+        student_id=record.student_id, term_id=record.term_id, fee_type=record.fee_type,
+    )
+    return account
+
+
+def post_payment(record):
+    """
+    Post a new payment to its (student, term, fee_type) account and stamp the
+    record with the account's balance afterwards.
+
+    The account row is locked for the update so concurrent instalments on the
+    same fee are applied one after the other. The payment's total_fee is the
+    fee as currently assessed and replaces the account's. Returns the change in
+    the amount outstanding, for the cached dashboard totals.
+    """
+    account = _account_for(record)
+    outstanding_before = account.outstanding
+    account.total_fee = _decimal(record.total_fee)
+    account.amount_paid += _decimal(record.amount_paid)
+    account.save()
+
+    record.account = account
+    record.balance = account.balance
+    record.is_balanced = account.is_balanced
+    return account.outstanding - outstanding_before
+
+
+def rehome_payment(record):
+    """
+    Point an edited payment at the account for its (possibly changed) student,
+    term and fee type. Returns the account it left, or None if it stayed; both
+    are replayed after the save.
+    """
+    account = FeeAccount.objects.filter(pk=record.account_id).first() if record.account_id else None
+    if account is not None and (account.student_id, account.term_id, account.fee_type) == (
+            record.student_id, record.term_id, record.fee_type):
+        return None
+    record.account = _account_for(record)
+    return account.pk if account is not None else None
+
+
+def recompute_fee_account(account_id):
+    """
+    Replay an account's payments in the order they were recorded, after one
+    was corrected or removed; an account left without payments is deleted.
+    """
+    with transaction.atomic():
+        account = FeeAccount.objects.select_for_update().filter(pk=account_id).first()
+        if account is None:
+            return
+        payments = list(FeeRecord.objects.filter(account=account).order_by('id'))
+        if not payments:
+            account.delete()
+            return
+
+        paid = Decimal('0')
+        for payment in payments:
+            paid += payment.amount_paid
+            payment.balance = payment.total_fee - paid
+            payment.is_balanced = (payment.balance <= 0)
+        FeeRecord.objects.bulk_update(payments, ['balance', 'is_balanced'])
+
+        account.total_fee = payments[-1].total_fee
+        account.amount_paid = paid
+        account.save()
+
+
+def fee_debtors(term=None, limit=DEBTOR_LIMIT):
+    """Accounts that still owe, largest balance first, read straight off the ledger"""
+    debtors = FeeAccount.objects.filter(balance__gt=0).select_related('student', 'term').order_by('-balance', 'id')
+    if term is not None:
+        debtors = debtors.filter(term=term)
+    return list(debtors[:limit])
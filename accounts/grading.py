@@ -0,0 +1,242 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .models import CA_WEIGHT, EXAM_WEIGHT, SCORE_FIELDS, GradeBoundary, Student, SubjectGrade
+from .ranking import mark_results_stale
+from .stats import STATS_TIMEOUT
+
+
+# Minimum total score for each grade, highest first. Used when no
+# GradeBoundary rows have been configured.
+DEFAULT_GRADE_BANDS = [
+    (Decimal('80'), 'A', 'EXCELLENT'),
+    (Decimal('70'), 'B', 'VERY GOOD'),
+    (Decimal('60'), 'C', 'GOOD'),
+    (Decimal('50'), 'D', 'PASS'),
+    (Decimal('40'), 'E', 'POOR'),
+    (Decimal('0'), 'F', 'FAIL'),
+]
+
+GRADE_BANDS_CACHE_KEY = 'grading:bands'
+
+TWO_PLACES = Decimal('0.01')
+
+# Form input prefixes used by the grade entry templates
+FORM_PREFIXES = {'test1': 'test_1', 'test2': 'test_2', 'test3': 'test_3', 'exam': 'exam'}
+
+
+class GradeEntryError(ValueError):
+    pass
+
+
+def get_grade_bands():
+    """
+    Grade bands as (min_score, grade, remark), highest first; cached until
+    edited, and re-read after STATS_TIMEOUT by processes that missed the edit
+    """
+    bands = cache.get(GRADE_BANDS_CACHE_KEY)
+    if bands is None:
+        bands = list(GradeBoundary.objects.values_list('min_score', 'grade', 'remark')) or DEFAULT_GRADE_BANDS
+        cache.set(GRADE_BANDS_CACHE_KEY, bands, STATS_TIMEOUT)
+    return bands
+
+
+def clear_grade_bands_cache():
+    cache.delete(GRADE_BANDS_CACHE_KEY)
+
+
+def grade_for(total_score, bands=None):
+    """Return (grade, remark) for a total score; below every band gets the lowest band"""
+    bands = bands or get_grade_bands()
+    for min_score, grade, remark in bands:
+        if total_score >= min_score:
+            return grade, remark
+    return bands[-1][1], bands[-1][2]
+
+
+def compute_grade(test_1, test_2, test_3, exam, bands=None):
+    """Scalar grading: returns (total_ca, total_score, grade, remark) using Decimals"""
+    test_1, test_2, test_3, exam = (Decimal(str(v or 0)) for v in (test_1, test_2, test_3, exam))
+    ca = (test_1 + test_2 + test_3) * CA_WEIGHT
+    total_ca = ca.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    total_score = (ca + exam * EXAM_WEIGHT).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    grade, remark = grade_for(total_score, bands)
+    return total_ca, total_score, grade, remark
+
+
+def _cents(values):
+    return np.rint(np.asarray(values, dtype=float) * 100).astype(np.int64)
+
+
+def compute_grades(test_1, test_2, test_3, exam, bands=None):
+    """
+    Vectorized compute_grade over equal-length sequences of scores.
+
+    Works in integer hundredths so totals round half up exactly as the
+    Decimal path does, instead of through binary floats (29.995 is
+    29.99499... as a float). Returns (total_ca, total_score, grade, remark)
+    as NumPy arrays.
+    """
+    bands = bands or get_grade_bands()
+    tests = _cents(test_1) + _cents(test_2) + _cents(test_3)
+    # The weights are whole tenths: scale by ten, then add 5 and floor-divide to round half up
+    total_ca = (tests * int(CA_WEIGHT * 10) + 5) // 10
+    total_score = (tests * int(CA_WEIGHT * 10) + _cents(exam) * int(EXAM_WEIGHT * 10) + 5) // 10
+
+    minimums = np.array([int(band[0] * 100) for band in bands], dtype=np.int64)
+    meets = total_score[:, None] >= minimums[None, :]
+    # Bands are descending, so the first band met wins; none met falls to the lowest
+    band_index = np.where(meets.any(axis=1), meets.argmax(axis=1), len(bands) - 1)
+    grades = np.array([band[1] for band in bands])[band_index]
+    remarks = np.array([band[2] for band in bands])[band_index]
+    return total_ca / 100, total_score / 100, grades, remarks
+
+
+def grade_case(score=None, column='grade', bands=None):
+    """
+    Case/When mapping a score expression (default: the generated total_score)
+    to its grade (column='grade') or remark (column='remark').
+    """
+    bands = bands or get_grade_bands()
+    score = score if score is not None else F('total_score')
+    index = 1 if column == 'grade' else 2
+    return Case(
+        *[When(GreaterThanOrEqual(score, Value(band[0])), then=Value(band[index])) for band in bands],
+        default=Value(bands[-1][index]),
+        output_field=CharField(),
+    )
+
+
+def recompute_term_grades(term):
+    """Recompute grades and remarks for a whole term in one UPDATE"""
+    with transaction.atomic():
+        updated = SubjectGrade.objects.filter(term=term).update(
+            grade=grade_case(column='grade'),
+            remark=grade_case(column='remark'),
+        )
+        # Every class that has grades this term needs re-ranking
+        partitions = (
+            SubjectGrade.objects.filter(term=term)
+            .values_list('student__class_name', 'subject')
+            .distinct()
+        )
+        touched = {}
+        for class_name, subject in partitions:
+            touched.setdefault(class_name, set()).add(subject)
+        for class_name, subjects in touched.items():
+            mark_results_stale(class_name, term.id, sorted(subjects))
+    return updated
+
+
+def _score(value):
+    """Parse a score from form/JSON input; blank counts as zero"""
+    if value in (None, ''):
+        return 0.0
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise GradeEntryError(f'Invalid score: {value!r}')
+    if not 0 <= score <= 100:
+        raise GradeEntryError(f'Score out of range (0-100): {value}')
+    return score
+
+
+def rows_from_form(data, subject=None):
+    """
+    Turn a grade grid POST into rows for bulk_upsert_grades.
+
+    Inputs are named ``<prefix>_<student_id>`` when the grid is for a single
+    ``subject``, or ``<prefix>_<student_id>_<subject>`` for a class x subject
+    matrix. Students whose cells are all blank are skipped.
+    """
+    rows = {}
+    for key, value in data.items():
+        parts = key.split('_', 2)
+        if parts[0] not in FORM_PREFIXES or len(parts) < 2 or not parts[1].isdigit():
+            continue
+        row_subject = parts[2] if len(parts) == 3 else subject
+        if not row_subject or value in (None, ''):
+            continue
+        row = rows.setdefault((parts[1], row_subject), {'student_id': parts[1], 'subject': row_subject})
+        row[FORM_PREFIXES[parts[0]]] = value
+    return list(rows.values())
+
+
+def bulk_upsert_grades(term, rows, teacher=None, class_name=None):
+    """
+    Insert or update a batch of SubjectGrade rows in one transaction.
+
+    ``rows`` is an iterable of dicts with ``student_id`` (Student pk), ``subject``
+    and the four score fields. Totals and grades are computed in one vectorized
+    pass and written with a single upsert per batch; CA and total are generated
+    by the database. When ``class_name`` is given
+    every student must belong to that class. Returns the number of rows saved.
+    """
+    parsed = {}
+    for row in rows:
+        try:
+            key = (int(row['student_id']), str(row['subject']).strip())
+        except (KeyError, TypeError, ValueError):
+            raise GradeEntryError('Every grade needs a student_id and subject')
+        # A repeated (student, subject) pair keeps the last entry
+        parsed[key] = {
+            'student_id': key[0],
+            'subject': key[1],
+            **{field: _score(row.get(field)) for field in SCORE_FIELDS},
+        }
+    rows = list(parsed.values())
+    if not rows:
+        return 0
+    if any(not row['subject'] for row in rows):
+        raise GradeEntryError('Every grade needs a subject')
+
+    students = Student.objects.filter(id__in={row['student_id'] for row in rows})
+    if class_name:
+        students = students.filter(class_name=class_name)
+    student_classes = dict(students.values_list('id', 'class_name'))
+    unknown = {row['student_id'] for row in rows} - student_classes.keys()
+    if unknown:
+        raise GradeEntryError(f'Unknown student(s) for this class: {sorted(unknown)}')
+
+    _, _, grades, remarks = compute_grades(
+        *[[row[field] for row in rows] for field in SCORE_FIELDS]
+    )
+
+    objs = [
+        SubjectGrade(
+            student_id=row['student_id'],
+            term=term,
+            subject=row['subject'],
+            test_1=Decimal(str(row['test_1'])),
+            test_2=Decimal(str(row['test_2'])),
+            test_3=Decimal(str(row['test_3'])),
+            exam=Decimal(str(row['exam'])),
+            grade=str(grades[i]),
+            remark=str(remarks[i]),
+            recorded_by=teacher,
+        )
+        for i, row in enumerate(rows)
+    ]
+
+    with transaction.atomic():
+        SubjectGrade.objects.bulk_create(
+            objs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'term', 'subject'],
+            update_fields=SCORE_FIELDS + ['grade', 'remark', 'recorded_by', 'updated_at'],
+        )
+
+        # bulk_create bypasses post_save, so flag the touched partitions here
+        touched = {}
+        for row in rows:
+            touched.setdefault(student_classes[row['student_id']], set()).add(row['subject'])
+        for name, subjects in touched.items():
+            mark_results_stale(name, term.id, sorted(subjects))
+
+    return len(objs)
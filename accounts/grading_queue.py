@@ -0,0 +1,160 @@
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .exams import DuplicateSubmission, mark_submission, save_submissions
+from .models import ActivityLog, Exam, ExamAttempt, ExamSubmission, GradingTask
+from .stats import invalidate_recent_activity
+from .student_feed import invalidate_student_feeds
+
+
+GRADING_BATCH_SIZE = 50
+# A task claimed longer ago than this is assumed to belong to a dead worker
+GRADING_LEASE_SECONDS = 300
+GRADING_MAX_TRIES = 3
+
+
+def enqueue_attempt(attempt, final_answers=None):
+    """
+    Close an attempt and queue it for grading.
+
+    ``final_answers`` (e.g. the last form POST) are folded into the stored
+    answer sheet unless time has run out, in which case only what was saved in
+    time counts. This is one conditional UPDATE plus one INSERT, so accepting a
+    submission costs the same however long the exam is or however busy the
+    graders are. Raises DuplicateSubmission if the attempt was already closed.
+    """
+    fields = {'submitted_at': timezone.now()}
+    if final_answers and attempt.is_open():
+        answers = dict(attempt.answers)
+        answers.update({str(question_id): selected for question_id, selected in final_answers.items()})
+        fields['answers'] = answers
+    with transaction.atomic():
+        closed = ExamAttempt.objects.filter(pk=attempt.pk, submitted_at__isnull=True).update(**fields)
+        if not closed:
+            raise DuplicateSubmission(f'{attempt} has already been submitted')
+        try:
+            with transaction.atomic():
+                task = GradingTask.objects.create(attempt=attempt)
+        except IntegrityError:
+            raise DuplicateSubmission(f'{attempt} is already queued')
+    invalidate_student_feeds([attempt.student_id])
+    return task
+
+
+def enqueue_expired_attempts():
+    """Queue attempts whose time ran out without the student submitting"""
+    # Attempts younger than the shortest open exam cannot have expired; each
+    # candidate is then checked against its own exam's duration
+    shortest = Exam.objects.filter(attempts__submitted_at__isnull=True).aggregate(
+        shortest=Min('duration_minutes'))['shortest']
+    if shortest is None:
+        return 0
+    candidates = ExamAttempt.objects.filter(
+        submitted_at__isnull=True, started_at__lt=timezone.now() - timedelta(minutes=shortest)
+    ).select_related('exam')
+    queued = 0
+    for attempt in candidates:
+        if not attempt.is_open():
+            try:
+                enqueue_attempt(attempt)
+                queued += 1
+            except DuplicateSubmission:
+                pass
+    return queued
+
+
+def release_stale_tasks(lease_seconds=GRADING_LEASE_SECONDS):
+    """Put tasks claimed by a worker that died mid-batch back in the queue"""
+    return GradingTask.objects.filter(
+        status=GradingTask.PROCESSING, claimed_at__lt=timezone.now() - timedelta(seconds=lease_seconds)
+    ).update(status=GradingTask.PENDING, worker='')
+
+
+def claim_grading_tasks(batch_size=GRADING_BATCH_SIZE):
+    """
+    Claim up to ``batch_size`` pending tasks for this worker.
+
+    The claim is a compare-and-set UPDATE tagged with a fresh token, so
+    concurrent workers never grade the same task even on databases without
+    SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'[:64]
+    ids = list(
+        GradingTask.objects.filter(status=GradingTask.PENDING)
+        .order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    GradingTask.objects.filter(id__in=ids, status=GradingTask.PENDING).update(
+        status=GradingTask.PROCESSING, worker=token, claimed_at=timezone.now(), tries=F('tries') + 1,
+    )
+    return list(
+        GradingTask.objects.filter(status=GradingTask.PROCESSING, worker=token)
+        .select_related('attempt__exam', 'attempt__student')
+    )
+
+
+def _grade_tasks(tasks):
+    """Grade claimed tasks with one bulk INSERT per table, in one transaction"""
+    attempts = [task.attempt for task in tasks]
+    already_graded = set(
+        ExamSubmission.objects.filter(
+            student_id__in={a.student_id for a in attempts}, exam_id__in={a.exam_id for a in attempts}
+        ).values_list('student_id', 'exam_id')
+    )
+
+    graded, logs = [], []
+    for attempt in attempts:
+        if (attempt.student_id, attempt.exam_id) in already_graded:
+            continue
+        answers = {int(question_id): selected for question_id, selected in attempt.answers.items()}
+        submission, marked = mark_submission(attempt.student, attempt.exam, answers)
+        graded.append((submission, marked))
+        logs.append(ActivityLog(
+            action='exam_submitted',
+            description=f'{attempt.student.full_name} submitted {attempt.exam.title} - Score: {submission.score}%',
+            performed_by_type='student',
+            performed_by_name=attempt.student.full_name,
+        ))
+
+    with transaction.atomic():
+        save_submissions(graded)
+        ActivityLog.objects.bulk_create(logs)
+        GradingTask.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=GradingTask.DONE, finished_at=timezone.now(), error='',
+        )
+    if logs:
+        # bulk_create skips the post_save signals that keep these caches fresh
+        invalidate_recent_activity('student')
+        invalidate_student_feeds([submission.student_id for submission, _ in graded])
+    return len(graded)
+
+
+def process_grading_batch(batch_size=GRADING_BATCH_SIZE):
+    """
+    Claim and grade one batch; returns (tasks claimed, submissions graded).
+
+    If the batch as a whole fails, each task is retried on its own so one bad
+    attempt cannot hold up the rest. A task that keeps failing is marked failed
+    after GRADING_MAX_TRIES claims.
+    """
+    tasks = claim_grading_tasks(batch_size)
+    if not tasks:
+        return 0, 0
+    try:
+        return len(tasks), _grade_tasks(tasks)
+    except Exception:
+        graded = 0
+        for task in tasks:
+            try:
+                graded += _grade_tasks([task])
+            except Exception as e:
+                status = GradingTask.FAILED if task.tries >= GRADING_MAX_TRIES else GradingTask.PENDING
+                GradingTask.objects.filter(id=task.id).update(status=status, worker='', error=str(e))
+        return len(tasks), graded
@@ -0,0 +1,148 @@
+from collections import namedtuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Max, Sum
+
+from .exams import SNAPSHOT_TIMEOUT, get_exam_snapshot
+from .models import ExamSubmission, StudentAnswer
+
+
+OPTION_LABELS = ['A', 'B', 'C', 'D']
+
+# Conventional classroom thresholds for flagging items worth a second look
+TOO_HARD = 0.2
+TOO_EASY = 0.9
+WEAK_DISCRIMINATION = 0.2
+UNUSED_DISTRACTOR = 0.05
+
+OptionStats = namedtuple(
+    'OptionStats', ['label', 'count', 'proportion', 'mean_score', 'discrimination', 'is_key', 'flag'],
+)
+ItemStats = namedtuple('ItemStats', [
+    'question_id', 'question_number', 'question_text', 'correct_answer', 'responses', 'omitted',
+    'difficulty', 'discrimination', 'options', 'flags',
+])
+ItemAnalysis = namedtuple('ItemAnalysis', ['exam_id', 'version', 'submissions', 'mean_score', 'std_score', 'items'])
+
+
+def _analysis_key(exam, submissions, last_submission_id):
+    return f'exams:item_analysis:{exam.pk}:{exam.snapshot_version}:{submissions}:{last_submission_id}'
+
+
+def _number(value, digits=3):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _item_flags(difficulty, discrimination, has_key=True):
+    if not has_key:
+        return ['no answer key']
+    flags = []
+    if difficulty is not None and difficulty < TOO_HARD:
+        flags.append('very hard')
+    if difficulty is not None and difficulty > TOO_EASY:
+        flags.append('very easy')
+    if discrimination is not None and discrimination < 0:
+        flags.append('negative discrimination, check the key')
+    elif discrimination is not None and discrimination < WEAK_DISCRIMINATION:
+        flags.append('weak discrimination')
+    return flags
+
+
+def _option_flag(is_key, proportion, discrimination):
+    if is_key:
+        return ''
+    if discrimination is not None and discrimination > 0:
+        return 'attracts stronger students'
+    if proportion is not None and proportion < UNUSED_DISTRACTOR:
+        return 'rarely chosen'
+    return ''
+
+
+def analyse_exam(exam):
+    """
+    Difficulty, point-biserial discrimination and option statistics for every
+    question on ``exam``, cached per snapshot and submission count.
+
+    One aggregate over ExamSubmission gives the score distribution (and the
+    cache key); on a miss one grouped query over StudentAnswer gives the count
+    and score sum for each (question, option), and NumPy works out the rest.
+    A student who skipped a question counts as answering it wrongly.
+    """
+    totals = ExamSubmission.objects.filter(exam=exam).aggregate(
+        submissions=Count('id'),
+        last_id=Max('id'),
+        score_sum=Sum('score', output_field=FloatField()),
+        score_squares=Sum(F('score') * F('score'), output_field=FloatField()),
+    )
+    key = _analysis_key(exam, totals['submissions'], totals['last_id'])
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = _build_analysis(exam, totals)
+        cache.set(key, analysis, SNAPSHOT_TIMEOUT)
+    return analysis
+
+
+def _build_analysis(exam, totals):
+    snapshot = get_exam_snapshot(exam)
+    n = totals['submissions']
+    if not n:
+        return ItemAnalysis(exam.pk, snapshot.version, 0, None, None, [])
+
+    rows = {question.id: index for index, question in enumerate(snapshot.questions)}
+    counts = np.zeros((len(rows), len(OPTION_LABELS)))
+    score_sums = np.zeros_like(counts)
+    grouped = (
+        StudentAnswer.objects.filter(submission__exam=exam)
+        .values_list('question_id', 'selected_answer')
+        .annotate(chosen=Count('id'), score_sum=Sum('submission__score', output_field=FloatField()))
+        .order_by()
+    )
+    for question_id, selected, chosen, score_sum in grouped:
+        if question_id in rows and selected in OPTION_LABELS:
+            counts[rows[question_id], OPTION_LABELS.index(selected)] = chosen
+            score_sums[rows[question_id], OPTION_LABELS.index(selected)] = score_sum
+
+    mean = totals['score_sum'] / n
+    std = np.sqrt(max(totals['score_squares'] / n - mean * mean, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportion = counts / n
+        chooser_mean = score_sums / counts
+        # Point-biserial between "chose this option" and the exam score:
+        # (mean of choosers - overall mean) / sd * sqrt(p / (1 - p))
+        discrimination = (chooser_mean - mean) / std * np.sqrt(proportion / (1 - proportion))
+    # Nobody chose it, everybody chose it, or every score was the same
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    # -1 for a blank or unrecognised key (legacy rows, bank items): reported, not scored
+    key_index = np.array([
+        OPTION_LABELS.index(snapshot.answer_key[question.id])
+        if snapshot.answer_key[question.id] in OPTION_LABELS else -1
+        for question in snapshot.questions
+    ], dtype=int)
+    has_key = key_index >= 0
+    item_index = np.arange(len(rows))
+    difficulty = np.where(has_key, proportion[item_index, key_index], np.nan)
+    item_discrimination = np.where(has_key, discrimination[item_index, key_index], np.nan)
+    responses = counts.sum(axis=1)
+
+    items = []
+    for index, question in enumerate(snapshot.questions):
+        options = []
+        for option, label in enumerate(OPTION_LABELS):
+            is_key = option == int(key_index[index])
+            option_proportion = _number(proportion[index, option])
+            option_discrimination = _number(discrimination[index, option])
+            options.append(OptionStats(
+                label, int(counts[index, option]), option_proportion, _number(chooser_mean[index, option], 2),
+                option_discrimination, is_key,
+                _option_flag(is_key, option_proportion, option_discrimination) if has_key[index] else '',
+            ))
+        item_difficulty = _number(difficulty[index])
+        discrimination_value = _number(item_discrimination[index])
+        items.append(ItemStats(
+            question.id, question.question_number, question.question_text, snapshot.answer_key[question.id],
+            int(responses[index]), n - int(responses[index]), item_difficulty, discrimination_value, options,
+            _item_flags(item_difficulty, discrimination_value, bool(has_key[index])),
+        ))
+    return ItemAnalysis(exam.pk, snapshot.version, n, round(mean, 2), round(float(std), 2), items)
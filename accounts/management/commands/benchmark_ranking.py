@@ -0,0 +1,88 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import AcademicSession, ResultSummary, Student, SubjectGrade, Term
+from accounts.ranking import recompute_class_results
+
+
+def legacy_calculate_class_positions(class_name, term):
+    """The original per-student implementation, kept only as a benchmark baseline"""
+    students = Student.objects.filter(class_name=class_name)
+
+    student_totals = []
+    for student in students:
+        grades = SubjectGrade.objects.filter(student=student, term=term)
+        total = sum([g.total_score for g in grades])
+        student_totals.append((student, total, grades.count()))
+
+    student_totals.sort(key=lambda x: x[1], reverse=True)
+
+    total_students = len(student_totals)
+    for position, (student, total, subject_count) in enumerate(student_totals, 1):
+        summary, created = ResultSummary.objects.get_or_create(student=student, term=term)
+        summary.position_in_class = f"{position}/{total_students}"
+        summary.total_subjects = subject_count
+        summary.score_gained = total
+        summary.average_score = total / subject_count if subject_count > 0 else 0
+        summary.promotion_status = "PROMOTED" if summary.average_score >= 50 else "REPEAT"
+        summary.save()
+
+    all_subjects = SubjectGrade.objects.filter(term=term, student__class_name=class_name).values_list('subject', flat=True).distinct()
+
+    for subject in all_subjects:
+        grades = SubjectGrade.objects.filter(term=term, student__class_name=class_name, subject=subject)
+        if grades.exists():
+            avg = sum([g.total_score for g in grades]) / grades.count()
+            grades.update(class_average=round(avg, 2))
+
+            subject_scores = [(g.student, g.total_score) for g in grades]
+            subject_scores.sort(key=lambda x: x[1], reverse=True)
+
+            for pos, (student, score) in enumerate(subject_scores, 1):
+                SubjectGrade.objects.filter(student=student, term=term, subject=subject).update(position_in_subject=pos)
+
+
+class Command(BaseCommand):
+    help = 'Compare query counts of the legacy and set-based class ranking on synthetic data (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=60)
+        parser.add_argument('--subjects', type=int, default=16)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            class_name = '__BENCHMARK__'
+            term = self.seed(class_name, options['students'], options['subjects'])
+
+            for label, func in [('legacy', legacy_calculate_class_positions),
+                                ('set-based', recompute_class_results)]:
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    func(class_name, term)
+                    elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(f'{label:>10}: {len(ctx.captured_queries):6d} queries  {elapsed:8.1f} ms')
+
+            transaction.set_rollback(True)
+
+    def seed(self, class_name, student_count, subject_count):
+        session = AcademicSession.objects.create(session_name='BENCHMARK')
+        term = Term.objects.create(session=session, term='First')
+        grades = []
+        for i in range(student_count):
+            user = User.objects.create(username=f'__benchmark_{i}')
+            student = Student.objects.create(user=user, full_name=f'Student {i}', class_name=class_name)
+            for j in range(subject_count):
+                grade = SubjectGrade(
+                    student=student, term=term, subject=f'SUBJECT {j}',
+                    test_1=Decimal((i * 7 + j) % 100), test_2=Decimal((i * 3 + j) % 100),
+                    test_3=Decimal((i + j * 5) % 100), exam=Decimal((i * 11 + j * 13) % 100),
+                )
+                grade.calculate_totals()
+                grades.append(grade)
+        SubjectGrade.objects.bulk_create(grades)
+        return term
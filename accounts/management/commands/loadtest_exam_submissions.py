@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.exams import grade_submission
+from accounts.grading_queue import enqueue_attempt, process_grading_batch
+from accounts.item_analysis import analyse_exam
+from accounts.models import (
+    ActivityLog, Exam, ExamAttempt, ExamSubmission, Question, SchoolClass, Student, StudentAnswer, Teacher,
+)
+
+
+CLASS_NAME = '__LOADTEST__'
+
+
+def legacy_grade_submission(student, exam, answers):
+    """The original one-INSERT-per-answer grading, kept only as a load test baseline"""
+    questions = list(exam.questions.all())
+    submission = ExamSubmission.objects.create(
+        student=student, exam=exam, total_questions=len(questions), correct_answers=0, score=0
+    )
+    correct_count = 0
+    for question in exam.questions.all():
+        selected = answers.get(question.id)
+        if selected:
+            is_correct = (selected == question.correct_answer)
+            if is_correct:
+                correct_count += 1
+            StudentAnswer.objects.create(
+                submission=submission, question=question, selected_answer=selected, is_correct=is_correct
+            )
+    submission.correct_answers = correct_count
+    submission.score = round(correct_count / len(questions) * 100, 2)
+    submission.save()
+    return submission
+
+
+class Command(BaseCommand):
+    help = ('Simulate a whole class submitting an exam at once: legacy, batched and queued grading '
+            '(test data is removed)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=120)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent submitting threads')
+        parser.add_argument('--allow-live-db', action='store_true',
+                            help='Run even with DEBUG off; the test data is committed while the load test runs')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['allow_live_db']:
+            raise CommandError('Refusing to write load test data with DEBUG off; pass --allow-live-db to run anyway')
+        # Worker threads use their own connections, so the data must be committed
+        # rather than rolled back; everything is tagged and deleted afterwards
+        students, exams = self.seed(options['students'], options['questions'])
+        attempts = {
+            attempt.student_id: attempt
+            for attempt in ExamAttempt.objects.bulk_create([
+                ExamAttempt(student=student, exam=exams[2]) for student in students
+            ])
+        }
+        for attempt in attempts.values():
+            attempt.exam = exams[2]
+
+        def queue_submission(student, exam, answers):
+            return enqueue_attempt(attempts[student.pk], answers)
+
+        try:
+            for (label, func), exam in zip([('legacy', legacy_grade_submission),
+                                            ('batched', grade_submission),
+                                            ('queued', queue_submission)], exams):
+                answers = {qid: 'ABCD'[(qid * 7) % 4] for qid in exam.questions.values_list('id', flat=True)}
+
+                with CaptureQueriesContext(connection) as ctx:
+                    func(students[0], exam, answers)
+
+                def submit(student):
+                    try:
+                        func(student, exam, answers)
+                    finally:
+                        connection.close()
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    list(pool.map(submit, students[1:]))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{label:>8}: {len(ctx.captured_queries):4d} queries/submission  '
+                    f'{len(students) - 1} submissions in {elapsed:6.2f} s  '
+                    f'({(len(students) - 1) / elapsed:7.1f}/s)'
+                )
+
+            # The queued requests only accepted the work; time the worker grading it
+            start = time.perf_counter()
+            graded = 0
+            while True:
+                claimed, done = process_grading_batch()
+                if not claimed:
+                    break
+                graded += done
+            self.stdout.write(f'{"worker":>8}: graded {graded} queued submissions in '
+                              f'{time.perf_counter() - start:6.2f} s')
+
+            start = time.perf_counter()
+            analysis = analyse_exam(exams[1])
+            self.stdout.write(f'{"analysis":>8}: {len(analysis.items)} items over {analysis.submissions} submissions '
+                              f'in {time.perf_counter() - start:6.2f} s (uncached)')
+        finally:
+            self.cleanup()
+
+    def seed(self, student_count, question_count):
+        self.cleanup()
+        with transaction.atomic():
+            teacher = Teacher.objects.create(user=User.objects.create(username='__loadtest_teacher'),
+                                             full_name='Load Test')
+            students = [
+                Student.objects.create(user=User.objects.create(username=f'__loadtest_{i}'),
+                                       student_id=f'LOADTEST{i:06d}', full_name=f'Student {i}',
+                                       class_name=CLASS_NAME)
+                for i in range(student_count)
+            ]
+            exams = []
+            for label in ('legacy', 'batched', 'queued'):
+                exam = Exam.objects.create(title=f'Load test ({label})', subject='LOADTEST',
+                                           class_name=CLASS_NAME, created_by=teacher)
+                Question.objects.bulk_create([
+                    Question(exam=exam, question_text=f'Question {n}', option_a='A', option_b='B',
+                             option_c='C', option_d='D', correct_answer='ABCD'[n % 4], question_number=n)
+                    for n in range(1, question_count + 1)
+                ])
+                exams.append(exam)
+        return students, exams
+
+    def cleanup(self):
+        with transaction.atomic():
+            User.objects.filter(username__startswith='__loadtest_').delete()
+            ActivityLog.objects.filter(description__contains=' submitted Load test (').delete()
+            SchoolClass.objects.filter(name=CLASS_NAME).delete()
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.grading_queue import (
+    GRADING_BATCH_SIZE, GRADING_LEASE_SECONDS, enqueue_expired_attempts, process_grading_batch, release_stale_tasks,
+)
+
+
+class Command(BaseCommand):
+    help = 'Grade queued exam submissions in batches (run one or more of these alongside the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=GRADING_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--lease', type=int, default=GRADING_LEASE_SECONDS,
+                            help='Requeue tasks claimed more than this many seconds ago by a dead worker')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        if 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+            # Students' dashboards do not cache feeds with ungraded attempts, but the
+            # activity panels only catch up when their cached entries expire
+            self.stderr.write(self.style.WARNING(
+                'The cache is per process (CACHE_BACKEND=locmem): recent-activity panels will show new '
+                f'submissions only after STATS_CACHE_TIMEOUT ({settings.STATS_CACHE_TIMEOUT}s). '
+                'Set CACHE_BACKEND=db or file to share it with the web server.'
+            ))
+        while True:
+            release_stale_tasks(options['lease'])
+            expired = enqueue_expired_attempts()
+            if expired:
+                self.stdout.write(f'Queued {expired} expired attempts')
+
+            claimed, graded = process_grading_batch(options['batch_size'])
+            if claimed:
+                self.stdout.write(f'Graded {graded} of {claimed} claimed submissions')
+                continue
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS('Grading queue is empty'))
+                return
+            time.sleep(options['sleep'])
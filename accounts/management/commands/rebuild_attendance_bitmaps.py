@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.attendance import rebuild_attendance_bitmaps
+from accounts.models import Term
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-student term attendance bitmaps from Attendance rows (e.g. after importing attendance)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', type=int, help='Term id (default: every term with start and end dates)')
+
+    def handle(self, *args, **options):
+        terms = Term.objects.filter(start_date__isnull=False, end_date__isnull=False).select_related('session')
+        if options['term']:
+            terms = terms.filter(pk=options['term'])
+            if not terms:
+                raise CommandError(f'Term {options["term"]} does not exist or has no start/end dates')
+        for term in terms:
+            students = rebuild_attendance_bitmaps(term)
+            self.stdout.write(f'{term}: {students} student bitmaps')
+        self.stdout.write(self.style.SUCCESS('Attendance bitmaps rebuilt'))
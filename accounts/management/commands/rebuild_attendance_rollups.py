@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts.attendance import rebuild_attendance_rollups
+from accounts.models import AttendanceDailyRollup, AttendanceTermRollup, Term
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and per-term class attendance rollups from Attendance rows'
+
+    def handle(self, *args, **options):
+        terms = Term.objects.filter(start_date__isnull=False, end_date__isnull=False)
+        rebuild_attendance_rollups(terms)
+        self.stdout.write(self.style.SUCCESS(
+            f'{AttendanceDailyRollup.objects.count()} class days, {AttendanceTermRollup.objects.count()} class terms'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.grading import recompute_term_grades
+from accounts.models import Term
+from accounts.ranking import get_default_term
+
+
+class Command(BaseCommand):
+    help = 'Recompute CA, totals, grades and remarks for a term in one UPDATE (e.g. after changing grade boundaries)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', type=int, help='Term id (defaults to the current term)')
+
+    def handle(self, *args, **options):
+        if options['term']:
+            try:
+                term = Term.objects.get(id=options['term'])
+            except Term.DoesNotExist:
+                raise CommandError(f"Term {options['term']} does not exist")
+        else:
+            term = get_default_term()
+            if term is None:
+                raise CommandError('No term found')
+
+        updated = recompute_term_grades(term)
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {updated} grades for {term}'))
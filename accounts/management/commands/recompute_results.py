@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Term
+from accounts.ranking import get_default_term, recompute_term_results, refresh_all_stale
+
+
+class Command(BaseCommand):
+    help = 'Recompute class positions, subject averages and subject positions for a term'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', type=int, help='Term id (defaults to the current term)')
+        parser.add_argument('--class', dest='class_names', action='append',
+                            help='Class name to recompute (repeatable, defaults to all classes)')
+        parser.add_argument('--stale', action='store_true',
+                            help='Only recompute classes flagged stale by grade entry')
+        parser.add_argument('--settle', type=int, default=0,
+                            help='With --stale, skip classes edited within the last N seconds')
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            refreshed = refresh_all_stale(options['settle'])
+            for class_name, term in refreshed:
+                self.stdout.write(f'{class_name}: refreshed for {term}')
+            self.stdout.write(self.style.SUCCESS(f'Refreshed {len(refreshed)} stale classes'))
+            return
+
+        if options['term']:
+            try:
+                term = Term.objects.get(id=options['term'])
+            except Term.DoesNotExist:
+                raise CommandError(f"Term {options['term']} does not exist")
+        else:
+            term = get_default_term()
+            if term is None:
+                raise CommandError('No term found')
+
+        results = recompute_term_results(term, options['class_names'])
+        for class_name, student_count in results.items():
+            self.stdout.write(f'{class_name}: {student_count} students ranked')
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {len(results)} classes for {term}'))
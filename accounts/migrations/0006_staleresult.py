@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_remove_schoolsettings_school_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=50)),
+                ('subject', models.CharField(max_length=100)),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.term')),
+            ],
+            options={
+                'unique_together': {('class_name', 'term', 'subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_staleresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeBoundary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_score', models.DecimalField(decimal_places=2, max_digits=5, unique=True)),
+                ('grade', models.CharField(max_length=2)),
+                ('remark', models.CharField(max_length=20)),
+            ],
+            options={
+                'verbose_name_plural': 'Grade Boundaries',
+                'ordering': ['-min_score'],
+            },
+        ),
+    ]
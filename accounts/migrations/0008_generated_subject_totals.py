@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:36
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_gradeboundary'),
+    ]
+
+    # A regular column cannot be altered into a generated one, so the old
+    # columns are dropped and re-added; values are recomputed from the scores.
+    operations = [
+        migrations.RemoveField(
+            model_name='subjectgrade',
+            name='total_ca',
+        ),
+        migrations.RemoveField(
+            model_name='subjectgrade',
+            name='total_score',
+        ),
+        migrations.AddField(
+            model_name='subjectgrade',
+            name='total_ca',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('test_1'), '+', models.F('test_2')), '+', models.F('test_3')), '*', models.Value(Decimal('0.1'))), 2), output_field=models.DecimalField(decimal_places=2, max_digits=5)),
+        ),
+        migrations.AddField(
+            model_name='subjectgrade',
+            name='total_score',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('test_1'), '+', models.F('test_2')), '+', models.F('test_3')), '*', models.Value(Decimal('0.1'))), '+', django.db.models.expressions.CombinedExpression(models.F('exam'), '*', models.Value(Decimal('0.7')))), 2), output_field=models.DecimalField(decimal_places=2, max_digits=5)),
+        ),
+    ]
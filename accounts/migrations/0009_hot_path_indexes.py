@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_generated_subject_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['-timestamp'], name='activity_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['performed_by_type', '-timestamp'], name='activity_type_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['class_name', '-date'], name='attendance_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['class_name', 'is_active'], name='exam_class_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feerecord',
+            index=models.Index(fields=['-payment_date'], name='fee_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['class_name', 'full_name'], name='student_class_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectgrade',
+            index=models.Index(fields=['term', 'subject'], name='grade_term_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['-created_at'], name='teacher_created_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'School Classes',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='attendance',
+            name='attendance_class_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='exam',
+            name='exam_class_active_idx',
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='school_class',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='accounts.schoolclass'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='school_class',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exams', to='accounts.schoolclass'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='school_class',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='students', to='accounts.schoolclass'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['school_class', '-date'], name='attendance_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['school_class', 'is_active'], name='exam_class_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school_class', 'full_name'], name='student_school_class_idx'),
+        ),
+    ]
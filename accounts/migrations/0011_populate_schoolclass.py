@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+DEFAULT_CLASSES = ['JSS1', 'JSS2', 'JSS3', 'SS1', 'SS2', 'SS3']
+
+
+def populate_school_classes(apps, schema_editor):
+    SchoolClass = apps.get_model('accounts', 'SchoolClass')
+    models = [apps.get_model('accounts', name) for name in ('Student', 'Exam', 'Attendance')]
+
+    names = set(DEFAULT_CLASSES)
+    for model in models:
+        names.update(model.objects.values_list('class_name', flat=True).distinct())
+    names.discard('')
+
+    SchoolClass.objects.bulk_create([SchoolClass(name=name) for name in sorted(names)], ignore_conflicts=True)
+    ids = dict(SchoolClass.objects.values_list('name', 'id'))
+
+    # One UPDATE per (model, class) rather than per row
+    for model in models:
+        for name, class_id in ids.items():
+            model.objects.filter(class_name=name).update(school_class_id=class_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_schoolclass'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_school_classes, migrations.RunPython.noop),
+    ]
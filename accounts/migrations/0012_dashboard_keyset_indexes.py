@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_populate_schoolclass'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teacher',
+            name='teacher_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at', '-id'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['-created_at', '-id'], name='teacher_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_dashboard_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='snapshot_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
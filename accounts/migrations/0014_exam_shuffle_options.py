@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_exam_snapshot_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='shuffle_options',
+            field=models.BooleanField(default=False),
+        ),
+    ]
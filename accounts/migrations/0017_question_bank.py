@@ -0,0 +1,122 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Full-text search over bank questions. SQLite gets an FTS5 index kept in step
+# by triggers; PostgreSQL gets a GIN index on the same tsvector expression that
+# accounts.question_bank.search_bank queries. Other databases fall back to
+# LIKE matching. NOTE: on SQLite, any later migration that rebuilds
+# accounts_bankquestion drops the triggers and must recreate them.
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE accounts_bankquestion_fts USING fts5(
+        question_text, topic, content='accounts_bankquestion', content_rowid='id'
+    )""",
+    """CREATE TRIGGER accounts_bankquestion_fts_ai AFTER INSERT ON accounts_bankquestion BEGIN
+        INSERT INTO accounts_bankquestion_fts(rowid, question_text, topic)
+        VALUES (new.id, new.question_text, new.topic);
+    END""",
+    """CREATE TRIGGER accounts_bankquestion_fts_ad AFTER DELETE ON accounts_bankquestion BEGIN
+        INSERT INTO accounts_bankquestion_fts(accounts_bankquestion_fts, rowid, question_text, topic)
+        VALUES ('delete', old.id, old.question_text, old.topic);
+    END""",
+    """CREATE TRIGGER accounts_bankquestion_fts_au AFTER UPDATE ON accounts_bankquestion BEGIN
+        INSERT INTO accounts_bankquestion_fts(accounts_bankquestion_fts, rowid, question_text, topic)
+        VALUES ('delete', old.id, old.question_text, old.topic);
+        INSERT INTO accounts_bankquestion_fts(rowid, question_text, topic)
+        VALUES (new.id, new.question_text, new.topic);
+    END""",
+]
+SQLITE_FTS_DROP = [
+    'DROP TRIGGER IF EXISTS accounts_bankquestion_fts_au',
+    'DROP TRIGGER IF EXISTS accounts_bankquestion_fts_ad',
+    'DROP TRIGGER IF EXISTS accounts_bankquestion_fts_ai',
+    'DROP TABLE IF EXISTS accounts_bankquestion_fts',
+]
+POSTGRES_FTS = [
+    """CREATE INDEX bank_question_search_idx ON accounts_bankquestion
+       USING GIN (to_tsvector('english', question_text || ' ' || topic))""",
+]
+POSTGRES_FTS_DROP = ['DROP INDEX IF EXISTS bank_question_search_idx']
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FTS, 'postgresql': POSTGRES_FTS})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FTS_DROP, 'postgresql': POSTGRES_FTS_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_gradingtask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='correct_answer',
+            field=models.CharField(blank=True, choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')], max_length=1),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option_a',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option_b',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option_c',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option_d',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='question_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.CreateModel(
+            name='BankQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('class_name', models.CharField(max_length=50)),
+                ('topic', models.CharField(blank=True, max_length=100)),
+                ('question_text', models.TextField()),
+                ('option_a', models.CharField(max_length=500)),
+                ('option_b', models.CharField(max_length=500)),
+                ('option_c', models.CharField(max_length=500)),
+                ('option_d', models.CharField(max_length=500)),
+                ('correct_answer', models.CharField(choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')], max_length=1)),
+                ('content_hash', models.CharField(editable=False, max_length=40, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.teacher')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='bank_question',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='exam_questions', to='accounts.bankquestion'),
+        ),
+        migrations.AddIndex(
+            model_name='bankquestion',
+            index=models.Index(fields=['subject', 'class_name', 'topic'], name='bank_subject_class_topic_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_term_dates_attendance_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('date', models.DateField()),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_days', to='accounts.schoolclass')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='attendance_rollup_date_idx')],
+                'unique_together': {('school_class', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceTermRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('days_open', models.PositiveIntegerField(default=0)),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_terms', to='accounts.schoolclass')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.term')),
+            ],
+            options={
+                'unique_together': {('school_class', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_fee_accounts(apps, schema_editor):
+    """Group existing payments into accounts and replay them for running balances"""
+    FeeAccount = apps.get_model('accounts', 'FeeAccount')
+    FeeRecord = apps.get_model('accounts', 'FeeRecord')
+
+    ledgers = {}
+    for record in FeeRecord.objects.order_by('id'):
+        ledgers.setdefault((record.student_id, record.term_id, record.fee_type), []).append(record)
+
+    accounts = []
+    for (student_id, term_id, fee_type), records in ledgers.items():
+        paid = 0
+        for record in records:
+            paid += record.amount_paid
+            record.balance = record.total_fee - paid
+            record.is_balanced = record.balance <= 0
+        balance = records[-1].total_fee - paid
+        accounts.append(FeeAccount(student_id=student_id, term_id=term_id, fee_type=fee_type,
+                                   total_fee=records[-1].total_fee, amount_paid=paid, balance=balance,
+                                   is_balanced=balance <= 0))
+    FeeAccount.objects.bulk_create(accounts)
+
+    payments = []
+    for account, records in zip(accounts, ledgers.values()):
+        for record in records:
+            record.account_id = account.pk
+            payments.append(record)
+    FeeRecord.objects.bulk_update(payments, ['account', 'balance', 'is_balanced'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fee_type', models.CharField(max_length=100)),
+                ('total_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('is_balanced', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_accounts', to='accounts.student')),
+                ('term', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.term')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feerecord',
+            name='account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='accounts.feeaccount'),
+        ),
+        migrations.AddIndex(
+            model_name='feeaccount',
+            index=models.Index(condition=models.Q(('balance__gt', 0)), fields=['-balance'], name='fee_account_debtor_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feeaccount',
+            unique_together={('student', 'term', 'fee_type')},
+        ),
+        migrations.RunPython(populate_fee_accounts, migrations.RunPython.noop),
+    ]
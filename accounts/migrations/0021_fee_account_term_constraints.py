@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_fee_accounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feeaccount',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='accounts.term'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeaccount',
+            constraint=models.UniqueConstraint(condition=models.Q(('term__isnull', True)), fields=('student', 'fee_type'), name='fee_account_no_term_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_fee_account_term_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action',
+            field=models.CharField(choices=[('student_registered', 'Student Registered'), ('teacher_registered', 'Teacher Registered'), ('student_deleted', 'Student Deleted'), ('teacher_deleted', 'Teacher Deleted'), ('exam_created', 'Exam Created'), ('exam_edited', 'Exam Edited'), ('exam_deleted', 'Exam Deleted'), ('exam_submitted', 'Exam Submitted'), ('questions_imported', 'Questions Imported'), ('attendance_marked', 'Attendance Marked'), ('fee_recorded', 'Fee Recorded'), ('grades_entered', 'Grades Entered'), ('result_generated', 'Result Generated'), ('book_added', 'Book Added'), ('book_borrowed', 'Book Borrowed'), ('book_returned', 'Book Returned')], max_length=50),
+        ),
+    ]
@@ -1,6 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Round
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+import hashlib
 import random
 import string
 
@@ -63,6 +69,11 @@ class Teacher(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     registered_by = models.ForeignKey(Admin, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='teacher_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.teacher_id:
             self.teacher_id = f"TCH{''.join(random.choices(string.digits, k=6))}"
@@ -72,6 +83,46 @@ class Teacher(models.Model):
         return f"{self.full_name} ({self.teacher_id})"
 
 
+# NEW: School Class Model (normalizes the class_name label)
+class SchoolClass(models.Model):
+    name = models.CharField(max_length=50, unique=True)  # e.g. "JSS1"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    ID_MAP_CACHE_KEY = 'school_classes:ids'
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "School Classes"
+
+    @classmethod
+    def id_map(cls):
+        """
+        {name: id} for every class, cached until a class is added or removed
+        (and re-read after STATS_TIMEOUT by processes that missed the change)
+        """
+        from .stats import STATS_TIMEOUT
+
+        ids = cache.get(cls.ID_MAP_CACHE_KEY)
+        if ids is None:
+            ids = dict(cls.objects.values_list('name', 'id'))
+            cache.set(cls.ID_MAP_CACHE_KEY, ids, STATS_TIMEOUT)
+        return ids
+
+    @classmethod
+    def resolve(cls, name, create=True):
+        """Return the id for a class name, creating the class if needed"""
+        if not name:
+            return None
+        class_id = cls.id_map().get(name)
+        if class_id is None and create:
+            class_id = cls.objects.get_or_create(name=name)[0].id
+            cache.delete(cls.ID_MAP_CACHE_KEY)
+        return class_id
+
+    def __str__(self):
+        return self.name
+
+
 # Student Model
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -80,13 +131,22 @@ class Student(models.Model):
     email = models.EmailField(blank=True, null=True)  # Made optional
     phone = models.CharField(max_length=15, blank=True, null=True)  # Made optional
     class_name = models.CharField(max_length=50)
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='students')
     profile_picture = models.ImageField(upload_to='student_profiles/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     registered_by = models.ForeignKey(Admin, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_name', 'full_name'], name='student_class_name_idx'),
+            models.Index(fields=['school_class', 'full_name'], name='student_school_class_idx'),
+            models.Index(fields=['-created_at', '-id'], name='student_created_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.student_id:
             self.student_id = f"STD{''.join(random.choices(string.digits, k=6))}"
+        self.school_class_id = SchoolClass.resolve(self.class_name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -136,30 +196,79 @@ class Exam(models.Model):
     title = models.CharField(max_length=200)
     subject = models.CharField(max_length=100)
     class_name = models.CharField(max_length=50)
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='exams')
     duration_minutes = models.IntegerField(default=60)
     created_by = models.ForeignKey(Teacher, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     shuffle_questions = models.BooleanField(default=True)  # NEW: Shuffle for each student
+    shuffle_options = models.BooleanField(default=False)
+    # Bumped whenever a question changes; keys the cached question paper snapshot
+    snapshot_version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_class', 'is_active'], name='exam_class_active_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.exam_id:
             self.exam_id = f"EXM{''.join(random.choices(string.ascii_uppercase + string.digits, k=6))}"
+        self.school_class_id = SchoolClass.resolve(self.class_name)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} ({self.exam_id})"
 
 
-# Question Model
-class Question(models.Model):
-    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='questions')
+# Question Bank: reusable questions, shared by every exam that draws on them
+class BankQuestion(models.Model):
+    subject = models.CharField(max_length=100)
+    class_name = models.CharField(max_length=50)
+    topic = models.CharField(max_length=100, blank=True)
     question_text = models.TextField()
     option_a = models.CharField(max_length=500)
     option_b = models.CharField(max_length=500)
     option_c = models.CharField(max_length=500)
     option_d = models.CharField(max_length=500)
     correct_answer = models.CharField(max_length=1, choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')])
+    # Same subject, class, question and options = same item, so re-imports do not duplicate
+    content_hash = models.CharField(max_length=40, unique=True, editable=False)
+    created_by = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subject', 'class_name', 'topic'], name='bank_subject_class_topic_idx'),
+        ]
+
+    def fingerprint(self):
+        parts = [self.subject, self.class_name, self.question_text,
+                 self.option_a, self.option_b, self.option_c, self.option_d]
+        normalized = '\x1f'.join(' '.join(str(part).split()).lower() for part in parts)
+        return hashlib.sha1(normalized.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.subject = self.subject.strip().upper()
+        self.content_hash = self.fingerprint()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.subject} {self.class_name} [{self.topic}]: {self.question_text[:50]}"
+
+
+# Question Model
+class Question(models.Model):
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='questions')
+    # Questions drawn from the bank point at it and leave their own text blank
+    bank_question = models.ForeignKey(BankQuestion, on_delete=models.PROTECT, null=True, blank=True,
+                                      related_name='exam_questions')
+    question_text = models.TextField(blank=True)
+    option_a = models.CharField(max_length=500, blank=True)
+    option_b = models.CharField(max_length=500, blank=True)
+    option_c = models.CharField(max_length=500, blank=True)
+    option_d = models.CharField(max_length=500, blank=True)
+    correct_answer = models.CharField(max_length=1, blank=True, choices=[('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')])
     question_number = models.IntegerField()
 
     class Meta:
@@ -185,6 +294,69 @@ class ExamSubmission(models.Model):
         return f"{self.student.full_name} - {self.exam.title}: {self.score}%"
 
 
+# Exam Attempt: one per student per exam, holds autosaved answers until submission
+class ExamAttempt(models.Model):
+    # Grace period for answers sent just as the clock runs out
+    GRACE_SECONDS = 30
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='exam_attempts')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='attempts')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    # {"<question id>": "A"} - the whole answer sheet in one column
+    answers = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        unique_together = ['student', 'exam']
+
+    @property
+    def deadline(self):
+        return self.started_at + timedelta(minutes=self.exam.duration_minutes)
+
+    def seconds_left(self):
+        return max(0, int((self.deadline - timezone.now()).total_seconds()))
+
+    def is_open(self):
+        """Still accepting answers: not submitted and within the time limit plus grace"""
+        return (self.submitted_at is None
+                and timezone.now() <= self.deadline + timedelta(seconds=self.GRACE_SECONDS))
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.exam.title} attempt"
+
+
+# Grading Queue: submitted attempts waiting for the grading worker
+class GradingTask(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    attempt = models.OneToOneField(ExamAttempt, on_delete=models.CASCADE, related_name='grading_task')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    worker = models.CharField(max_length=64, blank=True)
+    tries = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='gradingtask_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Grading {self.attempt} ({self.status})"
+
+
 # Student Answer
 class StudentAnswer(models.Model):
     submission = models.ForeignKey(ExamSubmission, on_delete=models.CASCADE, related_name='answers')
@@ -232,6 +404,9 @@ class Term(models.Model):
     session = models.ForeignKey(AcademicSession, on_delete=models.CASCADE)
     term = models.CharField(max_length=10, choices=TERM_CHOICES)
     is_current = models.BooleanField(default=False)
+    # First and last day of the term; attendance is bucketed into terms by these
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -241,6 +416,47 @@ class Term(models.Model):
         return f"{self.session.session_name} - {self.term} Term"
 
 
+# Configurable grade bands used by SubjectGrade (see accounts.grading)
+class GradeBoundary(models.Model):
+    min_score = models.DecimalField(max_digits=5, decimal_places=2, unique=True)  # Lowest total for this grade
+    grade = models.CharField(max_length=2)
+    remark = models.CharField(max_length=20)
+
+    class Meta:
+        ordering = ['-min_score']
+        verbose_name_plural = "Grade Boundaries"
+
+    def __str__(self):
+        return f"{self.grade} ({self.remark}) >= {self.min_score}"
+
+
+# CA is the average of three tests scaled to 30%, i.e. 10% of their sum;
+# the exam is scaled to 70%
+CA_WEIGHT = Decimal('0.1')
+EXAM_WEIGHT = Decimal('0.7')
+SCORE_CA_EXPRESSION = (F('test_1') + F('test_2') + F('test_3')) * Value(CA_WEIGHT)
+SCORE_FIELDS = ['test_1', 'test_2', 'test_3', 'exam']
+
+
+class SubjectGradeQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """Re-band grade/remark when raw scores are changed through QuerySet.update()"""
+        if not set(SCORE_FIELDS).intersection(kwargs):
+            return super().update(**kwargs)
+
+        from .grading import grade_case
+
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            # total_score is regenerated by the UPDATE above, so band it in a second pass
+            self.model._base_manager.using(self.db).filter(pk__in=pks).update(
+                grade=grade_case(column='grade'),
+                remark=grade_case(column='remark'),
+            )
+        return rows
+
+
 class SubjectGrade(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     term = models.ForeignKey(Term, on_delete=models.CASCADE)
@@ -250,13 +466,23 @@ class SubjectGrade(models.Model):
     test_1 = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # Max 100
     test_2 = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # Max 100
     test_3 = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # Max 100
-    total_ca = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # Average of 3 tests (30%)
     
     # Exam Scores
     exam = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # Max 100 (70%)
     
-    # Total and Grade
-    total_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)  # CA + Exam
+    # CA and Total are computed by the database on every write path
+    total_ca = models.GeneratedField(  # Average of 3 tests (30%)
+        expression=Round(SCORE_CA_EXPRESSION, 2),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        db_persist=True,
+    )
+    total_score = models.GeneratedField(  # CA + Exam
+        expression=Round(SCORE_CA_EXPRESSION + F('exam') * Value(EXAM_WEIGHT), 2),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        db_persist=True,
+    )
+    
+    # Grade bands are configurable (GradeBoundary) so these are maintained in Python
     grade = models.CharField(max_length=2, blank=True)  # A, B, C, D, E, F
     remark = models.CharField(max_length=20, blank=True)  # EXCELLENT, VERY GOOD, GOOD, PASS, FAIL
     
@@ -269,40 +495,24 @@ class SubjectGrade(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SubjectGradeQuerySet.as_manager()
+
     class Meta:
         unique_together = ['student', 'term', 'subject']
+        indexes = [
+            models.Index(fields=['term', 'subject'], name='grade_term_subject_idx'),
+        ]
 
     def calculate_totals(self):
-        """Calculate CA (average of 3 tests as 30%), Total Score, and Grade"""
-        # CA is average of 3 tests, scaled to 30%
-        avg_test = (self.test_1 + self.test_2 + self.test_3) / 3
-        self.total_ca = (avg_test * 30) / 100
-        
-        # Exam is already out of 100, scale to 70%
-        exam_score = (self.exam * 70) / 100
-        
-        # Total score
-        self.total_score = self.total_ca + exam_score
-        
-        # Calculate grade based on total score
-        if self.total_score >= 80:
-            self.grade = 'A'
-            self.remark = 'EXCELLENT'
-        elif self.total_score >= 70:
-            self.grade = 'B'
-            self.remark = 'VERY GOOD'
-        elif self.total_score >= 60:
-            self.grade = 'C'
-            self.remark = 'GOOD'
-        elif self.total_score >= 50:
-            self.grade = 'D'
-            self.remark = 'PASS'
-        elif self.total_score >= 40:
-            self.grade = 'E'
-            self.remark = 'POOR'
-        else:
-            self.grade = 'F'
-            self.remark = 'FAIL'
+        """
+        Calculate Grade and Remark. CA and Total are generated by the database;
+        they are mirrored here so the instance is consistent before a refresh.
+        """
+        from .grading import compute_grade
+
+        self.total_ca, self.total_score, self.grade, self.remark = compute_grade(
+            self.test_1, self.test_2, self.test_3, self.exam
+        )
 
     def save(self, *args, **kwargs):
         self.calculate_totals()
@@ -356,10 +566,25 @@ class ResultSummary(models.Model):
         return f"{self.student.full_name} - {self.term} - Summary"
 
 
+# Partitions of SubjectGrade whose positions/averages need recomputing
+class StaleResult(models.Model):
+    class_name = models.CharField(max_length=50)
+    term = models.ForeignKey(Term, on_delete=models.CASCADE)
+    subject = models.CharField(max_length=100)
+    marked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['class_name', 'term', 'subject']
+
+    def __str__(self):
+        return f"{self.class_name} - {self.subject} - {self.term} (stale)"
+
+
 # Attendance Model
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     class_name = models.CharField(max_length=50)
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_records')
     date = models.DateField()
     status = models.CharField(max_length=10, choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Late', 'Late')])
     marked_by = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True)
@@ -367,11 +592,77 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ['student', 'date']
+        indexes = [
+            models.Index(fields=['school_class', '-date'], name='attendance_class_date_idx'),
+            models.Index(fields=['-date'], name='attendance_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.school_class_id = SchoolClass.resolve(self.class_name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student.full_name} - {self.date}: {self.status}"
 
 
+# A student's attendance for a whole term: two bits per day since term.start_date
+# (see accounts.attendance), kept up to date alongside Attendance writes
+class AttendanceBitmap(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE)
+    days = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'term']
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.term} - Attendance"
+
+
+# Materialized attendance counts (see accounts.attendance), refreshed when attendance is marked
+class AttendanceCounts(models.Model):
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def marked(self):
+        return self.present + self.absent + self.late
+
+    @property
+    def attendance_rate(self):
+        """Share of marks that were present or late, as a percentage"""
+        return round((self.present + self.late) / self.marked * 100, 1) if self.marked else 0
+
+
+class AttendanceDailyRollup(AttendanceCounts):
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='attendance_days')
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ['school_class', 'date']
+        indexes = [models.Index(fields=['date'], name='attendance_rollup_date_idx')]
+
+    def __str__(self):
+        return f"{self.school_class} - {self.date}: {self.present}/{self.marked}"
+
+
+class AttendanceTermRollup(AttendanceCounts):
+    school_class = models.ForeignKey(SchoolClass, on_delete=models.CASCADE, related_name='attendance_terms')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE)
+    days_open = models.PositiveIntegerField(default=0)  # Days the class had attendance taken
+
+    class Meta:
+        unique_together = ['school_class', 'term']
+
+    def __str__(self):
+        return f"{self.school_class} - {self.term}: {self.attendance_rate}%"
+
+
 # Library Book Model
 class Book(models.Model):
     title = models.CharField(max_length=200)
@@ -400,9 +691,51 @@ class BorrowRecord(models.Model):
 
 
 # NEW: Enhanced Fee Record for Bursar
+# The fee ledger (see accounts.fees): one account per student, term and fee type
+# holds the running balance, and each FeeRecord is an append-only payment posted to it
+class FeeAccount(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='fee_accounts')
+    # PROTECT: SET_NULL would fold a deleted term's accounts into the no-term ones
+    term = models.ForeignKey(Term, on_delete=models.PROTECT, null=True, blank=True)
+    fee_type = models.CharField(max_length=100)
+
+    total_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    is_balanced = models.BooleanField(default=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'term', 'fee_type']
+        constraints = [
+            # NULLs never collide in the unique index above, so no-term accounts need their own
+            models.UniqueConstraint(fields=['student', 'fee_type'], condition=models.Q(term__isnull=True),
+                                    name='fee_account_no_term_unique'),
+        ]
+        indexes = [
+            # Debtor lists: only accounts that still owe, largest balance first
+            models.Index(fields=['-balance'], condition=models.Q(balance__gt=0), name='fee_account_debtor_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.balance = self.total_fee - self.amount_paid
+        self.is_balanced = (self.balance <= 0)
+        super().save(*args, **kwargs)
+
+    @property
+    def outstanding(self):
+        """What is still owed; an overpayment is credit, not a negative debt"""
+        return max(self.balance, Decimal('0'))
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.fee_type}: ₦{self.balance} owed"
+
+
 class FeeRecord(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     term = models.ForeignKey(Term, on_delete=models.SET_NULL, null=True, blank=True)
+    account = models.ForeignKey(FeeAccount, on_delete=models.CASCADE, null=True, blank=True, related_name='payments')
     
     # Fee details
     total_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -421,10 +754,26 @@ class FeeRecord(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-payment_date'], name='fee_payment_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        self.balance = self.total_fee - self.amount_paid
-        self.is_balanced = (self.balance <= 0)
-        super().save(*args, **kwargs)
+        """
+        A new payment is posted to its account, and ``balance`` records the
+        account's running balance after it; edits and deletes are corrections
+        that replay the account (see accounts.signals). An edit that changes
+        the student, term or fee type moves the payment to that account.
+        """
+        from .fees import post_payment, rehome_payment
+
+        with transaction.atomic():
+            if self._state.adding:
+                self.outstanding_change = post_payment(self)
+            else:
+                self.previous_account_id = rehome_payment(self)
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student.full_name} - {self.fee_type}: ₦{self.amount_paid}"
@@ -441,6 +790,8 @@ class ActivityLog(models.Model):
         ('exam_edited', 'Exam Edited'),  # NEW
         ('exam_deleted', 'Exam Deleted'),  # NEW
         ('exam_submitted', 'Exam Submitted'),
+        ('questions_imported', 'Questions Imported'),
+        ('paper_generated', 'Paper Generated'),
         ('attendance_marked', 'Attendance Marked'),
         ('fee_recorded', 'Fee Recorded'),
         ('grades_entered', 'Grades Entered'),  # NEW
@@ -458,6 +809,10 @@ class ActivityLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='activity_timestamp_idx'),
+            models.Index(fields=['performed_by_type', '-timestamp'], name='activity_type_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.action} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
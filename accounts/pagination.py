@@ -0,0 +1,66 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DASHBOARD_PAGE_SIZE = 25
+
+KeysetPage = namedtuple('KeysetPage', ['rows', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(obj, field='created_at'):
+    """Opaque cursor for a row, from its (field, id) sort key"""
+    raw = f"{getattr(obj, field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (sort value, id) or None for a missing/tampered cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, after=None, before=None, page_size=DASHBOARD_PAGE_SIZE, field='created_at'):
+    """
+    Newest-first keyset pagination on (field, id); ``field`` is a date or
+    datetime column, created_at unless given.
+
+    ``after`` continues to older rows, ``before`` goes back to newer rows. Each
+    page is a LIMIT on an index range, so its cost does not depend on how deep
+    into the list it is or how many rows the table holds.
+    """
+    before_key = decode_cursor(before)
+    if before_key:
+        value, pk = before_key
+        rows = list(
+            queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            .order_by(field, 'pk')[:page_size + 1]
+        )
+        has_newer = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            rows,
+            encode_cursor(rows[-1], field) if rows else None,
+            encode_cursor(rows[0], field) if rows and has_newer else None,
+        )
+
+    after_key = decode_cursor(after)
+    if after_key:
+        value, pk = after_key
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    rows = list(queryset.order_by(f'-{field}', '-pk')[:page_size + 1])
+    has_older = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        encode_cursor(rows[-1], field) if has_older else None,
+        encode_cursor(rows[0], field) if after_key and rows else None,
+    )
@@ -0,0 +1,148 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, Count, F, IntegerField, Q, Value, When, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Random, RowNumber
+
+from .exams import bump_snapshot_version, next_question_number, publish_exam_snapshot
+from .models import BankQuestion, Question
+from .question_import import read_question_file
+
+
+BANK_PAGE_SIZE = 50
+
+
+class BankError(ValueError):
+    pass
+
+
+def normalize_subject(subject):
+    return (subject or '').strip().upper()
+
+
+def add_bank_questions(rows, subject, class_name, teacher=None):
+    """
+    Add question dicts to the bank in one bulk insert, skipping any already there.
+
+    Duplicates are detected by content hash, so re-importing a file or two
+    teachers adding the same item leaves one bank row. Returns the number added.
+    """
+    subject = normalize_subject(subject)
+    items = {}
+    for row in rows:
+        item = BankQuestion(
+            subject=subject,
+            class_name=class_name,
+            topic=(row.get('topic') or '').strip(),
+            question_text=row['question_text'],
+            option_a=row['option_a'],
+            option_b=row['option_b'],
+            option_c=row['option_c'],
+            option_d=row['option_d'],
+            correct_answer=row['correct_answer'],
+            created_by=teacher,
+        )
+        item.content_hash = item.fingerprint()
+        items[item.content_hash] = item
+    existing = set(BankQuestion.objects.filter(content_hash__in=items).values_list('content_hash', flat=True))
+    new_items = [item for content_hash, item in items.items() if content_hash not in existing]
+    BankQuestion.objects.bulk_create(new_items, batch_size=500, ignore_conflicts=True)
+    return len(new_items)
+
+
+def import_bank_questions(uploaded_file, subject, class_name, teacher=None):
+    """Validate a CSV/XLSX upload (with an optional topic column) and add it to the bank"""
+    return add_bank_questions(read_question_file(uploaded_file), subject, class_name, teacher)
+
+
+def _full_text_match(queryset, query):
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    if connection.vendor == 'sqlite':
+        # Each word as a quoted prefix term, so user input cannot inject FTS syntax
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM accounts_bankquestion_fts WHERE accounts_bankquestion_fts MATCH %s', [match]
+        ))
+    if connection.vendor == 'postgresql':
+        # Same expression as the GIN index, so the planner can use it
+        return queryset.alias(matched=RawSQL(
+            "to_tsvector('english', accounts_bankquestion.question_text || ' ' || accounts_bankquestion.topic)"
+            " @@ plainto_tsquery('english', %s)",
+            [query],
+            output_field=BooleanField(),
+        )).filter(matched=True)
+    condition = Q()
+    for word in words:
+        condition &= Q(question_text__icontains=word) | Q(topic__icontains=word)
+    return queryset.filter(condition)
+
+
+def search_bank(query='', subject=None, class_name=None, topic=None):
+    """Bank questions matching the filters (indexed) and full-text query, newest first"""
+    questions = BankQuestion.objects.all()
+    if subject:
+        questions = questions.filter(subject=normalize_subject(subject))
+    if class_name:
+        questions = questions.filter(class_name=class_name)
+    if topic:
+        questions = questions.filter(topic=topic)
+    if query:
+        questions = _full_text_match(questions, query)
+    return questions.order_by('-created_at', '-id')
+
+
+def bank_topics(subject, class_name):
+    """[(topic, question count)] available for a subject and class"""
+    return list(
+        BankQuestion.objects.filter(subject=normalize_subject(subject), class_name=class_name)
+        .values_list('topic').annotate(total=Count('id')).order_by('topic')
+    )
+
+
+def generate_exam_paper(exam, topic_counts):
+    """
+    Add up to N random bank questions per topic to ``exam``.
+
+    ``topic_counts`` maps topic -> N. The sample is one query: a window ranks
+    each topic's candidates in random order and only the first N per topic are
+    returned. Items already on the exam are skipped. The exam's questions
+    reference the bank rows rather than copying them. Returns {topic: added}.
+    """
+    topic_counts = {topic: int(count) for topic, count in topic_counts.items() if int(count) > 0}
+    if not topic_counts:
+        raise BankError('Choose how many questions to take from at least one topic')
+
+    already_used = Question.objects.filter(exam=exam, bank_question__isnull=False).values('bank_question_id')
+    picks = list(
+        BankQuestion.objects.filter(
+            subject=normalize_subject(exam.subject), class_name=exam.class_name, topic__in=topic_counts,
+        )
+        .exclude(id__in=already_used)
+        .annotate(pick=Window(RowNumber(), partition_by=F('topic'), order_by=Random()))
+        .filter(pick__lte=Case(
+            *[When(topic=topic, then=Value(count)) for topic, count in topic_counts.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .order_by('topic', 'pick')
+        .values_list('id', 'topic')
+    )
+    if not picks:
+        raise BankError(f'The bank has no unused {exam.subject} questions for {exam.class_name} in those topics')
+
+    with transaction.atomic():
+        first_number = next_question_number(exam)
+        Question.objects.bulk_create([
+            Question(exam=exam, bank_question_id=bank_id, question_number=first_number + offset)
+            for offset, (bank_id, _) in enumerate(picks)
+        ])
+        bump_snapshot_version(exam.pk)
+    publish_exam_snapshot(exam)
+
+    added = {topic: 0 for topic in topic_counts}
+    for _, topic in picks:
+        added[topic] += 1
+    return added
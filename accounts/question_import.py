@@ -0,0 +1,142 @@
+import csv
+import io
+import os
+
+from django.db import transaction
+
+from .exams import ANSWER_CHOICES, bump_snapshot_version, next_question_number, publish_exam_snapshot
+from .models import Question
+
+
+QUESTION_COLUMNS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+
+# Accepted spellings of the column headers, after lower-casing and replacing spaces
+COLUMN_ALIASES = {
+    'question': 'question_text',
+    'a': 'option_a',
+    'b': 'option_b',
+    'c': 'option_c',
+    'd': 'option_d',
+    'answer': 'correct_answer',
+    'correct': 'correct_answer',
+}
+
+# Stop collecting errors after this many; the file needs fixing either way
+MAX_REPORTED_ERRORS = 20
+
+
+class QuestionImportError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+def _cell(value):
+    """Spreadsheet cell as text; whole-number floats (e.g. 1.0) lose the '.0'"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _column(header):
+    name = str(header or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _csv_rows(uploaded_file):
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(uploaded_file):
+    # Imported here so the rest of the app does not pay for openpyxl at startup
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_question_rows(uploaded_file):
+    """
+    Stream (line_number, row dict) pairs from a CSV or XLSX upload.
+
+    Rows are read one at a time (openpyxl in read-only mode), so memory use
+    does not depend on the size of the file. Blank rows are skipped.
+    """
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(uploaded_file)
+    elif extension == '.xlsx':
+        rows = _xlsx_rows(uploaded_file)
+    else:
+        raise QuestionImportError(['Upload a .csv or .xlsx file'])
+
+    header = [_column(cell) for cell in next(rows, [])]
+    missing = [column for column in QUESTION_COLUMNS if column not in header]
+    if missing:
+        raise QuestionImportError([f"Missing column(s): {', '.join(missing)}"])
+
+    for line_number, values in enumerate(rows, start=2):
+        values = [_cell(value) for value in values]
+        if any(values):
+            yield line_number, dict(zip(header, values))
+
+
+def read_question_file(uploaded_file):
+    """
+    Validate every row of an upload into a list of question dicts
+    (QUESTION_COLUMNS plus an optional ``topic``).
+
+    Raises QuestionImportError listing the bad rows, so callers save all of
+    the file or none of it.
+    """
+    questions, errors = [], []
+    for line_number, row in iter_question_rows(uploaded_file):
+        problems = [f'{column} is empty' for column in QUESTION_COLUMNS[:5] if not row.get(column)]
+        answer = row.get('correct_answer', '').upper()
+        if answer not in ANSWER_CHOICES:
+            problems.append(f'correct_answer must be A, B, C or D (got {row.get("correct_answer")!r})')
+        if problems:
+            errors.append(f"Row {line_number}: {', '.join(problems)}")
+            if len(errors) >= MAX_REPORTED_ERRORS:
+                break
+            continue
+        question = {column: row[column] for column in QUESTION_COLUMNS[:5]}
+        question['correct_answer'] = answer
+        question['topic'] = row.get('topic', '')
+        questions.append(question)
+    if errors:
+        raise QuestionImportError(errors)
+    if not questions:
+        raise QuestionImportError(['The file has no questions'])
+    return questions
+
+
+def import_questions(exam, uploaded_file):
+    """
+    Add every question in an upload to ``exam`` with one bulk insert.
+
+    Nothing is saved unless the whole file is valid. Question numbers carry on
+    from the exam's highest existing number. Returns the number of questions added.
+    """
+    questions = [
+        Question(exam=exam, **{column: row[column] for column in QUESTION_COLUMNS})
+        for row in read_question_file(uploaded_file)
+    ]
+    with transaction.atomic():
+        first_number = next_question_number(exam)
+        for offset, question in enumerate(questions):
+            question.question_number = first_number + offset
+        Question.objects.bulk_create(questions, batch_size=500)
+        # bulk_create skips the signals that retire the old snapshot
+        bump_snapshot_version(exam.pk)
+    publish_exam_snapshot(exam)
+    return len(questions)
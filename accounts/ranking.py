@@ -0,0 +1,216 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Avg, Count, DecimalField, F, Max, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, Rank
+from django.utils import timezone
+
+from .models import Attendance, AttendanceTermRollup, ResultSummary, StaleResult, Student, SubjectGrade, Term
+
+
+TWO_PLACES = Decimal('0.01')
+
+# StaleResult subject for attendance changes, which move only the class-level figures
+ATTENDANCE_PARTITION = '(attendance)'
+# StaleResult subject for a change in who is in the class, which moves every subject's positions
+ALL_SUBJECTS = '(all subjects)'
+
+
+def _to_decimal(value):
+    """Round an aggregate result (Decimal or float depending on backend) to 2dp"""
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(str(value)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def class_attendance_totals(class_name, term):
+    """
+    ({student_id: (times_present, times_absent)}, times_school_opened) for a
+    class over the term's dates. Late counts as present.
+
+    Per-student counts come from one grouped query over the class's
+    Attendance; the days school opened are the materialized term rollup.
+    """
+    if not (term.start_date and term.end_date):
+        return {}, 0
+    rows = (
+        Attendance.objects.filter(student__class_name=class_name, date__range=(term.start_date, term.end_date))
+        .values('student_id')
+        .annotate(
+            present=Count('id', filter=Q(status__in=['Present', 'Late'])),
+            absent=Count('id', filter=Q(status='Absent')),
+        )
+        .order_by()
+    )
+    totals = {row['student_id']: (row['present'], row['absent']) for row in rows}
+    days_open = (
+        AttendanceTermRollup.objects.filter(school_class__name=class_name, term=term)
+        .values_list('days_open', flat=True).first()
+    )
+    return totals, days_open or 0
+
+
+def recompute_class_results(class_name, term, subjects=None):
+    """
+    Recompute class positions, subject averages and subject positions for one
+    class and term using set-based queries.
+
+    Ties share a position (1, 1, 3 ...). Attendance totals for the term are
+    written with the positions. The number of queries is fixed and does
+    not grow with the size of the class or the number of subjects. Pass
+    ``subjects`` to limit the subject averages/positions to those subjects.
+    """
+    score_field = DecimalField(max_digits=7, decimal_places=2)
+
+    with transaction.atomic():
+        if subjects is None:
+            StaleResult.objects.filter(class_name=class_name, term=term).delete()
+
+        # Per-student totals and class position in one grouped query
+        students = list(
+            Student.objects.filter(class_name=class_name)
+            .annotate(
+                score_total=Coalesce(
+                    Sum('subjectgrade__total_score', filter=Q(subjectgrade__term=term)),
+                    Value(Decimal('0')),
+                    output_field=score_field,
+                ),
+                subject_count=Count('subjectgrade', filter=Q(subjectgrade__term=term)),
+            )
+            .annotate(position=Window(Rank(), order_by=F('score_total').desc()))
+            .values('id', 'score_total', 'subject_count', 'position')
+        )
+        total_students = len(students)
+        attendance, times_opened = class_attendance_totals(class_name, term)
+
+        summaries = {
+            s.student_id: s
+            for s in ResultSummary.objects.filter(term=term, student__class_name=class_name)
+        }
+        new_summaries = []
+        for row in students:
+            summary = summaries.get(row['id'])
+            if summary is None:
+                summary = ResultSummary(student_id=row['id'], term=term)
+                new_summaries.append(summary)
+
+            total = _to_decimal(row['score_total'])
+            count = row['subject_count']
+            average = _to_decimal(total / count) if count else Decimal('0.00')
+
+            summary.position_in_class = f"{row['position']}/{total_students}"
+            summary.total_subjects = count
+            summary.score_gained = total
+            summary.average_score = average
+            summary.promotion_status = "PROMOTED" if average >= 50 else "REPEAT"
+            summary.times_school_opened = times_opened
+            summary.times_present, summary.times_absent = attendance.get(row['id'], (0, 0))
+
+        if new_summaries:
+            ResultSummary.objects.bulk_create(new_summaries)
+        existing = [s for s in summaries.values() if s.pk]
+        if existing:
+            ResultSummary.objects.bulk_update(
+                existing,
+                ['position_in_class', 'total_subjects', 'score_gained', 'average_score', 'promotion_status',
+                 'times_school_opened', 'times_present', 'times_absent'],
+            )
+
+        # Subject averages and positions via window functions partitioned by subject
+        grades = SubjectGrade.objects.filter(term=term, student__class_name=class_name)
+        if subjects is not None:
+            grades = grades.filter(subject__in=subjects)
+        grades = list(
+            grades.annotate(
+                subject_average=Window(Avg('total_score'), partition_by=F('subject')),
+                subject_position=Window(
+                    Rank(), partition_by=F('subject'), order_by=F('total_score').desc()
+                ),
+            )
+            .only('id', 'class_average', 'position_in_subject')
+        )
+        changed = []
+        for grade in grades:
+            average = _to_decimal(grade.subject_average)
+            if grade.class_average != average or grade.position_in_subject != grade.subject_position:
+                grade.class_average = average
+                grade.position_in_subject = grade.subject_position
+                changed.append(grade)
+
+        # Only rows whose values moved are written back
+        if changed:
+            SubjectGrade.objects.bulk_update(
+                changed, ['class_average', 'position_in_subject'], batch_size=500
+            )
+
+    return total_students
+
+
+def recompute_term_results(term, class_names=None):
+    """Recompute results for every class (or the given classes) in a term"""
+    if class_names is None:
+        class_names = (
+            Student.objects.order_by('class_name')
+            .values_list('class_name', flat=True)
+            .distinct()
+        )
+    return {name: recompute_class_results(name, term) for name in class_names}
+
+
+def mark_results_stale(class_name, term_id, subjects):
+    """Flag (class, term, subject) partitions as needing a recompute with a single upsert"""
+    StaleResult.objects.bulk_create(
+        [StaleResult(class_name=class_name, term_id=term_id, subject=subject) for subject in subjects],
+        update_conflicts=True,
+        unique_fields=['class_name', 'term', 'subject'],
+        update_fields=['marked_at'],
+    )
+
+
+def mark_class_stale(class_name):
+    """A student joined or left the class: every term it has results for needs re-ranking"""
+    term_ids = (
+        ResultSummary.objects.filter(student__class_name=class_name)
+        .order_by().values_list('term_id', flat=True).distinct()
+    )
+    for term_id in term_ids:
+        mark_results_stale(class_name, term_id, [ALL_SUBJECTS])
+
+
+def refresh_stale_results(class_name, term):
+    """Recompute a class only if some of its partitions are stale. Returns True if it ran."""
+    with transaction.atomic():
+        stale = StaleResult.objects.filter(class_name=class_name, term=term)
+        subjects = list(stale.values_list('subject', flat=True))
+        if not subjects:
+            return False
+        # Markers are cleared before recomputing so a concurrent save re-flags the class
+        stale.delete()
+        recompute_class_results(class_name, term, subjects=None if ALL_SUBJECTS in subjects else subjects)
+    return True
+
+
+def refresh_all_stale(settle_seconds=0):
+    """
+    Background pass over every stale class/term. Partitions touched within the
+    last ``settle_seconds`` are left alone so an active grading session is
+    recomputed once it goes quiet rather than on every save.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    pending = (
+        StaleResult.objects.values('class_name', 'term_id')
+        .annotate(last_marked=Max('marked_at'))
+        .filter(last_marked__lte=cutoff)
+    )
+    refreshed = []
+    for row in pending:
+        term = Term.objects.get(id=row['term_id'])
+        if refresh_stale_results(row['class_name'], term):
+            refreshed.append((row['class_name'], term))
+    return refreshed
+
+
+def get_default_term():
+    """Current term, falling back to the most recently created one"""
+    return Term.objects.filter(is_current=True).first() or Term.objects.order_by('-created_at').first()
@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .attendance import (
+    rebuild_attendance_bitmaps, rebuild_term_rollups, record_attendance_bits, refresh_attendance_rollups,
+    term_for_date,
+)
+from .classes import invalidate_rosters
+from .exams import bump_bank_question_exams, bump_snapshot_version, freeze_bank_question
+from .fees import recompute_fee_account
+from .grading import clear_grade_bands_cache
+from .models import (
+    ActivityLog, Attendance, BankQuestion, Exam, ExamSubmission, FeeRecord, GradeBoundary, Question, SchoolClass,
+    Student, SubjectGrade, Teacher, Term,
+)
+from .ranking import mark_class_stale, mark_results_stale
+from .stats import (
+    add_activity, add_fee_record, adjust_headcount, invalidate_fee_totals, invalidate_recent_activity,
+)
+from .student_feed import invalidate_class_feeds, invalidate_student_feeds
+
+
+@receiver(post_save, sender=SubjectGrade)
+@receiver(post_delete, sender=SubjectGrade)
+def subject_grade_changed(sender, instance, **kwargs):
+    """A saved or deleted grade invalidates its (class, term, subject) partition"""
+    try:
+        class_name = instance.student.class_name
+    except Student.DoesNotExist:
+        return
+    mark_results_stale(class_name, instance.term_id, [instance.subject])
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    bump_snapshot_version(instance.exam_id)
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_class_feeds(instance.school_class_id)
+
+
+@receiver(post_save, sender=ExamSubmission)
+@receiver(post_delete, sender=ExamSubmission)
+def exam_submission_changed(sender, instance, **kwargs):
+    invalidate_student_feeds([instance.student_id])
+
+
+@receiver(pre_save, sender=BankQuestion)
+def bank_question_changing(sender, instance, **kwargs):
+    if instance.pk:
+        freeze_bank_question(instance.pk)
+
+
+@receiver(post_save, sender=BankQuestion)
+def bank_question_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_bank_question_exams(instance.pk)
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, **kwargs):
+    term = term_for_date(instance.date)
+    record_attendance_bits(instance.date, {instance.student_id: instance.status}, term)
+    refresh_attendance_rollups(instance.school_class_id, instance.date, term)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    term = term_for_date(instance.date)
+    record_attendance_bits(instance.date, {instance.student_id: None}, term)
+    refresh_attendance_rollups(instance.school_class_id, instance.date, term)
+
+
+@receiver(pre_save, sender=Term)
+def term_dates_changing(sender, instance, **kwargs):
+    old = Term.objects.filter(pk=instance.pk).values_list('start_date', 'end_date').first()
+    instance._attendance_dates_changed = old != (instance.start_date, instance.end_date)
+
+
+@receiver(post_save, sender=Term)
+def term_saved(sender, instance, **kwargs):
+    # Bitmap bits are counted from start_date and rollups cover start..end, so new dates mean rebuilding
+    if getattr(instance, '_attendance_dates_changed', False) and instance.start_date and instance.end_date:
+        rebuild_attendance_bitmaps(instance)
+        rebuild_term_rollups(instance)
+
+
+@receiver(post_save, sender=GradeBoundary)
+@receiver(post_delete, sender=GradeBoundary)
+def grade_boundary_changed(sender, instance, **kwargs):
+    clear_grade_bands_cache()
+
+
+@receiver(post_save, sender=SchoolClass)
+@receiver(post_delete, sender=SchoolClass)
+def school_class_changed(sender, instance, **kwargs):
+    cache.delete(SchoolClass.ID_MAP_CACHE_KEY)
+    invalidate_rosters()
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    invalidate_rosters()
+
+
+@receiver(pre_save, sender=Student)
+def student_class_changing(sender, instance, **kwargs):
+    instance._previous_class_name = (
+        Student.objects.filter(pk=instance.pk).values_list('class_name', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    """Joining or leaving a class changes its positions and their denominators"""
+    previous = getattr(instance, '_previous_class_name', None)
+    if created or previous != instance.class_name:
+        mark_class_stale(instance.class_name)
+        if previous:
+            mark_class_stale(previous)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    mark_class_stale(instance.class_name)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def person_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_headcount(sender, 1)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def person_deleted(sender, instance, **kwargs):
+    adjust_headcount(sender, -1)
+
+
+@receiver(post_save, sender=FeeRecord)
+def fee_record_saved(sender, instance, created, **kwargs):
+    if created and hasattr(instance, 'outstanding_change'):
+        add_fee_record(instance)
+        return
+    # A corrected payment (or one loaded raw, e.g. from a fixture): replay its account
+    recompute_fee_account(instance.account_id)
+    if getattr(instance, 'previous_account_id', None):
+        recompute_fee_account(instance.previous_account_id)
+    invalidate_fee_totals()
+
+
+@receiver(post_delete, sender=FeeRecord)
+def fee_record_deleted(sender, instance, **kwargs):
+    recompute_fee_account(instance.account_id)
+    invalidate_fee_totals()
+
+
+@receiver(post_save, sender=ActivityLog)
+def activity_saved(sender, instance, created, **kwargs):
+    if created:
+        add_activity(instance)
+    else:
+        invalidate_recent_activity(instance.performed_by_type)
+
+
+@receiver(post_delete, sender=ActivityLog)
+def activity_deleted(sender, instance, **kwargs):
+    invalidate_recent_activity(instance.performed_by_type)
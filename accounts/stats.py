@@ -0,0 +1,96 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from .models import ActivityLog, FeeAccount, Student, Teacher
+
+
+# Safety net for per-process caches (locmem): signal-driven updates only
+# reach the process that handled the write, so entries also expire
+STATS_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 300)
+
+HEADCOUNT_KEYS = {Student: 'stats:count:students', Teacher: 'stats:count:teachers'}
+FEE_TOTALS_KEY = 'stats:fee_totals'
+RECENT_ACTIVITY_LIMIT = 20
+
+
+def _count(model):
+    key = HEADCOUNT_KEYS[model]
+    count = cache.get(key)
+    if count is None:
+        count = model.objects.count()
+        cache.set(key, count, STATS_TIMEOUT)
+    return count
+
+
+def get_headcounts():
+    """Student and teacher totals"""
+    return {'students': _count(Student), 'teachers': _count(Teacher)}
+
+
+def adjust_headcount(model, delta):
+    """Apply +1/-1 to a cached count; a missing entry is simply recounted on next read"""
+    try:
+        cache.incr(HEADCOUNT_KEYS[model], delta)
+    except ValueError:
+        pass
+
+
+def get_fee_totals():
+    """
+    Total paid and total outstanding, in one aggregate over the fee accounts
+    (one row per student, term and fee type rather than per instalment)
+    """
+    totals = cache.get(FEE_TOTALS_KEY)
+    if totals is None:
+        sums = FeeAccount.objects.aggregate(paid=Sum('amount_paid'), balance=Sum('balance', filter=Q(balance__gt=0)))
+        totals = {'paid': sums['paid'] or Decimal('0'), 'balance': sums['balance'] or Decimal('0')}
+        cache.set(FEE_TOTALS_KEY, totals, STATS_TIMEOUT)
+    return totals
+
+
+def add_fee_record(record):
+    """Fold a newly posted payment into the cached totals"""
+    totals = cache.get(FEE_TOTALS_KEY)
+    if totals is not None:
+        totals = {
+            'paid': totals['paid'] + Decimal(str(record.amount_paid)),
+            'balance': totals['balance'] + record.outstanding_change,
+        }
+        cache.set(FEE_TOTALS_KEY, totals, STATS_TIMEOUT)
+
+
+def invalidate_fee_totals():
+    cache.delete(FEE_TOTALS_KEY)
+
+
+def _activity_key(performed_by_type):
+    return f"stats:activity:{performed_by_type or 'all'}"
+
+
+def get_recent_activity(performed_by_type=None):
+    """Latest activity log entries, optionally for one role"""
+    key = _activity_key(performed_by_type)
+    activities = cache.get(key)
+    if activities is None:
+        activities = ActivityLog.objects.all()
+        if performed_by_type:
+            activities = activities.filter(performed_by_type=performed_by_type)
+        activities = list(activities[:RECENT_ACTIVITY_LIMIT])
+        cache.set(key, activities, STATS_TIMEOUT)
+    return activities
+
+
+def add_activity(log):
+    """Prepend a new log entry to the cached feeds it belongs to"""
+    for performed_by_type in (None, log.performed_by_type):
+        key = _activity_key(performed_by_type)
+        activities = cache.get(key)
+        if activities is not None:
+            cache.set(key, [log] + activities[:RECENT_ACTIVITY_LIMIT - 1], STATS_TIMEOUT)
+
+
+def invalidate_recent_activity(performed_by_type=None):
+    cache.delete_many([_activity_key(None), _activity_key(performed_by_type)])
@@ -0,0 +1,119 @@
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, FilteredRelation, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Exam, Question
+from .stats import STATS_TIMEOUT
+
+
+FEED_TIMEOUT = 60 * 60
+
+# One exam as the student dashboard shows it; the submission fields are None until graded
+FeedExam = namedtuple('FeedExam', [
+    'id', 'exam_id', 'title', 'subject', 'duration_minutes', 'question_count',
+    'submission_id', 'score', 'correct_answers', 'total_questions', 'submitted_at',
+])
+StudentFeed = namedtuple('StudentFeed', ['available', 'pending', 'completed'])
+
+
+def _feed_key(student_id):
+    return f'dashboard:student_feed:{student_id}'
+
+
+def _class_version_key(class_id):
+    return f'dashboard:class_feed_version:{class_id}'
+
+
+def _class_version(class_id):
+    # Expires so processes that missed an exam change catch up within
+    # STATS_TIMEOUT; restarts from the clock so old feeds never match again
+    key = _class_version_key(class_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, STATS_TIMEOUT)
+    return version
+
+
+def invalidate_class_feeds(class_id):
+    """An exam for the class was created, changed or removed: every feed in it is stale"""
+    try:
+        cache.incr(_class_version_key(class_id))
+    except ValueError:
+        cache.set(_class_version_key(class_id), time.time_ns(), STATS_TIMEOUT)
+
+
+def invalidate_exam_feeds(exam_id):
+    """Drop the feeds of the class an exam belongs to, e.g. after its questions change"""
+    class_id = Exam.objects.filter(pk=exam_id).values_list('school_class_id', flat=True).first()
+    invalidate_class_feeds(class_id)
+
+
+def invalidate_student_feeds(student_ids):
+    """The students submitted (or had a submission graded or removed)"""
+    cache.delete_many([_feed_key(student_id) for student_id in student_ids])
+
+
+def build_student_feed(student):
+    """
+    Available, pending and completed exams for a student from one query.
+
+    The student's submission and submitted attempt are LEFT JOINed onto the
+    exams (both are unique per student and exam) and the question count is a
+    correlated subquery, so there is no per-exam fan-out.
+    """
+    question_count = (
+        Question.objects.filter(exam=OuterRef('pk')).order_by().values('exam').annotate(total=Count('id'))
+        .values('total')
+    )
+    mine = Q(my_submission__id__isnull=False) | Q(my_attempt__submitted_at__isnull=False)
+    if student.school_class_id is not None:
+        mine |= Q(school_class_id=student.school_class_id, is_active=True)
+    rows = (
+        Exam.objects.annotate(
+            my_submission=FilteredRelation('examsubmission', condition=Q(examsubmission__student_id=student.pk)),
+            my_attempt=FilteredRelation('attempts', condition=Q(attempts__student_id=student.pk)),
+            question_count=Coalesce(Subquery(question_count, output_field=IntegerField()), 0),
+        )
+        .filter(mine)
+        .order_by('id')
+        .values_list(
+            'id', 'exam_id', 'title', 'subject', 'duration_minutes', 'question_count',
+            'my_submission__id', 'my_submission__score', 'my_submission__correct_answers',
+            'my_submission__total_questions', 'my_submission__submitted_at', 'my_attempt__submitted_at',
+        )
+    )
+    available, pending, completed = [], [], []
+    for *fields, submission_submitted_at, attempt_submitted_at in rows:
+        if fields[6] is not None:
+            completed.append(FeedExam(*fields, submission_submitted_at))
+        elif attempt_submitted_at is not None:
+            pending.append(FeedExam(*fields, attempt_submitted_at))
+        else:
+            available.append(FeedExam(*fields, None))
+    completed.sort(key=lambda exam: exam.submitted_at, reverse=True)
+    pending.sort(key=lambda exam: exam.submitted_at, reverse=True)
+    return StudentFeed(available, pending, completed)
+
+
+def get_student_feed(student):
+    """
+    The student's dashboard feed, cached per student and class.
+
+    The entry records the class and that class's feed version it was built
+    for, so a class move or any exam change for the class rebuilds it, and
+    the student's own submissions delete it. A feed with attempts waiting to
+    be graded is not cached: the grading worker's invalidation may not reach
+    this process's cache, and the result should show as soon as it exists.
+    """
+    version = _class_version(student.school_class_id)
+    entry = cache.get(_feed_key(student.pk))
+    if entry is not None and entry[:2] == (student.school_class_id, version):
+        return entry[2]
+    feed = build_student_feed(student)
+    if not feed.pending:
+        cache.set(_feed_key(student.pk), (student.school_class_id, version, feed), FEED_TIMEOUT)
+    return feed
@@ -1,3 +1,1539 @@
+import io
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import ProtectedError
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+
+from .grading import bulk_upsert_grades, compute_grades, recompute_term_grades
+from .attendance import (
+    AttendanceError, attendance_stats, class_attendance_summary, mark_class_attendance, rebuild_attendance_bitmaps,
+    rebuild_attendance_rollups, set_day, student_term_attendance,
+)
+from .classes import ROSTER_VERSION_KEY, get_class_names, get_class_roster
+from .pagination import keyset_paginate
+from .stats import get_fee_totals, get_headcounts, get_recent_activity
+from .student_feed import get_student_feed
+from .exports import _columnar_file, read_columnar_export
+from .fees import fee_debtors
+from .item_analysis import analyse_exam
+from .question_bank import BankError, add_bank_questions, generate_exam_paper, search_bank
+from .question_import import QuestionImportError, import_questions
+from .grading_queue import claim_grading_tasks, enqueue_attempt, enqueue_expired_attempts, process_grading_batch
+from .exams import (
+    DuplicateSubmission, bump_snapshot_version, clear_local_snapshots, get_exam_snapshot, grade_submission,
+    student_paper,
+)
+from .models import (
+    AcademicSession, ActivityLog, Admin, Attendance, AttendanceBitmap, AttendanceDailyRollup, AttendanceTermRollup,
+    BankQuestion, Bursar, Exam, ExamAttempt, ExamSubmission, FeeAccount, FeeRecord,
+    GradeBoundary, GradingTask, Principal, Question, ResultSummary, SchoolClass, StaleResult, Student, StudentAnswer, SubjectGrade, Teacher,
+    Term,
+)
+from .ranking import recompute_class_results, refresh_stale_results
+
+
+class CacheClearingTestCase(TestCase):
+    """Cached lookups (grade bands, class ids, rosters) must not leak between tests"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_snapshots()
+        self.addCleanup(cache.clear)
+        self.addCleanup(clear_local_snapshots)
+
+
+def make_student(name, class_name='JSS1'):
+    user = User.objects.create(username=name.replace(' ', '').lower())
+    return Student.objects.create(user=user, full_name=name, class_name=class_name)
+
+
+def make_teacher(name='Mr Teacher'):
+    user = User.objects.create(username=name.replace(' ', '').lower())
+    return Teacher.objects.create(user=user, full_name=name, email='t@example.com', phone='0800', subject='MATHEMATICS')
+
+
+def make_term():
+    session = AcademicSession.objects.create(session_name='2024/2025', is_current=True)
+    return Term.objects.create(session=session, term='First', is_current=True)
+
+
+class RankingTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.term = make_term()
+
+    def grade(self, student, subject, exam):
+        return SubjectGrade.objects.create(student=student, term=self.term, subject=subject, exam=exam)
+
+    def test_positions_share_rank_on_ties(self):
+        ada, bola, chidi = (make_student(n) for n in ['Ada A', 'Bola B', 'Chidi C'])
+        self.grade(ada, 'MATHEMATICS', 100)
+        self.grade(bola, 'MATHEMATICS', 100)
+        self.grade(chidi, 'MATHEMATICS', 50)
+
+        recompute_class_results('JSS1', self.term)
+
+        positions = dict(ResultSummary.objects.values_list('student__full_name', 'position_in_class'))
+        self.assertEqual(positions, {'Ada A': '1/3', 'Bola B': '1/3', 'Chidi C': '3/3'})
+        grade = SubjectGrade.objects.get(student=chidi)
+        self.assertEqual(grade.position_in_subject, 3)
+        self.assertEqual(grade.class_average, Decimal('58.33'))
+
+    def test_query_count_is_independent_of_class_size(self):
+        def run(size, class_name):
+            for i in range(size):
+                student = make_student(f'{class_name} {i}', class_name)
+                for subject in ['ENGLISH LANGUAGE', 'MATHEMATICS', 'BASIC SCIENCE']:
+                    self.grade(student, subject, 40 + i)
+            with CaptureQueriesContext(connection) as ctx:
+                recompute_class_results(class_name, self.term)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run(3, 'JSS2'), run(12, 'JSS3'))
+
+    def test_attendance_totals_written_with_positions(self):
+        self.term.start_date, self.term.end_date = date(2025, 1, 6), date(2025, 4, 4)
+        self.term.save()
+        ada, bola = make_student('Ada A'), make_student('Bola B')
+        self.grade(ada, 'MATHEMATICS', 80)
+        mark_class_attendance('JSS1', date(2025, 1, 6), {ada.id: 'Present', bola.id: 'Absent'})
+        mark_class_attendance('JSS1', date(2025, 1, 7), {ada.id: 'Late', bola.id: 'Present'})
+        mark_class_attendance('JSS1', date(2025, 1, 8), {ada.id: 'Absent', bola.id: 'Present'})
+        # Outside the term
+        mark_class_attendance('JSS1', date(2025, 5, 5), {bola.id: 'Absent'})
+        ResultSummary.objects.create(student=bola, term=self.term)
+
+        recompute_class_results('JSS1', self.term)
+
+        totals = {s.student.full_name: (s.times_school_opened, s.times_present, s.times_absent)
+                  for s in ResultSummary.objects.select_related('student')}
+        self.assertEqual(totals, {'Ada A': (3, 2, 1), 'Bola B': (3, 2, 1)})
+
+    def test_joining_moving_and_leaving_re_rank_the_class(self):
+        ada, bola = make_student('Ada A'), make_student('Bola B')
+        self.grade(ada, 'MATHEMATICS', 80)
+        self.grade(bola, 'MATHEMATICS', 60)
+        recompute_class_results('JSS1', self.term)
+
+        def positions():
+            refresh_stale_results('JSS1', self.term)
+            return dict(ResultSummary.objects.filter(student__class_name='JSS1')
+                        .values_list('student__full_name', 'position_in_class'))
+
+        chidi = make_student('Chidi C')
+        self.assertEqual(positions(), {'Ada A': '1/3', 'Bola B': '2/3', 'Chidi C': '3/3'})
+        chidi.class_name = 'JSS2'
+        chidi.save()
+        self.assertEqual(positions(), {'Ada A': '1/2', 'Bola B': '2/2'})
+        ada.user.delete()
+        self.assertEqual(positions(), {'Bola B': '1/1'})
+        self.assertEqual(SubjectGrade.objects.get(student=bola).position_in_subject, 1)
+
+    def test_attendance_left_at_zero_without_term_dates(self):
+        ada = make_student('Ada A')
+        Attendance.objects.create(student=ada, class_name='JSS1', date=date(2025, 1, 6), status='Present')
+        recompute_class_results('JSS1', self.term)
+        self.assertEqual(ResultSummary.objects.get(student=ada).times_present, 0)
+
+    def test_saving_grade_marks_partition_stale_until_refreshed(self):
+        ada = make_student('Ada A')
+        self.grade(ada, 'MATHEMATICS', 80)
+        self.assertTrue(StaleResult.objects.filter(class_name='JSS1', term=self.term, subject='MATHEMATICS').exists())
+
+        self.assertTrue(refresh_stale_results('JSS1', self.term))
+        self.assertFalse(StaleResult.objects.exists())
+        self.assertEqual(ResultSummary.objects.get(student=ada).position_in_class, '1/1')
+
+        # Nothing stale: reading the report does not recompute
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(refresh_stale_results('JSS1', self.term))
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+
+class BulkGradeEntryTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.term = make_term()
+        self.teacher = make_teacher()
+        self.students = [make_student(f'Student {i}') for i in range(3)]
+
+    def test_vectorized_grades_match_calculate_totals(self):
+        scores = [(100, 100, 100, 100), (50, 60, 70, 40), (0, 0, 0, 57), (80, 80, 80, 79.99)]
+        total_ca, total_score, grades, remarks = compute_grades(*zip(*scores))
+        for i, (t1, t2, t3, exam) in enumerate(scores):
+            grade = SubjectGrade(test_1=Decimal(t1), test_2=Decimal(t2), test_3=Decimal(t3), exam=Decimal(str(exam)))
+            grade.calculate_totals()
+            self.assertAlmostEqual(float(grade.total_score), total_score[i], places=2)
+            self.assertEqual((grade.grade, grade.remark), (grades[i], remarks[i]))
+
+    def test_rounding_boundary_bands_the_same_on_every_path(self):
+        # 10 + 42.85 * 0.7 = 39.995, which rounds half up to 40.00 (E), not 39.99 (F)
+        saved = SubjectGrade.objects.create(student=self.students[0], term=self.term, subject='MATHEMATICS',
+                                            test_1=100, exam=Decimal('42.85'))
+        bulk_upsert_grades(self.term, [{'student_id': self.students[1].id, 'subject': 'MATHEMATICS',
+                                        'test_1': 100, 'exam': 42.85}])
+        saved.refresh_from_db()
+        bulk = SubjectGrade.objects.get(student=self.students[1])
+        self.assertEqual((saved.total_score, saved.grade, saved.remark), (Decimal('40.00'), 'E', 'POOR'))
+        self.assertEqual((bulk.total_score, bulk.grade, bulk.remark), (saved.total_score, saved.grade, saved.remark))
+
+    def test_upsert_inserts_then_updates_in_place(self):
+        rows = [{'student_id': s.id, 'subject': 'MATHEMATICS', 'exam': 90} for s in self.students]
+        self.assertEqual(bulk_upsert_grades(self.term, rows, teacher=self.teacher), 3)
+        rows[0]['exam'] = 30
+        with CaptureQueriesContext(connection) as ctx:
+            bulk_upsert_grades(self.term, rows, teacher=self.teacher, class_name='JSS1')
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+
+        self.assertEqual(SubjectGrade.objects.count(), 3)
+        grade = SubjectGrade.objects.get(student=self.students[0])
+        self.assertEqual((grade.total_score, grade.grade), (Decimal('21.00'), 'F'))
+
+    def test_json_endpoint_rejects_students_outside_class(self):
+        self.client.force_login(self.teacher.user)
+        outsider = make_student('Outsider', class_name='JSS2')
+        payload = {
+            'class_name': 'JSS1',
+            'term_id': self.term.id,
+            'grades': [{'student_id': outsider.id, 'subject': 'MATHEMATICS', 'exam': 50}],
+        }
+        response = self.client.post(reverse('bulk_grade_entry'), payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SubjectGrade.objects.exists())
+
+        payload['grades'][0]['student_id'] = self.students[0].id
+        response = self.client.post(reverse('bulk_grade_entry'), payload, content_type='application/json')
+        self.assertEqual(response.json(), {'saved': 1})
+
+    def test_json_endpoint_rejects_malformed_payloads(self):
+        self.client.force_login(self.teacher.user)
+        for payload in ([1, 2], '"grades"', {'term_id': self.term.id, 'grades': {'student_id': 1}},
+                        {'term_id': self.term.id, 'grades': ['row']}):
+            response = self.client.post(reverse('bulk_grade_entry'), payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+
+
+class GradingScaleTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.term = make_term()
+
+    def test_term_recompute_in_one_update_matches_scalar(self):
+        scores = [(100, 90, 80, 75.5), (33.33, 0, 10, 49), (50, 50, 50, 50)]
+        for i, (t1, t2, t3, exam) in enumerate(scores):
+            SubjectGrade.objects.create(student=make_student(f'S {i}'), term=self.term, subject='MATHEMATICS',
+                                        test_1=t1, test_2=t2, test_3=t3, exam=exam)
+        expected = {g.id: (g.total_ca, g.total_score, g.grade, g.remark) for g in SubjectGrade.objects.all()}
+        SubjectGrade.objects.update(grade='', remark='')
+
+        self.assertEqual(recompute_term_grades(self.term), 3)
+        for grade in SubjectGrade.objects.all():
+            self.assertEqual((grade.total_ca, grade.total_score, grade.grade, grade.remark), expected[grade.id])
+
+    def test_queryset_update_keeps_generated_totals_and_grade_consistent(self):
+        grade = SubjectGrade.objects.create(student=make_student('Ada A'), term=self.term, subject='MATHEMATICS',
+                                            test_1=50, test_2=50, test_3=50, exam=40)
+        self.assertEqual((grade.total_ca, grade.total_score, grade.grade), (Decimal('15.00'), Decimal('43.00'), 'E'))
+
+        SubjectGrade.objects.filter(id=grade.id).update(exam=100)
+        grade.refresh_from_db()
+        self.assertEqual((grade.total_score, grade.grade, grade.remark), (Decimal('85.00'), 'A', 'EXCELLENT'))
+
+    def test_configured_boundaries_replace_defaults(self):
+        GradeBoundary.objects.create(min_score=45, grade='P', remark='PASS')
+        GradeBoundary.objects.create(min_score=0, grade='F', remark='FAIL')
+        grade = SubjectGrade.objects.create(student=make_student('Ada A'), term=self.term, subject='MATHEMATICS', exam=70)
+        self.assertEqual((grade.total_score, grade.grade), (Decimal('49.00'), 'P'))
+        self.assertEqual(list(compute_grades([0], [0], [0], [70])[2]), ['P'])
+
+
+class HotPathIndexTests(CacheClearingTestCase):
+    """Each dashboard query must be answered from an index, not a full scan or sort"""
+
+    def assertUsesIndex(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would always seq scan; ask whether an index plan exists
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan, plan)
+            self.assertNotIn('Sort', plan, plan)
+            self.assertIn('Index', plan, plan)
+        else:
+            plan = queryset.explain()
+            self.assertNotRegex(plan, r'SCAN accounts_\w+$|SCAN accounts_\w+\n', plan)
+            self.assertNotIn('TEMP B-TREE', plan, plan)
+            self.assertIn('INDEX', plan, plan)
+
+    def test_dashboard_queries_use_indexes(self):
+        term = make_term()
+        querysets = [
+            Student.objects.filter(class_name='JSS1').order_by('full_name'),
+            Student.objects.order_by('-created_at', '-id')[:26],
+            Teacher.objects.order_by('-created_at', '-id')[:26],
+            Student.objects.filter(school_class_id=1).order_by('full_name'),
+            Exam.objects.filter(school_class_id=1, is_active=True),
+            Attendance.objects.order_by('-date'),
+            Attendance.objects.filter(school_class_id=1).order_by('-date'),
+            Attendance.objects.filter(date='2025-01-06').order_by('-date'),
+            SubjectGrade.objects.filter(term=term, subject='MATHEMATICS'),
+            FeeRecord.objects.order_by('-payment_date'),
+            ActivityLog.objects.all()[:20],
+            ActivityLog.objects.filter(performed_by_type='bursar')[:20],
+        ]
+        for queryset in querysets:
+            with self.subTest(query=str(queryset.query)):
+                self.assertUsesIndex(queryset)
+
+
+class SchoolClassTests(CacheClearingTestCase):
+    def test_student_save_links_class_and_roster_is_cached(self):
+        ada = make_student('Ada A', 'JSS1')
+        make_student('Bola B', 'JSS1')
+        self.assertEqual(ada.school_class.name, 'JSS1')
+        self.assertIn('JSS1', get_class_names())
+
+        self.assertEqual([s.full_name for s in get_class_roster('JSS1')], ['Ada A', 'Bola B'])
+        with self.assertNumQueries(0):
+            get_class_names()
+            get_class_roster('JSS1')
+
+        # Moving a student invalidates every roster
+        ada.class_name = 'JSS2'
+        ada.save()
+        self.assertEqual([s.full_name for s in get_class_roster('JSS1')], ['Bola B'])
+        self.assertEqual(ada.school_class_id, SchoolClass.objects.get(name='JSS2').id)
+
+
+    def test_expired_version_never_revives_an_older_roster(self):
+        make_student('Ada A', 'JSS1')
+        get_class_roster('JSS1')
+        # Another process registers a student: this process never sees the bump,
+        # but its version key expires after STATS_TIMEOUT
+        Student.objects.filter(full_name='Ada A').update(full_name='Ada Z')
+        cache.delete(ROSTER_VERSION_KEY)
+        self.assertEqual([s.full_name for s in get_class_roster('JSS1')], ['Ada Z'])
+
+    def test_unknown_class_matches_no_classless_rows(self):
+        ada = make_student('Ada A')
+        Student.objects.filter(pk=ada.pk).update(school_class=None)  # a row from before classes were linked
+        exam = Exam.objects.create(title='Loose', subject='MATHEMATICS', class_name='JSS1', created_by=make_teacher())
+        Exam.objects.filter(pk=exam.pk).update(school_class=None)
+        ada.refresh_from_db()
+
+        self.assertEqual(get_student_feed(ada).available, [])
+        self.assertEqual(class_attendance_summary('JSS9', make_term()), (None, [], []))
+
+        user = User.objects.create(username='admin1')
+        Admin.objects.create(user=user, full_name='Admin One')
+        self.client.force_login(user)
+        response = self.client.get(reverse('admin_dashboard'), {'student_class': 'JSS9'})
+        self.assertEqual(list(response.context['students']), [])
+
+
+class DashboardPaginationTests(CacheClearingTestCase):
+    def test_keyset_pages_walk_forward_and_back_without_gaps(self):
+        for i in range(7):
+            make_student(f'Student {i}')
+        newest_first = list(Student.objects.order_by('-created_at', '-id'))
+
+        seen, after, pages = [], None, []
+        while True:
+            page = keyset_paginate(Student.objects.all(), after=after, page_size=3)
+            pages.append(page)
+            seen.extend(page.rows)
+            if not page.next_cursor:
+                break
+            after = page.next_cursor
+        self.assertEqual(seen, newest_first)
+        self.assertEqual(len(pages), 3)
+
+        back = keyset_paginate(Student.objects.all(), before=pages[2].prev_cursor, page_size=3)
+        self.assertEqual(back.rows, pages[1].rows)
+        self.assertEqual(keyset_paginate(Student.objects.all(), after='garbage', page_size=3).rows, newest_first[:3])
+
+    def test_admin_dashboard_query_count_does_not_grow_with_enrollment(self):
+        user = User.objects.create(username='admin1')
+        Admin.objects.create(user=user, full_name='Admin One')
+        self.client.force_login(user)
+
+        def dashboard_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('admin_dashboard'), {'student_class': 'JSS1'})
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        make_student('First Student')
+        dashboard_queries()  # warm the cached headcounts and class map
+        small = dashboard_queries()
+        for i in range(40):
+            make_student(f'Student {i}')
+        dashboard_queries()
+        self.assertEqual(dashboard_queries(), small)
+
+
+class DashboardStatsCacheTests(CacheClearingTestCase):
+    def test_totals_are_cached_and_kept_current_by_signals(self):
+        student = make_student('Ada A')
+        self.assertEqual(get_headcounts(), {'students': 1, 'teachers': 0})
+        self.assertEqual(get_fee_totals()['paid'], 0)
+        self.assertEqual(get_recent_activity('bursar'), [])
+
+        FeeRecord.objects.create(student=student, total_fee=1000, amount_paid=400, fee_type='Tuition',
+                                 payment_date='2025-01-06', payment_method='Cash')
+        log = ActivityLog.objects.create(action='fee_recorded', description='Paid', performed_by_type='bursar',
+                                         performed_by_name='Bursar')
+        make_student('Bola B')
+
+        with self.assertNumQueries(0):
+            totals = get_fee_totals()
+            counts = get_headcounts()
+            activity = get_recent_activity('bursar')
+        self.assertEqual((totals['paid'], totals['balance']), (Decimal('400'), Decimal('600')))
+        self.assertEqual(counts['students'], 2)
+        self.assertEqual(activity, [log])
+
+        student.user.delete()
+        self.assertEqual(get_headcounts()['students'], 1)
+        self.assertEqual(get_fee_totals()['paid'], 0)
+
+
+class FeeLedgerTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.term = make_term()
+        self.student = make_student('Ada A')
+
+    def pay(self, amount, total_fee=1000, fee_type='Tuition', student=None, term=None):
+        return FeeRecord.objects.create(student=student or self.student, term=term or self.term, total_fee=total_fee,
+                                        amount_paid=amount, fee_type=fee_type, payment_date='2025-01-06',
+                                        payment_method='Cash')
+
+    def test_instalments_share_one_account_with_a_running_balance(self):
+        first, second = self.pay(400), self.pay(300)
+        self.assertEqual((first.balance, second.balance), (Decimal('600'), Decimal('300')))
+        account = FeeAccount.objects.get()
+        self.assertEqual((account.amount_paid, account.balance, account.is_balanced),
+                         (Decimal('700'), Decimal('300'), False))
+        self.assertEqual(set(account.payments.all()), {first, second})
+
+        self.pay(300)
+        self.assertTrue(FeeAccount.objects.get().is_balanced)
+
+    def test_totals_count_each_account_once(self):
+        get_fee_totals()  # cached, then folded into by each payment
+        self.pay(400)
+        self.pay(300)
+        self.pay(600, total_fee=500, fee_type='Uniform')  # overpaid: credit, not negative debt
+        with self.assertNumQueries(0):
+            cached = get_fee_totals()
+        cache.clear()
+        fresh = get_fee_totals()
+        self.assertEqual(cached, fresh)
+        self.assertEqual((fresh['paid'], fresh['balance']), (Decimal('1300'), Decimal('300')))
+
+    def test_corrections_replay_the_account(self):
+        first, second = self.pay(400), self.pay(300)
+        first.amount_paid = 500
+        first.save()
+        second.refresh_from_db()
+        self.assertEqual((second.balance, FeeAccount.objects.get().balance), (Decimal('200'), Decimal('200')))
+        self.assertEqual(get_fee_totals()['balance'], Decimal('200'))
+
+        first.delete()
+        self.assertEqual(FeeAccount.objects.get().balance, Decimal('700'))
+        second.delete()
+        self.assertFalse(FeeAccount.objects.exists())
+        self.assertEqual(get_fee_totals()['balance'], 0)
+
+    def test_debtors_largest_balance_first(self):
+        bola, chidi = make_student('Bola B'), make_student('Chidi C')
+        self.pay(900)
+        self.pay(200, student=bola)
+        self.pay(1000, student=chidi)
+        other_term = Term.objects.create(session=self.term.session, term='Second')
+        self.pay(500, student=chidi, term=other_term)
+
+        with self.assertNumQueries(1):
+            debtors = [(account.student.full_name, account.balance) for account in fee_debtors()]
+        self.assertEqual(debtors, [('Bola B', Decimal('800')), ('Chidi C', Decimal('500')), ('Ada A', Decimal('100'))])
+        self.assertEqual([account.student.full_name for account in fee_debtors(self.term)], ['Bola B', 'Ada A'])
+
+    def test_payments_without_a_term_share_one_account(self):
+        FeeRecord.objects.create(student=self.student, total_fee=1000, amount_paid=400, fee_type='Tuition',
+                                 payment_date='2025-01-06', payment_method='Cash')
+        FeeRecord.objects.create(student=self.student, total_fee=1000, amount_paid=100, fee_type='Tuition',
+                                 payment_date='2025-01-07', payment_method='Cash')
+        self.assertEqual(FeeAccount.objects.get(term=None).balance, Decimal('500'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FeeAccount.objects.create(student=self.student, fee_type='Tuition')
+
+    def test_term_with_accounts_cannot_be_deleted(self):
+        self.pay(400)
+        with self.assertRaises(ProtectedError):
+            self.term.delete()
+
+    def test_new_record_is_posted_even_with_an_account_given(self):
+        get_fee_totals()
+        first = self.pay(400)
+        FeeRecord.objects.create(student=self.student, term=self.term, account=first.account, total_fee=1000,
+                                 amount_paid=300, fee_type='Tuition', payment_date='2025-01-07',
+                                 payment_method='Cash')
+        self.assertEqual(FeeAccount.objects.get().balance, Decimal('300'))
+        self.assertEqual(get_fee_totals()['balance'], Decimal('300'))
+
+    def test_editing_the_fee_type_moves_the_payment(self):
+        first, second = self.pay(400), self.pay(300)
+        second.fee_type, second.total_fee = 'Uniform', 500
+        second.save()
+        balances = dict(FeeAccount.objects.values_list('fee_type', 'balance'))
+        self.assertEqual(balances, {'Tuition': Decimal('600'), 'Uniform': Decimal('200')})
+        self.assertEqual(get_fee_totals()['balance'], Decimal('800'))
+
+        first.fee_type, first.total_fee = 'Uniform', 500
+        first.save()
+        self.assertEqual(list(FeeAccount.objects.values_list('fee_type', 'balance')), [('Uniform', Decimal('-200'))])
+
+    def test_deleting_a_student_removes_their_ledger(self):
+        self.pay(400)
+        self.student.user.delete()
+        self.assertFalse(FeeAccount.objects.exists())
+        self.assertEqual(get_fee_totals()['balance'], 0)
+
+
+class ListingQueryCountTests(CacheClearingTestCase):
+    """Listing views must run the same number of queries whatever the row count"""
+
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.rows = 0
+
+    def assertConstantQueries(self, user, url, add_rows):
+        self.client.force_login(user)
+        add_rows(2)
+        self.client.get(url)  # warm caches
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        add_rows(6)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries),
+                         '\n'.join(q['sql'] for q in many.captured_queries))
+
+    def add_fee_records(self, n):
+        for _ in range(n):
+            self.rows += 1
+            FeeRecord.objects.create(student=make_student(f'Payer {self.rows}'), total_fee=100, amount_paid=50,
+                                     fee_type='Tuition', payment_date='2025-01-06', payment_method='Cash')
+
+    def add_exams_with_submissions(self, n, class_name='JSS1'):
+        for _ in range(n):
+            self.rows += 1
+            exam = Exam.objects.create(title=f'Exam {self.rows}', subject='MATHEMATICS', class_name=class_name,
+                                       created_by=self.teacher)
+            Question.objects.create(exam=exam, question_text='1+1?', option_a='1', option_b='2', option_c='3',
+                                    option_d='4', correct_answer='B', question_number=1)
+            ExamSubmission.objects.create(student=make_student(f'Taker {self.rows}', class_name), exam=exam,
+                                          score=100, total_questions=1, correct_answers=1)
+
+    def test_fee_listings(self):
+        bursar = Bursar.objects.create(user=User.objects.create(username='bursar'), full_name='Bursar')
+        self.assertConstantQueries(bursar.user, reverse('bursar_dashboard'), self.add_fee_records)
+        admin = Admin.objects.create(user=User.objects.create(username='admin'), full_name='Admin')
+        self.assertConstantQueries(admin.user, reverse('manage_finance'), self.add_fee_records)
+
+    def test_attendance_listing(self):
+        def add_attendance(n):
+            for _ in range(n):
+                self.rows += 1
+                Attendance.objects.create(student=make_student(f'Pupil {self.rows}'), class_name='JSS1',
+                                          date='2025-01-06', status='Present', marked_by=self.teacher)
+        self.assertConstantQueries(self.teacher.user, reverse('view_attendance'), add_attendance)
+
+    def test_teacher_dashboard(self):
+        self.assertConstantQueries(self.teacher.user, reverse('teacher_dashboard'), self.add_exams_with_submissions)
+
+    def test_student_dashboard(self):
+        student = make_student('Ada A', 'JSS1')
+
+        def add_exams(n):
+            self.add_exams_with_submissions(n, 'JSS1')
+            for exam in Exam.objects.filter(title__startswith='Exam')[:n]:
+                ExamSubmission.objects.get_or_create(student=student, exam=exam, defaults={
+                    'score': 50, 'total_questions': 1, 'correct_answers': 0})
+        self.assertConstantQueries(student.user, reverse('student_dashboard'), add_exams)
+
+
+class ExamSubmissionTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student('Ada A')
+        self.exam = Exam.objects.create(title='Quiz', subject='MATHEMATICS', class_name='JSS1',
+                                        created_by=make_teacher())
+
+    def add_questions(self, count):
+        start = self.exam.questions.count()
+        questions = Question.objects.bulk_create([
+            Question(exam=self.exam, question_text=f'Q{n}', option_a='1', option_b='2', option_c='3',
+                     option_d='4', correct_answer='ABCD'[n % 4], question_number=n)
+            for n in range(start + 1, start + count + 1)
+        ])
+        bump_snapshot_version(self.exam.pk)
+        self.exam.refresh_from_db()
+        return questions
+
+    def test_grading_writes_do_not_grow_with_question_count(self):
+        counts = []
+        for extra in (4, 40):
+            self.add_questions(extra)
+            ExamSubmission.objects.filter(exam=self.exam).delete()
+            answers = {q.id: q.correct_answer for q in self.exam.questions.all()}
+            with CaptureQueriesContext(connection) as ctx:
+                grade_submission(self.student, self.exam, answers)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_scores_in_memory_and_rejects_resubmission(self):
+        questions = self.add_questions(4)
+        wrong = 'A' if questions[1].correct_answer != 'A' else 'B'
+        answers = {questions[0].id: questions[0].correct_answer, questions[1].id: wrong}
+        submission = grade_submission(self.student, self.exam, answers)
+        submission.refresh_from_db()
+        self.assertEqual((submission.total_questions, submission.correct_answers), (4, 1))
+        self.assertEqual(submission.score, Decimal('25.00'))
+        self.assertEqual(StudentAnswer.objects.filter(submission=submission, is_correct=True).count(), 1)
+        with self.assertRaises(DuplicateSubmission):
+            grade_submission(self.student, self.exam, answers)
+
+    def test_take_exam_post(self):
+        questions = self.add_questions(3)
+        self.client.force_login(self.student.user)
+        data = {f'question_{q.id}': q.correct_answer for q in questions}
+        data['question_999999'] = 'A'  # not part of this exam
+        response = self.client.post(reverse('take_exam', args=[self.exam.exam_id]), data)
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+        self.assertFalse(ExamSubmission.objects.exists())
+        self.assertEqual(process_grading_batch(), (1, 1))
+        submission = ExamSubmission.objects.get(student=self.student, exam=self.exam)
+        self.assertEqual((submission.correct_answers, submission.score), (3, Decimal('100.00')))
+        self.assertEqual(submission.answers.count(), 3)
+
+    def test_snapshot_serves_paper_and_grading_without_question_queries(self):
+        self.add_questions(3)
+        self.client.force_login(self.student.user)
+        url = reverse('take_exam', args=[self.exam.exam_id])
+        self.client.get(url)  # builds the snapshot
+        for method in (self.client.get, lambda url: self.client.post(url, {}), lambda url: process_grading_batch()):
+            with CaptureQueriesContext(connection) as ctx:
+                method(url)
+            self.assertFalse([q for q in ctx.captured_queries if 'accounts_question' in q['sql']])
+        self.assertEqual(ExamSubmission.objects.get(exam=self.exam).total_questions, 3)
+
+    def test_editing_a_question_publishes_a_new_snapshot(self):
+        question = self.add_questions(1)[0]
+        old = get_exam_snapshot(self.exam)
+        self.client.force_login(self.exam.created_by.user)
+        self.client.post(reverse('edit_question', args=[question.id]), {
+            'question_text': 'Edited', 'option_a': '1', 'option_b': '2', 'option_c': '3', 'option_d': '4',
+            'correct_answer': 'D',
+        })
+        self.exam.refresh_from_db()
+        new = get_exam_snapshot(self.exam)
+        self.assertGreater(new.version, old.version)
+        self.assertEqual((new.questions[0].question_text, new.answer_key[question.id]), ('Edited', 'D'))
+        self.assertEqual(old.questions[0].question_text, 'Q1')
+
+    def test_paper_order_is_stable_per_student(self):
+        self.add_questions(20)
+        self.exam.shuffle_options = True
+        other = make_student('Bo B')
+        first = student_paper(self.exam, self.student)
+        self.assertEqual(first, student_paper(self.exam, self.student))
+        self.assertNotEqual([q.id for q in first], [q.id for q in student_paper(self.exam, other)])
+        self.assertEqual(sorted(q.id for q in first), sorted(get_exam_snapshot(self.exam).answer_key))
+
+        # Display letters are positional; submitted values still name the stored option
+        for question in first:
+            self.assertEqual([label for label, _, _ in question.options], list('ABCD'))
+            original = Question.objects.get(id=question.id)
+            for _, value, text in question.options:
+                self.assertEqual(getattr(original, f'option_{value.lower()}'), text)
+
+    def test_shuffled_options_grade_against_stored_letters(self):
+        self.add_questions(5)
+        self.exam.shuffle_options = True
+        self.exam.save()
+        self.client.force_login(self.student.user)
+        url = reverse('take_exam', args=[self.exam.exam_id])
+        paper = self.client.get(url).context['questions']
+        self.assertEqual(paper, self.client.get(url).context['questions'])
+        answer_key = get_exam_snapshot(self.exam).answer_key
+        self.client.post(url, {f'question_{q.id}': answer_key[q.id] for q in paper})
+        process_grading_batch()
+        self.assertEqual(ExamSubmission.objects.get(exam=self.exam).correct_answers, 5)
+
+
+class ExamAttemptTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = make_student('Ada A')
+        self.exam = Exam.objects.create(title='Quiz', subject='MATHEMATICS', class_name='JSS1',
+                                        created_by=make_teacher(), duration_minutes=30)
+        self.questions = [
+            Question.objects.create(exam=self.exam, question_text=f'Q{n}', option_a='1', option_b='2',
+                                    option_c='3', option_d='4', correct_answer='ABCD'[n % 4], question_number=n)
+            for n in range(1, 5)
+        ]
+        self.client.force_login(self.student.user)
+        self.exam_url = reverse('take_exam', args=[self.exam.exam_id])
+        self.save_url = reverse('save_exam_answers', args=[self.exam.exam_id])
+
+    def autosave(self, answers):
+        return self.client.post(self.save_url, json.dumps({'answers': answers}), content_type='application/json')
+
+    def test_autosaved_answers_are_resumed_and_graded(self):
+        self.client.get(self.exam_url)
+        q1, q2 = self.questions[:2]
+        self.assertEqual(self.autosave({q1.id: q1.correct_answer}).json()['saved'], 1)
+        self.autosave({q2.id: q2.correct_answer})
+
+        response = self.client.get(self.exam_url)  # e.g. after a dropped connection
+        self.assertEqual(response.context['saved_answers'],
+                         {str(q1.id): q1.correct_answer, str(q2.id): q2.correct_answer})
+        self.assertLessEqual(response.context['seconds_left'], 30 * 60)
+
+        self.client.post(self.exam_url, {})
+        process_grading_batch()
+        submission = ExamSubmission.objects.get(student=self.student, exam=self.exam)
+        self.assertEqual((submission.correct_answers, submission.total_questions), (2, 4))
+        self.assertIsNotNone(ExamAttempt.objects.get(student=self.student, exam=self.exam).submitted_at)
+        self.assertEqual(self.autosave({q1.id: 'A'}).status_code, 409)
+
+    def test_autosave_is_one_write(self):
+        self.client.get(self.exam_url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.autosave({q.id: 'A' for q in self.questions})
+        writes = [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+
+    def test_rejects_invalid_answers(self):
+        self.client.get(self.exam_url)
+        self.assertEqual(self.autosave({self.questions[0].id: 'E'}).status_code, 400)
+        self.assertEqual(self.autosave({'999999': 'A'}).status_code, 400)
+        self.assertEqual(ExamAttempt.objects.get().answers, {})
+
+    def test_time_limit_is_enforced(self):
+        self.client.get(self.exam_url)
+        q1, q2 = self.questions[:2]
+        self.autosave({q1.id: q1.correct_answer})
+        ExamAttempt.objects.update(started_at=timezone.now() - timedelta(minutes=31))
+
+        self.assertEqual(self.autosave({q2.id: q2.correct_answer}).status_code, 409)
+        # A late final POST only counts what was saved in time
+        self.client.post(self.exam_url, {f'question_{q2.id}': q2.correct_answer})
+        process_grading_batch()
+        self.assertEqual(ExamSubmission.objects.get(exam=self.exam).correct_answers, 1)
+
+    def test_expired_attempt_is_submitted_on_return(self):
+        self.client.get(self.exam_url)
+        ExamAttempt.objects.update(started_at=timezone.now() - timedelta(hours=2))
+        response = self.client.get(self.exam_url)
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+        self.assertTrue(GradingTask.objects.filter(attempt__exam=self.exam).exists())
+
+
+class GradingQueueTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = Exam.objects.create(title='Quiz', subject='MATHEMATICS', class_name='JSS1',
+                                        created_by=make_teacher())
+        self.questions = [
+            Question.objects.create(exam=self.exam, question_text=f'Q{n}', option_a='1', option_b='2',
+                                    option_c='3', option_d='4', correct_answer='ABCD'[n % 4], question_number=n)
+            for n in range(1, 4)
+        ]
+        self.correct = {q.id: q.correct_answer for q in self.questions}
+        self.exam.refresh_from_db()
+        get_exam_snapshot(self.exam)
+
+    def start(self, name):
+        student = make_student(name)
+        return student, ExamAttempt.objects.create(student=student, exam=self.exam)
+
+    def test_submission_is_one_update_and_one_insert(self):
+        _, attempt = self.start('Ada A')
+        with CaptureQueriesContext(connection) as ctx:
+            enqueue_attempt(attempt, self.correct)
+        writes = [q['sql'].split()[0] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, ['UPDATE', 'INSERT'])
+        with self.assertRaises(DuplicateSubmission):
+            enqueue_attempt(attempt, self.correct)
+
+    def test_batch_grading_queries_do_not_grow_with_batch_size(self):
+        counts = []
+        for batch in (2, 10):
+            for i in range(batch):
+                _, attempt = self.start(f'Student {batch} {i}')
+                enqueue_attempt(attempt, self.correct)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(process_grading_batch(), (batch, batch))
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(ExamSubmission.objects.filter(correct_answers=3).count(), 12)
+        self.assertEqual(StudentAnswer.objects.count(), 36)
+        self.assertFalse(GradingTask.objects.exclude(status=GradingTask.DONE).exists())
+
+    def test_worker_grades_like_a_direct_submission(self):
+        answers = dict(self.correct)
+        answers[self.questions[0].id] = 'D'
+        direct, _ = self.start('Ada A')
+        grade_submission(direct, self.exam, answers)
+        _, attempt = self.start('Bola B')
+        enqueue_attempt(attempt, answers)
+        process_grading_batch()
+
+        def graded(student_name):
+            submission = ExamSubmission.objects.get(student__full_name=student_name)
+            return ((submission.score, submission.correct_answers, submission.total_questions),
+                    sorted(submission.answers.values_list('question_id', 'selected_answer', 'is_correct')))
+        self.assertEqual(graded('Ada A'), graded('Bola B'))
+
+    def test_load_test_refuses_a_live_database(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest_exam_submissions', students=2, questions=1)
+        self.assertFalse(Student.objects.filter(class_name='__LOADTEST__').exists())
+
+    def test_workers_never_claim_the_same_task(self):
+        for i in range(5):
+            enqueue_attempt(self.start(f'Student {i}')[1], self.correct)
+        first, second = claim_grading_tasks(3), claim_grading_tasks(3)
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertFalse({t.id for t in first} & {t.id for t in second})
+
+    def test_a_bad_attempt_does_not_block_the_batch(self):
+        _, good = self.start('Ada A')
+        _, bad = self.start('Bo B')
+        enqueue_attempt(good, self.correct)
+        enqueue_attempt(bad)
+        ExamAttempt.objects.filter(pk=bad.pk).update(answers={'not-a-question': 'A'})
+        self.assertEqual(process_grading_batch(), (2, 1))
+        task = GradingTask.objects.get(attempt=bad)
+        self.assertEqual((task.status, task.tries), (GradingTask.PENDING, 1))
+        self.assertTrue(task.error)
+
+    def test_expired_attempts_are_swept_into_the_queue(self):
+        _, attempt = self.start('Ada A')
+        attempt.answers = {str(self.questions[0].id): self.questions[0].correct_answer}
+        attempt.save()
+        ExamAttempt.objects.filter(pk=attempt.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(enqueue_expired_attempts(), 1)
+        process_grading_batch()
+        self.assertEqual(ExamSubmission.objects.get().correct_answers, 1)
+
+
+    def test_short_exams_are_swept_too(self):
+        Exam.objects.filter(pk=self.exam.pk).update(duration_minutes=5)
+        _, attempt = self.start('Ada A')
+        ExamAttempt.objects.filter(pk=attempt.pk).update(started_at=timezone.now() - timedelta(minutes=7))
+        self.assertEqual(enqueue_expired_attempts(), 1)
+
+
+class QuestionImportTests(CacheClearingTestCase):
+    HEADER = 'Question,Option A,Option B,Option C,Option D,Answer\n'
+
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.exam = Exam.objects.create(title='Quiz', subject='MATHEMATICS', class_name='JSS1', created_by=self.teacher)
+
+    def csv_file(self, rows):
+        return SimpleUploadedFile('questions.csv', (self.HEADER + ''.join(rows)).encode(), content_type='text/csv')
+
+    def test_imports_a_large_csv_in_one_request(self):
+        Question.objects.create(exam=self.exam, question_text='Existing', option_a='1', option_b='2', option_c='3',
+                                option_d='4', correct_answer='A', question_number=1)
+        rows = [f'What is {n} + {n}?,{n},{2 * n},{3 * n},{4 * n},{"abcd"[n % 4]}\n' for n in range(500)]
+        self.client.force_login(self.teacher.user)
+        start = time.perf_counter()
+        response = self.client.post(reverse('import_questions', args=[self.exam.id]),
+                                    {'question_file': self.csv_file(rows)})
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertRedirects(response, reverse('add_questions', args=[self.exam.id]), fetch_redirect_response=False)
+
+        numbers = list(self.exam.questions.values_list('question_number', flat=True))
+        self.assertEqual(numbers, list(range(1, 502)))
+        self.assertEqual(Question.objects.get(exam=self.exam, question_number=2).correct_answer, 'A')
+        self.exam.refresh_from_db()
+        self.assertEqual(len(get_exam_snapshot(self.exam).questions), 501)
+        self.assertEqual(ActivityLog.objects.get().get_action_display(), 'Questions Imported')
+
+    def test_imports_xlsx(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'])
+        sheet.append(['2 + 2?', 3, 4, 5, 6, 'B'])
+        sheet.append([None, None, None, None, None, None])
+        sheet.append(['Capital of Nigeria?', 'Lagos', 'Abuja', 'Kano', 'Ibadan', 'b'])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        upload = SimpleUploadedFile('questions.xlsx', buffer.getvalue())
+
+        self.assertEqual(import_questions(self.exam, upload), 2)
+        first = self.exam.questions.get(question_number=1)
+        self.assertEqual((first.option_b, first.correct_answer), ('4', 'B'))
+
+    def test_invalid_rows_are_reported_and_nothing_is_saved(self):
+        rows = ['Fine?,1,2,3,4,A\n', 'No options?,,,,,A\n', 'Bad answer?,1,2,3,4,E\n']
+        with self.assertRaises(QuestionImportError) as ctx:
+            import_questions(self.exam, self.csv_file(rows))
+        self.assertEqual(len(ctx.exception.errors), 2)
+        self.assertTrue(ctx.exception.errors[0].startswith('Row 3:'))
+        self.assertFalse(self.exam.questions.exists())
+
+        with self.assertRaises(QuestionImportError):
+            import_questions(self.exam, SimpleUploadedFile('questions.csv', b'question,a,b\nx,1,2\n'))
+        with self.assertRaises(QuestionImportError):
+            import_questions(self.exam, SimpleUploadedFile('questions.txt', b'hello'))
+
+
+class QuestionBankTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.exam = Exam.objects.create(title='Biology Test', subject='Biology', class_name='JSS1',
+                                        created_by=self.teacher)
+
+    def bank_rows(self, topic, count):
+        return [
+            {'topic': topic, 'question_text': f'{topic} question {n}', 'option_a': 'w', 'option_b': 'x',
+             'option_c': 'y', 'option_d': 'z', 'correct_answer': 'ABCD'[n % 4]}
+            for n in range(count)
+        ]
+
+    def test_duplicates_are_skipped(self):
+        rows = self.bank_rows('Cells', 3)
+        self.assertEqual(add_bank_questions(rows, 'biology ', 'JSS1', self.teacher), 3)
+        rows[0]['question_text'] = '  CELLS   question 0 '
+        self.assertEqual(add_bank_questions(rows, 'BIOLOGY', 'JSS1', self.teacher), 0)
+        self.assertEqual(BankQuestion.objects.filter(subject='BIOLOGY').count(), 3)
+
+    def test_full_text_search(self):
+        add_bank_questions([
+            {'topic': 'Plants', 'question_text': 'Where does photosynthesis happen?', 'option_a': 'Leaf',
+             'option_b': 'Root', 'option_c': 'Stem', 'option_d': 'Seed', 'correct_answer': 'A'},
+            {'topic': 'Cells', 'question_text': 'What is the powerhouse of the cell?', 'option_a': 'Nucleus',
+             'option_b': 'Mitochondria', 'option_c': 'Wall', 'option_d': 'Membrane', 'correct_answer': 'B'},
+        ], 'Biology', 'JSS1')
+        self.assertEqual([q.topic for q in search_bank('photosynth')], ['Plants'])
+        self.assertEqual([q.topic for q in search_bank('cell', subject='biology', class_name='JSS1')], ['Cells'])
+        self.assertFalse(search_bank('"); DROP TABLE x; --').exists())
+
+    def test_generate_paper_samples_per_topic_in_one_query(self):
+        add_bank_questions(self.bank_rows('Cells', 6) + self.bank_rows('Plants', 4), 'Biology', 'JSS1')
+        add_bank_questions(self.bank_rows('Cells', 5), 'Biology', 'SS1')  # other class
+
+        with CaptureQueriesContext(connection) as ctx:
+            added = generate_exam_paper(self.exam, {'Cells': 3, 'Plants': 10})
+        self.assertEqual(added, {'Cells': 3, 'Plants': 4})
+        self.assertEqual(len([q for q in ctx.captured_queries if 'ROW_NUMBER' in q['sql']]), 1)
+
+        questions = list(self.exam.questions.select_related('bank_question'))
+        self.assertEqual([q.question_number for q in questions], list(range(1, 8)))
+        self.assertTrue(all(q.bank_question.class_name == 'JSS1' and not q.question_text for q in questions))
+
+        # A second draw never repeats items already on the exam
+        self.assertEqual(generate_exam_paper(self.exam, {'Cells': 10}), {'Cells': 3})
+        with self.assertRaises(BankError):
+            generate_exam_paper(self.exam, {'Cells': 1})
+
+    def test_bank_questions_are_served_and_graded_by_reference(self):
+        add_bank_questions(self.bank_rows('Cells', 2), 'Biology', 'JSS1')
+        generate_exam_paper(self.exam, {'Cells': 2})
+        self.exam.refresh_from_db()
+        snapshot = get_exam_snapshot(self.exam)
+        bank = {b.question_text: b for b in BankQuestion.objects.all()}
+        for question in snapshot.questions:
+            self.assertEqual(snapshot.answer_key[question.id], bank[question.question_text].correct_answer)
+
+        # Editing the bank item retires every snapshot that uses it
+        item = BankQuestion.objects.get(question_text='Cells question 0')
+        item.question_text = 'Cells question zero'
+        item.save()
+        self.exam.refresh_from_db()
+        self.assertIn('Cells question zero', [q.question_text for q in get_exam_snapshot(self.exam).questions])
+
+    def test_bank_edits_leave_exams_already_sat_unchanged(self):
+        add_bank_questions(self.bank_rows('Cells', 1), 'Biology', 'JSS1')
+        generate_exam_paper(self.exam, {'Cells': 1})
+        unsat = Exam.objects.create(title='Retake', subject='Biology', class_name='JSS1', created_by=self.teacher)
+        generate_exam_paper(unsat, {'Cells': 1})
+        sat_question = self.exam.questions.get()
+        self.exam.refresh_from_db()
+        grade_submission(make_student('Ada A'), self.exam, {sat_question.id: 'A'})
+
+        item = BankQuestion.objects.get()
+        old_key = item.correct_answer
+        item.question_text, item.correct_answer = 'Reworded', 'D' if old_key != 'D' else 'C'
+        item.save()
+        clear_local_snapshots()
+        cache.clear()
+
+        self.exam.refresh_from_db()
+        unsat.refresh_from_db()
+        sat = get_exam_snapshot(self.exam)
+        self.assertEqual((sat.questions[0].question_text, sat.answer_key[sat_question.id]), ('Cells question 0', old_key))
+        self.assertEqual(get_exam_snapshot(unsat).questions[0].question_text, 'Reworded')
+
+    def test_editing_an_exam_copy_detaches_it_from_the_bank(self):
+        add_bank_questions(self.bank_rows('Cells', 1), 'Biology', 'JSS1')
+        generate_exam_paper(self.exam, {'Cells': 1})
+        question = self.exam.questions.get()
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse('edit_question', args=[question.id]))
+        self.assertEqual(response.context['question'].question_text, 'Cells question 0')
+        self.client.post(reverse('edit_question', args=[question.id]), {
+            'question_text': 'Reworded', 'option_a': 'w', 'option_b': 'x', 'option_c': 'y', 'option_d': 'z',
+            'correct_answer': 'C',
+        })
+        question.refresh_from_db()
+        self.assertEqual((question.bank_question_id, question.question_text), (None, 'Reworded'))
+        self.assertEqual(BankQuestion.objects.get().question_text, 'Cells question 0')
+
+    def test_bank_pages(self):
+        self.client.force_login(self.teacher.user)
+        self.client.post(reverse('question_bank'), {
+            'subject': 'Biology', 'class_name': 'JSS1', 'topic': 'Cells', 'question_text': 'Q?',
+            'option_a': '1', 'option_b': '2', 'option_c': '3', 'option_d': '4', 'correct_answer': 'A',
+        })
+        self.assertEqual(BankQuestion.objects.get().subject, 'BIOLOGY')
+        self.assertEqual(len(self.client.get(reverse('question_bank'), {'q': 'Q'}).context['bank_questions']), 1)
+        response = self.client.get(reverse('add_questions', args=[self.exam.id]))
+        self.assertEqual(response.context['bank_topics'], [('Cells', 1)])
+        self.client.post(reverse('generate_exam_paper', args=[self.exam.id]), {'topic': ['Cells'], 'count': ['1']})
+        self.assertEqual(self.exam.questions.count(), 1)
+        self.assertEqual(ActivityLog.objects.get().get_action_display(), 'Paper Generated')
+
+
+class ExportResultsTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.exam = Exam.objects.create(title='Maths / Test 1', subject='MATHEMATICS', class_name='JSS1',
+                                        created_by=self.teacher)
+        self.questions = Question.objects.bulk_create([
+            Question(exam=self.exam, question_text=f'Q{n}', option_a='1', option_b='2', option_c='3',
+                     option_d='4', correct_answer='A', question_number=n)
+            for n in (1, 2)
+        ])
+        self.exam.refresh_from_db()
+        self.client.force_login(self.teacher.user)
+        self.url = reverse('export_results', args=[self.exam.id])
+        self.submitted = 0
+
+    def submit(self, count):
+        for _ in range(count):
+            self.submitted += 1
+            student = make_student(f'Pupil {self.submitted}')
+            grade_submission(student, self.exam, {self.questions[0].id: 'A', self.questions[1].id: 'B'})
+
+    def test_csv_streams_with_constant_queries(self):
+        counts = []
+        for batch in (2, 12):
+            self.submit(batch)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url)
+                lines = b''.join(response.streaming_content).decode().splitlines()
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(lines), 15)
+        self.assertIn('Maths_Test_1_results.csv', response['Content-Disposition'])
+
+    def test_csv_with_item_statistics(self):
+        self.submit(4)
+        response = self.client.get(self.url, {'items': '1'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[6].split(','), ['Question', 'Question Text', 'Responses', 'Correct', 'Correct (%)',
+                                               'A', 'B', 'C', 'D'])
+        self.assertEqual(lines[7].split(','), ['1', 'Q1', '4', '4', '100.0', '4', '0', '0', '0'])
+        self.assertEqual(lines[8].split(','), ['2', 'Q2', '4', '0', '0.0', '0', '4', '0', '0'])
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        self.submit(3)
+        response = self.client.get(self.url, {'format': 'xlsx', 'items': '1'})
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        self.assertEqual(workbook.sheetnames, ['Results', 'Item Statistics'])
+        results = list(workbook['Results'].iter_rows(values_only=True))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[1][2], 50)
+
+    def test_columnar_export_round_trips_in_row_groups(self):
+        self.submit(5)
+        data = _columnar_file(self.exam, include_items=True, chunk_size=2)
+        self.assertIn('score.00002', np_files(data))
+        columns = read_columnar_export(data)
+        self.assertEqual(list(columns['score']), [50.0] * 5)
+        self.assertEqual(list(columns['student_name']), [f'Pupil {n}' for n in range(1, 6)])
+        self.assertEqual(list(columns['items.chose_b']), [0, 5])
+
+    def test_unknown_format(self):
+        self.assertRedirects(self.client.get(self.url, {'format': 'pdf'}), reverse('teacher_dashboard'),
+                             fetch_redirect_response=False)
+
+
+def np_files(data):
+    import numpy as np
+
+    with np.load(data) as archive:
+        files = archive.files
+    data.seek(0)
+    return files
+
+
+class ItemAnalysisTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.exam = Exam.objects.create(title='Science', subject='SCIENCE', class_name='JSS1', created_by=self.teacher)
+        self.q1, self.q2 = Question.objects.bulk_create([
+            Question(exam=self.exam, question_text=f'Q{n}', option_a='1', option_b='2', option_c='3',
+                     option_d='4', correct_answer='A', question_number=n)
+            for n in (1, 2)
+        ])
+        self.exam.refresh_from_db()
+        for name, answers in [('Ada', {self.q1.id: 'A', self.q2.id: 'A'}),   # 100
+                              ('Bola', {self.q1.id: 'A', self.q2.id: 'B'}),  # 50
+                              ('Chi', {self.q1.id: 'B', self.q2.id: 'A'}),   # 50
+                              ('Dayo', {self.q1.id: 'C'})]:                  # 0, skipped Q2
+            grade_submission(make_student(name), self.exam, answers)
+
+    def test_statistics(self):
+        analysis = analyse_exam(self.exam)
+        self.assertEqual((analysis.submissions, analysis.mean_score, analysis.std_score), (4, 50.0, 35.36))
+
+        first, second = analysis.items
+        self.assertEqual((first.difficulty, first.discrimination, first.omitted), (0.5, 0.707, 0))
+        self.assertEqual([option.count for option in first.options], [2, 1, 1, 0])
+        option_c = first.options[2]
+        self.assertEqual((option_c.mean_score, option_c.discrimination, option_c.flag), (0.0, -0.816, ''))
+        self.assertIsNone(first.options[3].discrimination)
+        self.assertEqual(first.options[3].flag, 'rarely chosen')
+
+        self.assertEqual((second.difficulty, second.omitted, second.responses), (0.5, 1, 3))
+        self.assertEqual(second.options[1].discrimination, 0.0)
+
+    def test_matches_numpy_correlation(self):
+        import numpy as np
+
+        scores = np.array([100, 50, 50, 0])
+        chose_key = np.array([1, 1, 0, 0])
+        expected = round(float(np.corrcoef(chose_key, scores)[0, 1]), 3)
+        self.assertEqual(analyse_exam(self.exam).items[0].discrimination, expected)
+
+    def test_cached_until_next_submission(self):
+        analyse_exam(self.exam)
+        with self.assertNumQueries(1):
+            analyse_exam(self.exam)
+
+        grade_submission(make_student('Efe'), self.exam, {self.q1.id: 'D', self.q2.id: 'D'})
+        analysis = analyse_exam(self.exam)
+        self.assertEqual(analysis.submissions, 5)
+        self.assertEqual(analysis.items[0].options[3].count, 1)
+
+    def test_question_without_a_valid_key_is_reported_not_scored(self):
+        Question.objects.filter(pk=self.q1.pk).update(correct_answer='')
+        bump_snapshot_version(self.exam.pk)
+        self.exam.refresh_from_db()
+        first, second = analyse_exam(self.exam).items
+        self.assertEqual((first.difficulty, first.discrimination, first.flags), (None, None, ['no answer key']))
+        self.assertFalse(any(option.is_key for option in first.options))
+        self.assertEqual(second.difficulty, 0.5)
+
+    def test_flags_negative_discrimination(self):
+        # Only the weakest students pick the keyed answer
+        Question.objects.filter(pk=self.q1.pk).update(correct_answer='C')
+        bump_snapshot_version(self.exam.pk)
+        self.exam.refresh_from_db()
+        item = analyse_exam(self.exam).items[0]
+        self.assertEqual(item.correct_answer, 'C')
+        self.assertIn('negative discrimination, check the key', item.flags)
+        self.assertEqual(item.options[0].flag, 'attracts stronger students')
+
+    def test_view(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse('item_analysis', args=[self.exam.id]))
+        self.assertContains(response, 'Item Analysis: Science')
+        self.assertContains(response, '0.707')
+
+
+class StudentFeedTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.student = make_student('Ada A')
+        self.exams = [self.make_exam(f'Exam {n}') for n in range(3)]
+
+    def make_exam(self, title, class_name='JSS1'):
+        exam = Exam.objects.create(title=title, subject='MATHEMATICS', class_name=class_name, created_by=self.teacher)
+        Question.objects.create(exam=exam, question_text='1+1?', option_a='1', option_b='2', option_c='3',
+                                option_d='4', correct_answer='B', question_number=1)
+        exam.refresh_from_db()
+        return exam
+
+    def titles(self, feed):
+        return ([exam.title for exam in feed.available], [exam.title for exam in feed.pending],
+                [exam.title for exam in feed.completed])
+
+    def test_feed_from_one_query(self):
+        done, queued, _ = self.exams
+        grade_submission(self.student, done, {})
+        enqueue_attempt(ExamAttempt.objects.create(student=self.student, exam=queued))
+        ExamAttempt.objects.create(student=self.student, exam=self.exams[2])  # started, not submitted
+        self.make_exam('Other class', 'JSS2')
+
+        with self.assertNumQueries(1):
+            feed = get_student_feed(self.student)
+        self.assertEqual(self.titles(feed), (['Exam 2'], ['Exam 1'], ['Exam 0']))
+        self.assertEqual(feed.available[0].question_count, 1)
+        self.assertEqual((feed.completed[0].score, feed.completed[0].total_questions), (Decimal('0.00'), 1))
+
+    def test_cached_until_invalidated(self):
+        get_student_feed(self.student)
+        with self.assertNumQueries(0):
+            get_student_feed(self.student)
+
+        self.make_exam('New exam')
+        self.assertIn('New exam', self.titles(get_student_feed(self.student))[0])
+
+        exam = self.exams[0]
+        exam.is_active = False
+        exam.save()
+        self.assertNotIn('Exam 0', self.titles(get_student_feed(self.student))[0])
+
+        Question.objects.create(exam=self.exams[1], question_text='2+2?', option_a='1', option_b='4', option_c='3',
+                                option_d='2', correct_answer='B', question_number=2)
+        self.assertEqual(get_student_feed(self.student).available[0].question_count, 2)
+
+        grade_submission(self.student, self.exams[1], {})
+        self.assertEqual(self.titles(get_student_feed(self.student))[2], ['Exam 1'])
+
+    def test_expired_class_version_rebuilds(self):
+        get_student_feed(self.student)
+        # Activated on another process: only the expiry of this process's version key reveals it
+        Exam.objects.filter(pk=self.exams[0].pk).update(title='Renamed')
+        cache.delete(f'dashboard:class_feed_version:{self.student.school_class_id}')
+        self.assertIn('Renamed', self.titles(get_student_feed(self.student))[0])
+
+    def test_queue_submission_and_grading(self):
+        attempt = ExamAttempt.objects.create(student=self.student, exam=self.exams[0])
+        get_student_feed(self.student)
+        enqueue_attempt(attempt)
+        self.assertEqual(self.titles(get_student_feed(self.student))[1], ['Exam 0'])
+        process_grading_batch()
+        self.assertEqual(self.titles(get_student_feed(self.student))[1:], ([], ['Exam 0']))
+
+    def test_result_shows_when_graded_by_another_process(self):
+        attempt = ExamAttempt.objects.create(student=self.student, exam=self.exams[0])
+        enqueue_attempt(attempt)
+        self.assertEqual(self.titles(get_student_feed(self.student))[1], ['Exam 0'])
+
+        # The worker runs with its own per-process cache: its invalidations never reach this one
+        worker_cache = LocMemCache('grading-worker', {})
+        with mock.patch('accounts.student_feed.cache', worker_cache), \
+                mock.patch('accounts.stats.cache', worker_cache), mock.patch('accounts.exams.cache', worker_cache):
+            process_grading_batch()
+        self.assertEqual(self.titles(get_student_feed(self.student))[1:], ([], ['Exam 0']))
+
+    def test_class_move_rebuilds(self):
+        get_student_feed(self.student)
+        self.student.class_name = 'JSS2'
+        self.student.save()
+        self.assertEqual(self.titles(get_student_feed(self.student)), ([], [], []))
+
+    def test_dashboard(self):
+        grade_submission(self.student, self.exams[0], {})
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('student_dashboard'))
+        submission = ExamSubmission.objects.get(student=self.student)
+        self.assertContains(response, reverse('view_result', args=[submission.id]))
+        self.assertContains(response, reverse('take_exam', args=[self.exams[1].exam_id]))
+        self.assertNotContains(response, reverse('take_exam', args=[self.exams[0].exam_id]))
+
+
+class AttendanceMarkingTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.students = [make_student(f'Pupil {n}') for n in range(4)]
+        self.client.force_login(self.teacher.user)
+
+    def statuses(self):
+        return dict(Attendance.objects.filter(date='2025-01-06').values_list('student__full_name', 'status'))
+
+    def test_form_marks_class_in_constant_queries(self):
+        def post():
+            data = {'class_name': 'JSS1', 'date': '2025-01-06'}
+            data.update({f'status_{student.id}': 'Late' for student in Student.objects.filter(class_name='JSS1')})
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse('mark_attendance'), data)
+            self.assertRedirects(response, reverse('mark_attendance'), fetch_redirect_response=False)
+            return len(ctx.captured_queries)
+
+        few = post()
+        for n in range(4, 12):
+            make_student(f'Pupil {n}')
+        self.assertEqual(post(), few)
+        self.assertEqual(set(self.statuses().values()), {'Late'})
+        self.assertEqual(Attendance.objects.count(), 12)
+        self.assertEqual(Attendance.objects.filter(school_class__name='JSS1').count(), 12)
+
+    def test_exceptions_mode(self):
+        absent, late = self.students[0], self.students[1]
+        counts = mark_class_attendance('JSS1', '2025-01-06', {absent.id: 'Absent', late.id: 'Late'},
+                                       teacher=self.teacher, default_status='Present')
+        self.assertEqual(counts, {'Present': 2, 'Absent': 1, 'Late': 1})
+        self.assertEqual(self.statuses(), {'Pupil 0': 'Absent', 'Pupil 1': 'Late',
+                                           'Pupil 2': 'Present', 'Pupil 3': 'Present'})
+
+        # Re-marking: Pupil 0 turned up after all, Pupil 3 went home
+        with self.assertNumQueries(12):  # class members, current statuses, three attendance writes, term, day's rollup
+            mark_class_attendance('JSS1', '2025-01-06', {late.id: 'Late', self.students[3].id: 'Absent'},
+                                  teacher=self.teacher, default_status='Present')
+        self.assertEqual(self.statuses(), {'Pupil 0': 'Present', 'Pupil 1': 'Late',
+                                           'Pupil 2': 'Present', 'Pupil 3': 'Absent'})
+        self.assertEqual(Attendance.objects.count(), 4)
+
+        # An identical re-submission only inserts-or-ignores the defaults
+        with CaptureQueriesContext(connection) as ctx:
+            mark_class_attendance('JSS1', '2025-01-06', {late.id: 'Late', self.students[3].id: 'Absent'},
+                                  teacher=self.teacher, default_status='Present')
+        attendance_writes = [q['sql'] for q in ctx.captured_queries
+                             if q['sql'].startswith(('INSERT', 'UPDATE')) and '"accounts_attendance"' in q['sql']]
+        self.assertEqual(len(attendance_writes), 2)
+
+    def test_students_added_by_another_process_are_marked(self):
+        get_class_roster('JSS1')
+        # Registered elsewhere: this process's cached roster never hears of it
+        with mock.patch('accounts.signals.invalidate_rosters'):
+            newcomer = make_student('Newcomer')
+        counts = mark_class_attendance('JSS1', '2025-01-06', {newcomer.id: 'Late'}, default_status='Present')
+        self.assertEqual(counts, {'Present': 4, 'Absent': 0, 'Late': 1})
+
+    def test_json_exceptions(self):
+        response = self.client.post(reverse('mark_attendance'), json.dumps({
+            'class_name': 'JSS1', 'date': '2025-01-06', 'default_status': 'Present',
+            'statuses': {str(self.students[2].id): 'Absent'},
+        }), content_type='application/json')
+        self.assertEqual(response.json(), {'marked': {'Present': 3, 'Absent': 1, 'Late': 0}})
+        self.assertEqual(self.statuses()['Pupil 2'], 'Absent')
+
+    def test_rejects_bad_input_without_writing(self):
+        outsider = make_student('Outsider', 'JSS2')
+        for statuses, default in [({outsider.id: 'Absent'}, 'Present'), ({self.students[0].id: 'Gone'}, None),
+                                  ({}, 'Sick')]:
+            with self.assertRaises(AttendanceError):
+                mark_class_attendance('JSS1', '2025-01-06', statuses, default_status=default)
+        with self.assertRaises(AttendanceError):
+            mark_class_attendance('JSS1', 'yesterday', {})
+        self.assertFalse(Attendance.objects.exists())
+
+        response = self.client.post(reverse('mark_attendance'), json.dumps({
+            'class_name': 'JSS1', 'date': '2025-01-06', 'statuses': {str(outsider.id): 'Absent'},
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        for payload in ([], '"JSS1"', {'class_name': 'JSS1', 'date': '2025-01-06', 'statuses': ['Absent']},
+                        {'class_name': 'JSS1', 'date': '2025-01-06', 'statuses': {str(outsider.id): ['Absent']}}):
+            response = self.client.post(reverse('mark_attendance'), payload, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+        self.assertFalse(Attendance.objects.exists())
+
+
+class AttendanceBitmapTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.term = make_term()
+        self.term.start_date, self.term.end_date = date(2025, 1, 6), date(2025, 4, 4)  # Monday..Friday
+        self.term.save()
+        self.ada, self.bola = make_student('Ada'), make_student('Bola')
+
+    def mark(self, day, **exceptions):
+        students = {'ada': self.ada, 'bola': self.bola}
+        mark_class_attendance('JSS1', date(2025, 1, day), {students[name].id: status
+                                                            for name, status in exceptions.items()},
+                              teacher=self.teacher, default_status='Present')
+
+    def test_encoding(self):
+        days = set_day(b'', 0, 'Present')
+        days = set_day(days, 5, 'Late')
+        days = set_day(days, 6, 'Absent')
+        # Four days per byte, day 0 in the lowest bits
+        self.assertEqual(days, bytes([0b01, 0b10_11_00]))
+        self.assertEqual(set_day(days, 5, None), bytes([0b01, 0b10_00_00]))
+        stats = attendance_stats(days)
+        self.assertEqual((stats.days_marked, stats.present, stats.late, stats.absent), (3, 1, 1, 1))
+
+    def test_marking_maintains_bitmaps(self):
+        # Mon-Wed, skip the weekend, then Mon-Tue
+        self.mark(6)
+        self.mark(7, ada='Absent')
+        self.mark(8, ada='Absent', bola='Late')
+        self.mark(13)
+        self.mark(14, bola='Absent')
+        self.mark(14, bola='Absent')  # re-submitting the same day writes nothing new
+
+        ada = student_term_attendance(self.ada, self.term)
+        self.assertEqual(ada, (5, 3, 2, 0, 2, 2))
+        bola = student_term_attendance(self.bola, self.term)
+        # The weekend does not break Bola's run of four days in school
+        self.assertEqual(bola, (5, 3, 1, 1, 4, 1))
+        self.assertEqual(AttendanceBitmap.objects.count(), 2)
+        self.assertEqual(len(AttendanceBitmap.objects.get(student=self.ada).days), 3)
+
+    def test_single_row_edits_and_rebuild(self):
+        self.mark(6)
+        self.mark(7)
+        record = Attendance.objects.get(student=self.ada, date=date(2025, 1, 7))
+        record.status = 'Absent'
+        record.save()
+        Attendance.objects.get(student=self.bola, date=date(2025, 1, 6)).delete()
+        self.assertEqual(student_term_attendance(self.ada, self.term)[:3], (2, 1, 1))
+        self.assertEqual(student_term_attendance(self.bola, self.term)[:3], (1, 1, 0))
+
+        expected = dict(AttendanceBitmap.objects.values_list('student_id', 'days'))
+        AttendanceBitmap.objects.all().delete()
+        rebuild_attendance_bitmaps(self.term)
+        self.assertEqual({k: bytes(v) for k, v in AttendanceBitmap.objects.values_list('student_id', 'days')},
+                         {k: bytes(v) for k, v in expected.items()})
+
+    def test_moving_the_term_start_re_encodes(self):
+        self.mark(7, ada='Absent')
+        self.term.start_date = date(2025, 1, 1)
+        self.term.save()
+        days = bytes(AttendanceBitmap.objects.get(student=self.ada).days)
+        self.assertEqual(days, set_day(b'', 6, 'Absent'))
+
+    def test_outside_any_term(self):
+        mark_class_attendance('JSS1', date(2025, 5, 5), {}, default_status='Present')
+        self.assertFalse(AttendanceBitmap.objects.exists())
+
+    def test_result_preview(self):
+        self.client.force_login(self.teacher.user)
+        url = reverse('result_preview', args=[self.ada.id, self.term.id])
+        ResultSummary.objects.create(student=self.ada, term=self.term)
+        self.mark(6)
+        self.assertContains(self.client.get(url), 'Present 1 of 1 times school opened')
+
+        # Attendance marked after results were generated still reaches the report card
+        self.mark(7, ada='Late')
+        response = self.client.get(url)
+        self.assertEqual(response.context['attendance'].late, 1)
+        self.assertContains(response, 'Present 2 of 2 times school opened')
+
+
+class AttendanceRollupTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = make_teacher()
+        self.term = make_term()
+        self.term.start_date, self.term.end_date = date(2025, 1, 6), date(2025, 4, 4)
+        self.term.save()
+        self.jss1 = [make_student(f'Ada {n}') for n in range(3)]
+        self.jss2 = [make_student(f'Bola {n}', 'JSS2') for n in range(2)]
+
+    def rollups(self):
+        days = {(r.school_class.name, r.date.day): (r.present, r.absent, r.late)
+                for r in AttendanceDailyRollup.objects.select_related('school_class')}
+        terms = {r.school_class.name: (r.days_open, r.present, r.absent, r.late)
+                 for r in AttendanceTermRollup.objects.select_related('school_class')}
+        return days, terms
+
+    def test_marking_refreshes_rollups(self):
+        mark_class_attendance('JSS1', '2025-01-06', {self.jss1[0].id: 'Absent'}, default_status='Present')
+        mark_class_attendance('JSS1', '2025-01-07', {self.jss1[1].id: 'Late'}, default_status='Present')
+        mark_class_attendance('JSS2', '2025-01-06', {}, default_status='Present')
+        days, terms = self.rollups()
+        self.assertEqual(days, {('JSS1', 6): (2, 1, 0), ('JSS1', 7): (2, 0, 1), ('JSS2', 6): (2, 0, 0)})
+        self.assertEqual(terms, {'JSS1': (2, 4, 1, 1), 'JSS2': (1, 2, 0, 0)})
+        self.assertEqual(AttendanceTermRollup.objects.get(school_class__name='JSS1').attendance_rate, 83.3)
+
+        # Re-marking a day replaces its counts rather than adding to them
+        mark_class_attendance('JSS1', '2025-01-06', {}, default_status='Present')
+        self.assertEqual(self.rollups()[1]['JSS1'], (2, 5, 0, 1))
+
+    def test_single_row_changes_and_rebuild(self):
+        mark_class_attendance('JSS1', '2025-01-06', {}, default_status='Present')
+        Attendance.objects.create(student=self.jss2[0], class_name='JSS2', date='2025-01-06', status='Late')
+        Attendance.objects.filter(student=self.jss1[2]).get().delete()
+        incremental = self.rollups()
+        self.assertEqual(incremental[1], {'JSS1': (1, 2, 0, 0), 'JSS2': (1, 0, 0, 1)})
+
+        AttendanceDailyRollup.objects.all().delete()
+        AttendanceTermRollup.objects.all().delete()
+        rebuild_attendance_rollups([self.term])
+        self.assertEqual(self.rollups(), incremental)
+
+        # Moving the end of term before the marked day empties its rollups
+        self.term.start_date, self.term.end_date = date(2024, 9, 9), date(2024, 12, 13)
+        self.term.save()
+        self.assertFalse(AttendanceTermRollup.objects.exists())
+
+    def test_summary_views(self):
+        for day in (6, 7, 8):
+            mark_class_attendance('JSS1', date(2025, 1, day), {self.jss1[0].id: 'Absent'}, default_status='Present')
+            mark_class_attendance('JSS2', date(2025, 1, day), {}, default_status='Present')
+        self.client.force_login(self.teacher.user)
+
+        response = self.client.get(reverse('view_attendance'), {'mode': 'summary'})
+        self.assertEqual([r.school_class.name for r in response.context['class_rollups']], ['JSS1', 'JSS2'])
+        self.assertContains(response, '66.7%')
+
+        response = self.client.get(reverse('view_attendance'), {'mode': 'summary', 'class_name': 'JSS1'})
+        self.assertEqual(len(response.context['daily_rollups']), 3)
+        stats = dict((student.full_name, stats) for student, stats in response.context['student_stats'])
+        self.assertEqual(stats['Ada 0'].longest_absence_streak, 3)
+
+        principal = Principal.objects.create(user=User.objects.create(username='principal'), full_name='Principal')
+        self.client.force_login(principal.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('principal_dashboard'))
+        self.assertEqual(len(response.context['attendance_overview']), 2)
+        self.assertEqual(sum('attendancetermrollup' in q['sql'] for q in ctx.captured_queries), 1)
 
-# Create your tests here.
+    def test_detail_is_paginated_by_date(self):
+        for day in range(6, 21):
+            Attendance.objects.bulk_create([
+                Attendance(student=student, class_name='JSS1', date=date(2025, 1, day), status='Present')
+                for student in self.jss1[:2]
+            ])
+        self.client.force_login(self.teacher.user)
+        first = self.client.get(reverse('view_attendance'))
+        records = first.context['attendance_records']
+        self.assertEqual((len(records), records[0].date, records[-1].date), (25, date(2025, 1, 20), date(2025, 1, 8)))
+        second = self.client.get(reverse('view_attendance'), {'after': first.context['next_cursor']})
+        self.assertEqual([r.date.day for r in second.context['attendance_records']], [8, 7, 7, 6, 6])
+        self.assertIsNone(second.context['next_cursor'])
+        back = self.client.get(reverse('view_attendance'), {'before': second.context['prev_cursor']})
+        self.assertEqual(list(back.context['attendance_records']), list(records))
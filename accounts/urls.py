@@ -27,17 +27,23 @@ urlpatterns = [
     path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('teacher/create-exam/', views.create_exam, name='create_exam'),
     path('teacher/add-questions/<int:exam_id>/', views.add_questions, name='add_questions'),
+    path('teacher/import-questions/<int:exam_id>/', views.import_questions, name='import_questions'),
+    path('teacher/generate-paper/<int:exam_id>/', views.generate_exam_paper, name='generate_exam_paper'),
+    path('teacher/question-bank/', views.question_bank, name='question_bank'),
     path('teacher/edit-question/<int:question_id>/', views.edit_question, name='edit_question'),
     path('teacher/delete-exam/<int:exam_id>/', views.delete_exam, name='delete_exam'),
     path('teacher/mark-attendance/', views.mark_attendance, name='mark_attendance'),
     path('teacher/view-attendance/', views.view_attendance, name='view_attendance'),
     path('teacher/enter-grades/', views.complete_result_entry, name='enter_grades'),
+    path('teacher/bulk-grades/', views.bulk_grade_entry, name='bulk_grade_entry'),
     path('teacher/result-preview/<int:student_id>/<int:term_id>/', views.result_preview, name='result_preview'),
     path('teacher/export-results/<int:exam_id>/', views.export_results, name='export_results'),
+    path('teacher/item-analysis/<int:exam_id>/', views.item_analysis, name='item_analysis'),
     
     # Student URLs
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('student/profile/', views.student_profile, name='student_profile'),
     path('student/take-exam/<str:exam_id>/', views.take_exam, name='take_exam'),
+    path('student/take-exam/<str:exam_id>/answers/', views.save_exam_answers, name='save_exam_answers'),
     path('student/result/<int:submission_id>/', views.view_result, name='view_result'),
 ]
\ No newline at end of file
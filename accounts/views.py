@@ -3,10 +3,34 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Q, Sum, Avg
+from django.db import transaction
+from django.db.models import Q, Sum, Avg, Count
 from django.http import JsonResponse, HttpResponse
 from .models import *
-import csv
+from .ranking import refresh_stale_results
+from .classes import get_class_names, get_class_roster
+from .pagination import keyset_paginate
+from .stats import get_fee_totals, get_headcounts, get_recent_activity
+from .student_feed import get_student_feed
+from .grading import SCORE_FIELDS, bulk_upsert_grades, rows_from_form
+from .attendance import (
+    class_attendance_summary, mark_class_attendance, school_attendance_overview, statuses_from_form,
+    student_term_attendance,
+)
+from .exams import (
+    ANSWER_CHOICES, QUESTION_CONTENT_FIELDS, AttemptClosed, DuplicateSubmission, answers_from_post, clean_answers,
+    get_answer_key, next_question_number, publish_exam_snapshot, save_attempt_answers, start_attempt, student_paper,
+)
+from .exports import EXPORT_FORMATS, export_response
+from .fees import fee_debtors
+from .grading_queue import enqueue_attempt
+from .item_analysis import analyse_exam
+from .question_bank import (
+    BANK_PAGE_SIZE, BankError, add_bank_questions, bank_topics, generate_exam_paper as generate_paper_from_bank,
+    import_bank_questions, search_bank,
+)
+from .question_import import QuestionImportError, import_questions as import_questions_from_file
+import json
 from datetime import datetime
 import random
 from django.core.management import call_command
@@ -64,23 +88,53 @@ def admin_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
-    students = Student.objects.all().order_by('-created_at')
-    teachers = Teacher.objects.all().order_by('-created_at')
-    recent_activities = ActivityLog.objects.all()[:20]
-    total_fees = FeeRecord.objects.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-    
     context = {
         'admin': admin,
-        'students': students,
-        'teachers': teachers,
-        'activities': recent_activities,
-        'total_fees': total_fees,
-        'student_count': students.count(),
-        'teacher_count': teachers.count(),
+        'activities': get_recent_activity(),
+        'total_fees': get_fee_totals()['paid'],
+        **dashboard_listings(request),
     }
     return render(request, 'admin_dashboard.html', context)
 
 
+# Helper shared by the admin and principal dashboards
+def dashboard_listings(request):
+    """Keyset-paginated, searchable student and teacher lists plus cached headcounts"""
+    student_search = request.GET.get('student_q', '').strip()
+    student_class = request.GET.get('student_class', '')
+    teacher_search = request.GET.get('teacher_q', '').strip()
+    
+    students = Student.objects.all()
+    if student_search:
+        students = students.filter(Q(full_name__icontains=student_search) | Q(student_id__iexact=student_search))
+    if student_class:
+        class_id = SchoolClass.resolve(student_class, create=False)
+        students = students.filter(school_class_id=class_id) if class_id is not None else students.none()
+    
+    teachers = Teacher.objects.all()
+    if teacher_search:
+        teachers = teachers.filter(
+            Q(full_name__icontains=teacher_search) | Q(teacher_id__iexact=teacher_search) | Q(subject__icontains=teacher_search)
+        )
+    
+    student_page = keyset_paginate(students, request.GET.get('students_after'), request.GET.get('students_before'))
+    teacher_page = keyset_paginate(teachers, request.GET.get('teachers_after'), request.GET.get('teachers_before'))
+    counts = get_headcounts()
+    
+    return {
+        'students': student_page.rows,
+        'student_page': student_page,
+        'teachers': teacher_page.rows,
+        'teacher_page': teacher_page,
+        'student_search': student_search,
+        'student_class': student_class,
+        'teacher_search': teacher_search,
+        'classes': get_class_names(),
+        'student_count': counts['students'],
+        'teacher_count': counts['teachers'],
+    }
+
+
 @login_required
 def register_student(request):
     try:
@@ -332,7 +386,7 @@ def manage_finance(request):
             messages.error(request, f'Error recording payment: {str(e)}')
             return redirect('manage_finance')
     
-    fee_records = FeeRecord.objects.all().order_by('-payment_date')
+    fee_records = FeeRecord.objects.select_related('student').order_by('-payment_date')
     students = Student.objects.all()
     
     context = {
@@ -352,15 +406,14 @@ def principal_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
-    students = Student.objects.all().order_by('-created_at')
-    teachers = Teacher.objects.all().order_by('-created_at')
+    # School-wide attendance for the current term, one row per class from the rollups
+    attendance_term = Term.objects.filter(is_current=True, start_date__isnull=False, end_date__isnull=False).first()
     
     context = {
         'principal': principal,
-        'students': students,
-        'teachers': teachers,
-        'student_count': students.count(),
-        'teacher_count': teachers.count(),
+        'attendance_term': attendance_term,
+        'attendance_overview': school_attendance_overview(attendance_term) if attendance_term else [],
+        **dashboard_listings(request),
     }
     return render(request, 'principal_dashboard.html', context)
 
@@ -374,19 +427,18 @@ def bursar_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
-    fee_records = FeeRecord.objects.all().order_by('-payment_date')
+    fee_records = FeeRecord.objects.select_related('student').order_by('-payment_date')
     students = Student.objects.all()
-    total_fees = FeeRecord.objects.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
-    total_balance = FeeRecord.objects.aggregate(Sum('balance'))['balance__sum'] or 0
-    recent_activities = ActivityLog.objects.filter(performed_by_type='bursar')[:20]
+    fee_totals = get_fee_totals()
     
     context = {
         'bursar': bursar,
         'fee_records': fee_records,
         'students': students,
-        'total_fees': total_fees,
-        'total_balance': total_balance,
-        'activities': recent_activities,
+        'total_fees': fee_totals['paid'],
+        'total_balance': fee_totals['balance'],
+        'debtors': fee_debtors(),
+        'activities': get_recent_activity('bursar'),
     }
     return render(request, 'bursar_dashboard.html', context)
 
@@ -400,8 +452,12 @@ def teacher_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
-    exams = Exam.objects.filter(created_by=teacher).order_by('-created_at')
-    submissions = ExamSubmission.objects.filter(exam__created_by=teacher).order_by('-submitted_at')[:10]
+    exams = Exam.objects.filter(created_by=teacher).annotate(question_count=Count('questions')).order_by('-created_at')
+    submissions = (
+        ExamSubmission.objects.filter(exam__created_by=teacher)
+        .select_related('student', 'exam')
+        .order_by('-submitted_at')[:10]
+    )
     
     context = {
         'teacher': teacher,
@@ -431,7 +487,8 @@ def create_exam(request):
             class_name=class_name,
             duration_minutes=duration,
             created_by=teacher,
-            shuffle_questions=True
+            shuffle_questions=True,
+            shuffle_options='shuffle_options' in request.POST
         )
         
         ActivityLog.objects.create(
@@ -464,34 +521,159 @@ def add_questions(request, exam_id):
         option_d = request.POST.get('option_d')
         correct_answer = request.POST.get('correct_answer')
         
-        question_number = exam.questions.count() + 1
-        
-        Question.objects.create(
-            exam=exam,
-            question_text=question_text,
-            option_a=option_a,
-            option_b=option_b,
-            option_c=option_c,
-            option_d=option_d,
-            correct_answer=correct_answer,
-            question_number=question_number
-        )
+        with transaction.atomic():
+            Question.objects.create(
+                exam=exam,
+                question_text=question_text,
+                option_a=option_a,
+                option_b=option_b,
+                option_c=option_c,
+                option_d=option_d,
+                correct_answer=correct_answer,
+                question_number=next_question_number(exam)
+            )
         
         if 'add_another' in request.POST:
             messages.success(request, 'Question added! Add another.')
             return redirect('add_questions', exam_id=exam_id)
         else:
+            publish_exam_snapshot(exam)
             messages.success(request, 'Exam completed successfully!')
             return redirect('teacher_dashboard')
     
-    questions = exam.questions.all()
+    questions = exam.questions.select_related('bank_question')
     context = {
         'exam': exam,
         'questions': questions,
+        'bank_topics': bank_topics(exam.subject, exam.class_name),
     }
     return render(request, 'add_questions.html', context)
 
 
+# NEW: Bulk import questions from a CSV/XLSX file
+@login_required
+def import_questions(request, exam_id):
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+        exam = Exam.objects.get(id=exam_id, created_by=teacher)
+    except:
+        messages.error(request, 'Access denied.')
+        return redirect('teacher_dashboard')
+    
+    if request.method == 'POST':
+        uploaded_file = request.FILES.get('question_file')
+        if not uploaded_file:
+            messages.error(request, 'Please choose a CSV or Excel file to import.')
+            return redirect('add_questions', exam_id=exam.id)
+        try:
+            added = import_questions_from_file(exam, uploaded_file)
+        except QuestionImportError as e:
+            for error in e.errors:
+                messages.error(request, error)
+            return redirect('add_questions', exam_id=exam.id)
+        
+        ActivityLog.objects.create(
+            action='questions_imported',
+            description=f'{added} questions imported into "{exam.title}"',
+            performed_by_type='teacher',
+            performed_by_name=teacher.full_name
+        )
+        messages.success(request, f'✅ {added} questions imported successfully!')
+    
+    return redirect('add_questions', exam_id=exam.id)
+
+
+# NEW: Build an exam paper from the question bank
+@login_required
+def generate_exam_paper(request, exam_id):
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+        exam = Exam.objects.get(id=exam_id, created_by=teacher)
+    except:
+        messages.error(request, 'Access denied.')
+        return redirect('teacher_dashboard')
+    
+    if request.method == 'POST':
+        topic_counts = {}
+        for topic, count in zip(request.POST.getlist('topic'), request.POST.getlist('count')):
+            if count.strip().isdigit():
+                topic_counts[topic] = int(count)
+        try:
+            added = generate_paper_from_bank(exam, topic_counts)
+        except BankError as e:
+            messages.error(request, str(e))
+            return redirect('add_questions', exam_id=exam.id)
+        
+        total = sum(added.values())
+        ActivityLog.objects.create(
+            action='paper_generated',
+            description=f'{total} bank questions added to "{exam.title}"',
+            performed_by_type='teacher',
+            performed_by_name=teacher.full_name
+        )
+        short = [f'{topic or "General"} ({count}/{topic_counts[topic]})'
+                 for topic, count in added.items() if count < topic_counts[topic]]
+        if short:
+            messages.warning(request, f'Not enough unused bank questions for: {", ".join(short)}')
+        messages.success(request, f'✅ {total} questions added from the question bank!')
+    
+    return redirect('add_questions', exam_id=exam.id)
+
+
+# NEW: Question Bank
+@login_required
+def question_bank(request):
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+    except:
+        messages.error(request, 'Access denied.')
+        return redirect('unified_login')
+    
+    if request.method == 'POST':
+        subject = (request.POST.get('subject') or '').strip()
+        class_name = request.POST.get('class_name')
+        try:
+            if not subject or class_name not in get_class_names():
+                raise QuestionImportError(['Choose a subject and class for the bank questions'])
+            if request.FILES.get('question_file'):
+                added = import_bank_questions(request.FILES['question_file'], subject, class_name, teacher)
+            else:
+                row = {field: (request.POST.get(field) or '').strip() for field in QUESTION_CONTENT_FIELDS + ['topic']}
+                complete = all(row[field] for field in QUESTION_CONTENT_FIELDS)
+                if not complete or row['correct_answer'] not in ANSWER_CHOICES:
+                    raise QuestionImportError(['Fill in the question, all four options and the correct answer'])
+                added = add_bank_questions([row], subject, class_name, teacher)
+        except QuestionImportError as e:
+            for error in e.errors:
+                messages.error(request, error)
+            return redirect('question_bank')
+        
+        if added:
+            messages.success(request, f'✅ {added} question(s) added to the bank!')
+        else:
+            messages.info(request, 'Those questions are already in the bank.')
+        return redirect('question_bank')
+    
+    filters = {
+        'query': request.GET.get('q', '').strip(),
+        'subject': request.GET.get('subject', '').strip(),
+        'class_name': request.GET.get('class_name', '').strip(),
+        'topic': request.GET.get('topic', '').strip(),
+    }
+    page = keyset_paginate(search_bank(**filters), request.GET.get('after'), request.GET.get('before'),
+                           page_size=BANK_PAGE_SIZE)
+    
+    context = {
+        'teacher': teacher,
+        'classes': get_class_names(),
+        'filters': filters,
+        'bank_questions': page.rows,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    }
+    return render(request, 'question_bank.html', context)
+
+
 # NEW: Edit Question
 @login_required
 def edit_question(request, question_id):
@@ -502,7 +684,14 @@ def edit_question(request, question_id):
         messages.error(request, 'Access denied.')
         return redirect('teacher_dashboard')
     
+    if question.bank_question_id and request.method != 'POST':
+        # Show the bank item's wording; saving gives this exam its own copy
+        bank = question.bank_question
+        for field in QUESTION_CONTENT_FIELDS:
+            setattr(question, field, getattr(bank, field))
+    
     if request.method == 'POST':
+        question.bank_question = None
         question.question_text = request.POST.get('question_text')
         question.option_a = request.POST.get('option_a')
         question.option_b = request.POST.get('option_b')
@@ -510,6 +699,7 @@ def edit_question(request, question_id):
         question.option_d = request.POST.get('option_d')
         question.correct_answer = request.POST.get('correct_answer')
         question.save()
+        publish_exam_snapshot(question.exam)
         
         messages.success(request, 'Question updated successfully!')
         return redirect('add_questions', exam_id=question.exam.id)
@@ -549,24 +739,30 @@ def mark_attendance(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
+    is_json = request.content_type == 'application/json'
+    
     if request.method == 'POST':
         try:
-            class_name = request.POST.get('class_name')
-            date = request.POST.get('date')
-            students = Student.objects.filter(class_name=class_name)
+            if is_json:
+                # {"class_name", "date", "default_status": "Present", "statuses": {student_id: status}}
+                payload = json.loads(request.body)
+                if not isinstance(payload, dict):
+                    raise ValueError('Expected a JSON object')
+                class_name = payload.get('class_name')
+                date = payload.get('date')
+                default_status = payload.get('default_status')
+                statuses = payload.get('statuses', {})
+                if not isinstance(statuses, dict):
+                    raise ValueError('statuses must map student ids to statuses')
+            else:
+                class_name = request.POST.get('class_name')
+                date = request.POST.get('date')
+                default_status = request.POST.get('default_status') or None
+                statuses = statuses_from_form(request.POST)
             
-            for student in students:
-                status = request.POST.get(f'status_{student.id}')
-                if status:
-                    Attendance.objects.update_or_create(
-                        student=student,
-                        date=date,
-                        defaults={
-                            'status': status,
-                            'class_name': class_name,
-                            'marked_by': teacher
-                        }
-                    )
+            # One transaction; with a default status only the exceptions are sent and written
+            counts = mark_class_attendance(class_name, date, statuses, teacher=teacher,
+                                           default_status=default_status)
             
             ActivityLog.objects.create(
                 action='attendance_marked',
@@ -574,16 +770,20 @@ def mark_attendance(request):
                 performed_by_type='teacher',
                 performed_by_name=teacher.full_name
             )
-            
-            messages.success(request, '✅ Attendance saved successfully!')
-            return redirect('mark_attendance')
-        except Exception as e:
+        except ValueError as e:
+            if is_json:
+                return JsonResponse({'error': str(e)}, status=400)
             messages.error(request, f'Error saving attendance: {str(e)}')
             return redirect('mark_attendance')
+        
+        if is_json:
+            return JsonResponse({'marked': counts})
+        messages.success(request, '✅ Attendance saved successfully!')
+        return redirect('mark_attendance')
     
-    classes = Student.objects.values_list('class_name', flat=True).distinct()
+    classes = get_class_names()
     selected_class = request.GET.get('class_name')
-    students = Student.objects.filter(class_name=selected_class) if selected_class else []
+    students = get_class_roster(selected_class) if selected_class else []
     
     context = {
         'classes': classes,
@@ -606,25 +806,49 @@ def view_attendance(request):
     # Get filters
     filter_class = request.GET.get('class_name')
     filter_date = request.GET.get('date')
+    mode = 'summary' if request.GET.get('mode') == 'summary' else 'detail'
+    
+    context = {
+        'teacher': teacher,
+        'classes': get_class_names(),
+        'filter_class': filter_class,
+        'filter_date': filter_date,
+        'mode': mode,
+    }
+    
+    if mode == 'summary':
+        # Served from the attendance rollups and bitmaps, not the Attendance table
+        terms = Term.objects.filter(start_date__isnull=False, end_date__isnull=False).select_related('session')
+        term = terms.filter(id=request.GET.get('term')).first() if request.GET.get('term') else None
+        term = term or terms.filter(is_current=True).first() or terms.order_by('-start_date').first()
+        context.update({'terms': terms, 'selected_term': term})
+        if term and filter_class:
+            term_rollup, days, students = class_attendance_summary(filter_class, term)
+            context.update({'term_rollup': term_rollup, 'daily_rollups': days, 'student_stats': students})
+        elif term:
+            context['class_rollups'] = school_attendance_overview(term)
+        return render(request, 'view_attendance.html', context)
     
     # Build query
-    attendance_records = Attendance.objects.all().order_by('-date')
+    attendance_records = Attendance.objects.select_related('student', 'marked_by')
     
     if filter_class:
-        attendance_records = attendance_records.filter(class_name=filter_class)
+        class_id = SchoolClass.resolve(filter_class, create=False)
+        if class_id is None:
+            attendance_records = attendance_records.none()
+        else:
+            attendance_records = attendance_records.filter(school_class_id=class_id)
     
     if filter_date:
         attendance_records = attendance_records.filter(date=filter_date)
     
-    classes = Student.objects.values_list('class_name', flat=True).distinct()
-    
-    context = {
-        'teacher': teacher,
-        'attendance_records': attendance_records,
-        'classes': classes,
-        'filter_class': filter_class,
-        'filter_date': filter_date,
-    }
+    # Newest days first, one page at a time
+    page = keyset_paginate(attendance_records, request.GET.get('after'), request.GET.get('before'), field='date')
+    context.update({
+        'attendance_records': page.rows,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
     return render(request, 'view_attendance.html', context)
 
 
@@ -665,35 +889,27 @@ def complete_result_entry(request):
             student = Student.objects.get(id=student_id)
             term = Term.objects.get(id=term_id)
             
-            # Save all subject grades
+            # Save all subject grades in one upsert (blank subjects are skipped)
+            rows = []
             for subject in STANDARD_SUBJECTS:
-                test1 = float(request.POST.get(f'test1_{subject}', 0) or 0)
-                test2 = float(request.POST.get(f'test2_{subject}', 0) or 0)
-                test3 = float(request.POST.get(f'test3_{subject}', 0) or 0)
-                exam = float(request.POST.get(f'exam_{subject}', 0) or 0)
+                row = {
+                    'student_id': student.id,
+                    'subject': subject,
+                    'test_1': request.POST.get(f'test1_{subject}'),
+                    'test_2': request.POST.get(f'test2_{subject}'),
+                    'test_3': request.POST.get(f'test3_{subject}'),
+                    'exam': request.POST.get(f'exam_{subject}'),
+                }
                 
                 # Skip if all zeros
-                if test1 == 0 and test2 == 0 and test3 == 0 and exam == 0:
+                if not any(float(row[field] or 0) for field in SCORE_FIELDS):
                     continue
-                
-                SubjectGrade.objects.update_or_create(
-                    student=student,
-                    term=term,
-                    subject=subject,
-                    defaults={
-                        'test_1': test1,
-                        'test_2': test2,
-                        'test_3': test3,
-                        'exam': exam,
-                        'recorded_by': teacher
-                    }
-                )
+                rows.append(row)
             
-            # Calculate positions and class averages
-            calculate_class_positions(student.class_name, term)
+            bulk_upsert_grades(term, rows, teacher=teacher)
             
-            # Create/Update Result Summary
-            create_result_summary(student, term)
+            # Positions and averages are recomputed lazily: the saves above
+            # flagged this class as stale and result_preview refreshes it
             
             ActivityLog.objects.create(
                 action='grades_entered',
@@ -710,10 +926,10 @@ def complete_result_entry(request):
             return redirect('complete_result_entry')
     
     # GET request - show form
-    classes = Student.objects.values_list('class_name', flat=True).distinct()
+    classes = get_class_names()
     terms = Term.objects.all()
     selected_class = request.GET.get('class_name')
-    students = Student.objects.filter(class_name=selected_class).order_by('full_name') if selected_class else []
+    students = get_class_roster(selected_class) if selected_class else []
     
     context = {
         'teacher': teacher,
@@ -726,81 +942,6 @@ def complete_result_entry(request):
     return render(request, 'complete_result_entry.html', context)
 
 
-# Helper function to calculate positions
-def calculate_class_positions(class_name, term):
-    """Calculate position for each student in the class"""
-    students = Student.objects.filter(class_name=class_name)
-    
-    # Calculate total scores for each student
-    student_totals = []
-    for student in students:
-        grades = SubjectGrade.objects.filter(student=student, term=term)
-        total = sum([g.total_score for g in grades])
-        student_totals.append((student, total, grades.count()))
-    
-    # Sort by total score (descending)
-    student_totals.sort(key=lambda x: x[1], reverse=True)
-    
-    # Assign positions
-    total_students = len(student_totals)
-    for position, (student, total, subject_count) in enumerate(student_totals, 1):
-        # Update or create result summary
-        summary, created = ResultSummary.objects.get_or_create(
-            student=student,
-            term=term
-        )
-        summary.position_in_class = f"{position}/{total_students}"
-        summary.total_subjects = subject_count
-        summary.score_gained = total
-        summary.average_score = total / subject_count if subject_count > 0 else 0
-        summary.promotion_status = "PROMOTED" if summary.average_score >= 50 else "REPEAT"
-        summary.save()
-    
-    # Calculate class average for each subject
-    all_subjects = SubjectGrade.objects.filter(term=term, student__class_name=class_name).values_list('subject', flat=True).distinct()
-    
-    for subject in all_subjects:
-        grades = SubjectGrade.objects.filter(term=term, student__class_name=class_name, subject=subject)
-        if grades.exists():
-            avg = sum([g.total_score for g in grades]) / grades.count()
-            grades.update(class_average=round(avg, 2))
-            
-            # Calculate position in subject
-            subject_scores = [(g.student, g.total_score) for g in grades]
-            subject_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            for pos, (student, score) in enumerate(subject_scores, 1):
-                SubjectGrade.objects.filter(
-                    student=student, 
-                    term=term, 
-                    subject=subject
-                ).update(position_in_subject=pos)
-
-
-# Helper function to create result summary
-def create_result_summary(student, term):
-    """Create or update result summary"""
-    grades = SubjectGrade.objects.filter(student=student, term=term)
-    
-    if not grades.exists():
-        return
-    
-    total_score = sum([g.total_score for g in grades])
-    subject_count = grades.count()
-    average = total_score / subject_count if subject_count > 0 else 0
-    
-    summary, created = ResultSummary.objects.get_or_create(
-        student=student,
-        term=term
-    )
-    
-    summary.total_subjects = subject_count
-    summary.score_gained = round(total_score, 2)
-    summary.average_score = round(average, 2)
-    summary.promotion_status = "PROMOTED" if average >= 50 else "REPEAT"
-    summary.save()
-
-
 # NEW: Result Preview
 @login_required  
 def result_preview(request, student_id, term_id):
@@ -815,8 +956,11 @@ def result_preview(request, student_id, term_id):
     
     student = Student.objects.get(id=student_id)
     term = Term.objects.get(id=term_id)
+    refresh_stale_results(student.class_name, term)
     grades = SubjectGrade.objects.filter(student=student, term=term).order_by('subject')
     summary = ResultSummary.objects.filter(student=student, term=term).first()
+    # One small bitmap row instead of counting the term's Attendance rows
+    attendance = student_term_attendance(student, term)
     school_settings = SchoolSettings.objects.first()
     
     # Handle remarks submission
@@ -845,62 +989,63 @@ def result_preview(request, student_id, term_id):
         'term': term,
         'grades': grades,
         'summary': summary,
+        'attendance': attendance,
         'school_settings': school_settings,
     }
     return render(request, 'result_preview.html', context)
+
+
+# NEW: Bulk grade entry (whole class x subject grid or JSON matrix)
 @login_required
-def enter_grades(request):
+def bulk_grade_entry(request):
     try:
         teacher = Teacher.objects.get(user=request.user)
     except:
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
+    is_json = request.content_type == 'application/json'
+    
     if request.method == 'POST':
-        class_name = request.POST.get('class_name')
-        subject = request.POST.get('subject')
-        term_id = request.POST.get('term')
-        
         try:
-            term = Term.objects.get(id=term_id)
-            students = Student.objects.filter(class_name=class_name)
+            if is_json:
+                payload = json.loads(request.body)
+                if not isinstance(payload, dict):
+                    raise ValueError('Expected a JSON object')
+                class_name = payload.get('class_name')
+                term_id = payload.get('term_id')
+                rows = payload.get('grades', [])
+                if not isinstance(rows, list):
+                    raise ValueError('grades must be a list')
+            else:
+                class_name = request.POST.get('class_name')
+                term_id = request.POST.get('term')
+                rows = rows_from_form(request.POST, subject=request.POST.get('subject'))
             
-            for student in students:
-                test_1 = float(request.POST.get(f'test1_{student.id}', 0))
-                test_2 = float(request.POST.get(f'test2_{student.id}', 0))
-                test_3 = float(request.POST.get(f'test3_{student.id}', 0))
-                exam = float(request.POST.get(f'exam_{student.id}', 0))
-                
-                SubjectGrade.objects.update_or_create(
-                    student=student,
-                    term=term,
-                    subject=subject,
-                    defaults={
-                        'test_1': test_1,
-                        'test_2': test_2,
-                        'test_3': test_3,
-                        'exam': exam,
-                        'recorded_by': teacher
-                    }
-                )
+            term = Term.objects.get(id=term_id)
+            saved = bulk_upsert_grades(term, rows, teacher=teacher, class_name=class_name)
             
             ActivityLog.objects.create(
                 action='grades_entered',
-                description=f'Grades entered for {subject} - {class_name}',
+                description=f'{saved} grades entered for {class_name} - {term}',
                 performed_by_type='teacher',
                 performed_by_name=teacher.full_name
             )
-            
-            messages.success(request, '✅ Grades saved successfully!')
-            return redirect('enter_grades')
-        except Exception as e:
+        except (ValueError, Term.DoesNotExist) as e:
+            if is_json:
+                return JsonResponse({'error': str(e)}, status=400)
             messages.error(request, f'Error saving grades: {str(e)}')
-            return redirect('enter_grades')
+            return redirect('bulk_grade_entry')
+        
+        if is_json:
+            return JsonResponse({'saved': saved})
+        messages.success(request, f'✅ {saved} grades saved successfully!')
+        return redirect('bulk_grade_entry')
     
-    classes = Student.objects.values_list('class_name', flat=True).distinct()
+    classes = get_class_names()
     terms = Term.objects.all()
     selected_class = request.GET.get('class_name')
-    students = Student.objects.filter(class_name=selected_class) if selected_class else []
+    students = get_class_roster(selected_class) if selected_class else []
     
     context = {
         'teacher': teacher,
@@ -921,25 +1066,29 @@ def export_results(request, exam_id):
         messages.error(request, 'Access denied.')
         return redirect('teacher_dashboard')
     
-    submissions = ExamSubmission.objects.filter(exam=exam)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{exam.title}_results.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Student ID', 'Student Name', 'Score (%)', 'Correct Answers', 'Total Questions', 'Submission Date'])
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, 'Unknown export format.')
+        return redirect('teacher_dashboard')
     
-    for sub in submissions:
-        writer.writerow([
-            sub.student.student_id,
-            sub.student.full_name,
-            sub.score,
-            sub.correct_answers,
-            sub.total_questions,
-            sub.submitted_at.strftime('%Y-%m-%d %H:%M')
-        ])
+    # Streams rows in chunks, so memory use does not grow with the number of submissions
+    return export_response(exam, export_format, include_items=request.GET.get('items') == '1')
+
+
+@login_required
+def item_analysis(request, exam_id):
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+        exam = Exam.objects.get(id=exam_id, created_by=teacher)
+    except:
+        messages.error(request, 'Access denied.')
+        return redirect('teacher_dashboard')
     
-    return response
+    context = {
+        'exam': exam,
+        'analysis': analyse_exam(exam),
+    }
+    return render(request, 'item_analysis.html', context)
 
 
 # ============= STUDENT VIEWS =============
@@ -951,16 +1100,14 @@ def student_dashboard(request):
         messages.error(request, 'Access denied.')
         return redirect('unified_login')
     
-    submissions = ExamSubmission.objects.filter(student=student).order_by('-submitted_at')
-    available_exams = Exam.objects.filter(class_name=student.class_name, is_active=True)
-    
-    taken_exam_ids = submissions.values_list('exam_id', flat=True)
-    available_exams = available_exams.exclude(id__in=taken_exam_ids)
+    # Cached per student; rebuilt from one query after an exam change or a submission
+    feed = get_student_feed(student)
     
     context = {
         'student': student,
-        'submissions': submissions,
-        'available_exams': available_exams,
+        'submissions': feed.completed,
+        'pending_attempts': feed.pending,
+        'available_exams': feed.available,
     }
     return render(request, 'student_dashboard.html', context)
 
@@ -990,7 +1137,8 @@ def student_profile(request):
 def take_exam(request, exam_id):
     try:
         student = Student.objects.get(user=request.user)
-        exam = Exam.objects.get(exam_id=exam_id, class_name=student.class_name, is_active=True)
+        exam = Exam.objects.get(exam_id=exam_id, school_class_id=student.school_class_id,
+                                school_class__isnull=False, is_active=True)
         
         if ExamSubmission.objects.filter(student=student, exam=exam).exists():
             messages.error(request, 'You have already taken this exam.')
@@ -999,58 +1147,63 @@ def take_exam(request, exam_id):
         messages.error(request, 'Invalid exam ID or access denied.')
         return redirect('student_dashboard')
     
-    # SHUFFLE QUESTIONS FOR EACH STUDENT
-    questions = list(exam.questions.all())
-    if exam.shuffle_questions:
-        random.shuffle(questions)
+    attempt = start_attempt(student, exam)
+    if attempt.submitted_at:
+        messages.info(request, 'You have already submitted this exam. Your result will appear once it is graded.')
+        return redirect('student_dashboard')
     
-    if request.method == 'POST':
-        submission = ExamSubmission.objects.create(
-            student=student,
-            exam=exam,
-            total_questions=len(questions),
-            correct_answers=0,
-            score=0
-        )
-        
-        correct_count = 0
-        
-        for question in exam.questions.all():
-            selected = request.POST.get(f'question_{question.id}')
-            if selected:
-                is_correct = (selected == question.correct_answer)
-                if is_correct:
-                    correct_count += 1
-                
-                StudentAnswer.objects.create(
-                    submission=submission,
-                    question=question,
-                    selected_answer=selected,
-                    is_correct=is_correct
-                )
-        
-        score = (correct_count / len(questions)) * 100
-        submission.correct_answers = correct_count
-        submission.score = round(score, 2)
-        submission.save()
-        
-        ActivityLog.objects.create(
-            action='exam_submitted',
-            description=f'{student.full_name} submitted {exam.title} - Score: {score}%',
-            performed_by_type='student',
-            performed_by_name=student.full_name
-        )
+    # Grading happens in the background (process_grading_queue); here we only queue it
+    if request.method == 'POST' or not attempt.is_open():
+        timed_out = not attempt.is_open()
+        try:
+            enqueue_attempt(attempt, answers_from_post(request.POST, get_answer_key(exam)))
+        except DuplicateSubmission:
+            messages.error(request, 'You have already taken this exam.')
+            return redirect('student_dashboard')
         
-        messages.success(request, f'Exam submitted! Your score: {score}%')
-        return redirect('view_result', submission_id=submission.id)
+        if timed_out:
+            messages.warning(request, 'Time is up! Your saved answers were submitted for grading.')
+        else:
+            messages.success(request, 'Exam submitted! Your result will be ready shortly.')
+        return redirect('student_dashboard')
+    
+    # SHUFFLE QUESTIONS FOR EACH STUDENT (same order on every refresh)
+    questions = student_paper(exam, student)
     
     context = {
         'exam': exam,
         'questions': questions,
+        'saved_answers': attempt.answers,
+        'seconds_left': attempt.seconds_left(),
     }
     return render(request, 'take_exam.html', context)
 
 
+# NEW: Autosave answers while an exam is in progress (JSON)
+@login_required
+def save_exam_answers(request, exam_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        student = Student.objects.get(user=request.user)
+        attempt = ExamAttempt.objects.select_related('exam').get(
+            student=student, exam__exam_id=exam_id, exam__is_active=True
+        )
+    except (Student.DoesNotExist, ExamAttempt.DoesNotExist):
+        return JsonResponse({'error': 'No exam in progress'}, status=404)
+    
+    try:
+        payload = json.loads(request.body)
+        delta = clean_answers(payload.get('answers'), get_answer_key(attempt.exam))
+        attempt = save_attempt_answers(attempt, delta)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except AttemptClosed:
+        return JsonResponse({'error': 'Time is up for this exam'}, status=409)
+    
+    return JsonResponse({'saved': len(delta), 'seconds_left': attempt.seconds_left()})
+
+
 @login_required
 def view_result(request, submission_id):
     try: